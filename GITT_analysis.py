@@ -5,69 +5,707 @@ Created on Sat Feb  8 15:51:35 2025
 @author: mhaefner-chem
 '''
 
+'''
+error raised by the analysis for problems with the input data or settings,
+the title and message are meant to be shown to the user as they are
+'''
+class GITT_error(Exception):
+    
+    def __init__(self, title, message):
+        super().__init__(message)
+        self.title = title
+
+'''
+error raised inside a task that was cancelled by the user, see GITT_task_report
+'''
+class GITT_cancelled(GITT_error):
+    pass
+
+'''
+class records wall time, CPU time, peak memory, and item counts of the stages of an analysis
+a stage is entered as context manager, e.g.,
+    with report.stage('load'):
+        ...
+        report.count(rows=len(x))
+stages can be nested, counts always go to the innermost open stage
+
+the peak memory is the highest memory traced by tracemalloc above the memory at the start of the stage,
+including nested stages; tracing slows down allocations, so it can be switched off with memory=False
+callback is called with every finished stage as dictionary, e.g., to forward it to other metrics
+'''
+class GITT_report:
+
+    def __init__(self, memory=True, callback=None):
+
+        self.memory = memory
+        self.callback = callback
+        self.stages = []
+        self.open = []
+        self.started_tracing = False
+
+    def stage(self, name):
+        import contextlib
+        import time
+        import tracemalloc
+
+        @contextlib.contextmanager
+        def measure():
+            record = {'stage': name, 'depth': len(self.open), 'wall': 0.0, 'cpu': 0.0, 'peak_memory': None, 'counts': {}}
+            self.stages.append(record)
+            if self.memory:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    self.started_tracing = True
+                current, peak = tracemalloc.get_traced_memory()
+                if len(self.open) > 0:
+                    self.open[-1]['peak'] = max(self.open[-1]['peak'], peak)
+                tracemalloc.reset_peak()
+                self.open.append({'record': record, 'start': current, 'peak': current})
+            else:
+                self.open.append({'record': record})
+            wall = time.perf_counter()
+            cpu = time.process_time()
+            try:
+                yield record
+            finally:
+                record['wall'] = time.perf_counter()-wall
+                record['cpu'] = time.process_time()-cpu
+                entry = self.open.pop()
+                if self.memory:
+                    entry['peak'] = max(entry['peak'], tracemalloc.get_traced_memory()[1])
+                    record['peak_memory'] = entry['peak']-entry['start']
+                    if len(self.open) > 0:
+                        self.open[-1]['peak'] = max(self.open[-1]['peak'], entry['peak'])
+                    elif self.started_tracing:
+                        tracemalloc.stop()
+                        self.started_tracing = False
+                if self.callback is not None:
+                    self.callback(record)
+
+        return measure()
+
+    def count(self, **counts):
+
+        if len(self.open) > 0:
+            # numpy scalars are stored as python numbers, so the report can be written as JSON
+            for key, value in counts.items():
+                self.open[-1]['record']['counts'][key] = value.item() if hasattr(value, 'item') else value
+
+    # the progress within a stage is only of interest while the task runs, see GITT_task_report
+    def progress(self, done, total):
+        pass
+
+    def as_dict(self):
+        import platform
+        import numpy as np
+
+        return {
+            'python':   platform.python_version(),
+            'numpy':    np.__version__,
+            'stages':   self.stages
+            }
+
+    def write_json(self, file):
+        import json
+
+        with open(file, mode='w') as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+    # table of all stages, nested stages are indented
+    def summary(self):
+
+        lines = ['{:24} {:>10} {:>10} {:>12}  {}'.format('stage','wall/s','cpu/s','peak/MB','counts')]
+        for record in self.stages:
+            peak = '' if record['peak_memory'] is None else '{:12.1f}'.format(record['peak_memory']/2**20)
+            counts = ', '.join('{}={}'.format(key, value) for key, value in record['counts'].items())
+            lines.append('{:24} {:10.4f} {:10.4f} {:>12}  {}'.format('  '*record['depth']+record['stage'], record['wall'], record['cpu'], peak, counts))
+
+        return '\n'.join(lines)
+
+'''
+class with the interface of GITT_report that records nothing, used when no report is requested,
+so the instrumentation of the analysis costs only a method call per stage
+every stage is the report itself, as context manager that does nothing
+'''
+class GITT_null_report:
+
+    def stage(self, name):
+        return self
+
+    def count(self, **counts):
+        pass
+
+    def progress(self, done, total):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+GITT_no_report = GITT_null_report()
+
+'''
+class passes the stages and the progress of a task running in a background thread to another thread
+through the queue events, as ('stage', name) and ('progress', fraction), and forwards everything to the
+report inner (e.g., a GITT_report)
+once cancelled() returns True, the task is aborted with GITT_cancelled at the next stage or progress update
+'''
+class GITT_task_report:
+
+    def __init__(self, inner, events, cancelled):
+
+        self.inner = inner
+        self.events = events
+        self.cancelled = cancelled
+
+    def check(self):
+
+        if self.cancelled():
+            raise GITT_cancelled('Cancelled', 'The task was cancelled.')
+
+    def stage(self, name):
+
+        self.check()
+        self.events.put(('stage', name))
+        return self.inner.stage(name)
+
+    def count(self, **counts):
+        self.inner.count(**counts)
+
+    def progress(self, done, total):
+
+        self.check()
+        if total > 0:
+            self.events.put(('progress', min(done/total, 1.0)))
+
 # INPUT
 
+'''
+function determines the column separator from the header line of a GITT data file
+'''
+def get_GITT_splitter(header):
+
+    if ',' in header:
+        splitter = ','
+    elif '\t' in header:
+        splitter = '\t'
+    else:
+        splitter = ' '
+
+    return splitter
+
+'''
+known names of current columns from BioLogic and Arbin cyclers with the factor to convert them to mA
+'''
+GITT_current_factors = {
+    'I/mA':         1,
+    '<I>/mA':       1,
+    'Current (mA)': 1,
+    'Current (A)':  1000
+    }
+
+'''
+function translates the header line of a GITT data file into the internal column labels
+known column names from BioLogic and Arbin cyclers are mapped to 'time', 'volt', 'cap', 'spec_cap', and 'curr',
+all other columns keep their original name
+'''
+def get_GITT_labels(header, splitter):
+
+    labels = []
+    for item in header.split(splitter):
+        item = item.split('\n')[0]
+        label = item
+        if item in ['Test Time (s)','time/s','Time (s)']:
+            label = 'time'
+        elif item in ['Voltage (V)','Ewe/V']:
+            label = 'volt'
+        elif item in ['Capacity (mAh)','Capacity/mA.h','Capacity/mAh']:
+            label = 'cap'
+        elif item in ['Specific Capacity (mAh/g)','SpecificCapacity/mA.h/g']:
+            label = 'spec_cap'
+        elif item in GITT_current_factors:
+            label = 'curr'
+        labels.append(label)
+
+    return labels
+
+'''
+function finds the first entry in the used columns that cannot be read as a number
+only called after the bulk conversion has failed, so speed is not an issue here
+returns the line number in the file (header is line 1), the column number and name, and the faulty entry
+'''
+def locate_GITT_error(file, splitter, names, columns):
+
+    with open(file,mode='r') as f:
+        f.readline()
+        for line_index, line in enumerate(f):
+            if line.strip() == '':
+                continue
+            if splitter == ' ':
+                items = line.split()
+            else:
+                items = line.split(splitter)
+            for column in columns:
+                if column >= len(items):
+                    return line_index+2, column+1, names[column], ''
+                try:
+                    float(items[column])
+                except:
+                    return line_index+2, column+1, names[column], items[column].strip()
+
+    return 0, 0, '', ''
+
+'''
+storage types of the raw data columns for the precisions of get_GITT_data
+with 'single', voltage, capacity, and current are kept as float32, which halves their memory and is still
+finer than the resolution of the cyclers (about 0.5 µV at 4 V), the time always stays float64, since
+float32 only resolves 0.06 s after 12 days of measurement
+the analysis only converts the points it needs to float64, see get_GITT_floats
+'''
+GITT_precisions = {'double': 'float64', 'single': 'float32'}
+
+'''
+function returns the storage type of the column label for the given precision (see GITT_precisions)
+raises GITT_error for unknown precisions
+'''
+def get_GITT_column_dtype(label, precision='double'):
+
+    if not precision in GITT_precisions:
+        raise GITT_error('Unknown precision', 'The raw data can be stored in {} precision, not in {} precision.'.format(' or '.join(GITT_precisions), precision))
+    if label == 'time':
+        return 'float64'
+
+    return GITT_precisions[precision]
+
+'''
+growable array used to collect a column of unknown length while streaming a file
+the capacity is doubled whenever it runs out, so appending stays cheap
+'''
+class GITT_column_buffer:
+
+    def __init__(self, capacity=65536, dtype='float64'):
+        import numpy as np
+
+        self.array = np.empty(capacity, dtype=dtype)
+        self.size = 0
+
+    def append(self, values):
+
+        needed = self.size + len(values)
+        if needed > len(self.array):
+            self.array.resize(max(needed, 2*len(self.array)), refcheck=False)
+        self.array[self.size:needed] = values
+        self.size = needed
+
+    # trims the unused capacity in place and returns the filled array
+    def finalize(self):
+
+        self.array.resize(self.size, refcheck=False)
+        return self.array
+
+'''
+function yields blocks of complete lines read from an open file in chunks of roughly chunk_size characters
+'''
+def read_GITT_blocks(f, chunk_size):
+
+    rest = ''
+    while True:
+        chunk = f.read(chunk_size)
+        if chunk == '':
+            break
+        chunk = rest + chunk
+        cut = chunk.rfind('\n')
+        if cut < 0:
+            rest = chunk
+            continue
+        rest = chunk[cut+1:]
+        yield chunk[:cut+1]
+
+    if rest.strip() != '':
+        yield rest
+
+'''
+function determines from the header line of a GITT data file which columns are read
+returns the column separator, the labels of all columns, the indices of the required columns,
+the delimiter for np.loadtxt, and the factors by which the required columns are converted
+(currents to mA, see GITT_current_factors)
+raises GITT_error if the file lacks time or voltage
+'''
+def get_GITT_columns(header):
+
+    required = ['time','volt','cap','spec_cap','curr']
+    splitter = get_GITT_splitter(header)
+    labels = get_GITT_labels(header, splitter)
+
+    for label in ['time','volt']:
+        if not label in labels:
+            raise GITT_error('GITT data incomplete', 'The GITT data needs to contain at least a column labeled \'time/s\' and a column labeled \'Ewe/V\'.')
+
+    columns = []
+    for label in required:
+        if label in labels:
+            columns.append(labels.index(label))
+
+    # runs of spaces count as a single separator
+    if splitter == ' ':
+        delimiter = None
+    else:
+        delimiter = splitter
+
+    names = [item.split('\n')[0] for item in header.split(splitter)]
+    factors = [GITT_current_factors.get(names[column], 1) if labels[column] == 'curr' else 1 for column in columns]
+
+    return splitter, labels, columns, delimiter, factors
+
 '''
 function reads in the GITT data from a given file
-Format: 
-    dictionary 'data', keys from list ['time','volt','cap','spec_cap']
+Format:
+    dictionary 'data', keys from list ['time','volt','cap','spec_cap','curr']
     time (continuous measurement time) and volt (measured voltage) are required
     either cap (capacity) or spec_cap (special capacity) are requied
-    
-    datapoints are stored in lists:
-    data[key] = []
+    curr (current in mA) is optional and used to detect the titrations, if present
+
+    datapoints are stored in contiguous float64 numpy arrays:
+    data[key] = np.array([...])
+    with precision 'single', all columns except time are stored as float32 (see GITT_precisions)
+
+    only the required columns are converted, all other columns in the file are skipped
+
+    with chunk_size (number of characters), the file is streamed in blocks of that size
+    and the columns are collected in growable arrays, so the peak memory only depends on
+    the kept columns and the chunk size, not on the size of the file
+
+    raises GITT_error if the file lacks time or voltage or contains non-numerical values
+    the reading is recorded as stage 'load' in report (see GITT_report), streaming also reports
+    the progress through the file
+'''
+def get_GITT_data(file, chunk_size=None, report=GITT_no_report, precision='double'):
+    import io
+    import os
+    import numpy as np
+
+    data = {}
+
+    with report.stage('load'), open(file,mode='r') as f:
+        header = f.readline()
+        splitter, labels, columns, delimiter, factors = get_GITT_columns(header)
+        dtypes = [get_GITT_column_dtype(labels[column], precision) for column in columns]
+
+        try:
+            if chunk_size is None:
+                block = np.loadtxt(f, delimiter=delimiter, usecols=columns, ndmin=2, dtype=np.float64)
+                for idx, column in enumerate(columns):
+                    data[labels[column]] = np.ascontiguousarray(block[:,idx], dtype=dtypes[idx])
+            else:
+                buffers = [GITT_column_buffer(dtype=dtype) for dtype in dtypes]
+                size = os.path.getsize(file)
+                done = len(header)
+                for text in read_GITT_blocks(f, chunk_size):
+                    done += len(text)
+                    report.progress(done, size)
+                    if text.strip() == '':
+                        continue
+                    block = np.loadtxt(io.StringIO(text), delimiter=delimiter, usecols=columns, ndmin=2, dtype=np.float64)
+                    for idx, buffer in enumerate(buffers):
+                        buffer.append(block[:,idx])
+                for idx, column in enumerate(columns):
+                    data[labels[column]] = buffers[idx].finalize()
+        except ValueError:
+            names = [item.split('\n')[0] for item in header.split(splitter)]
+            line_number, column_number, name, item = locate_GITT_error(file, splitter, names, columns)
+            raise GITT_error('Faulty GITT data', 'GITT data contains non-numerical values (line {}, column {} \'{}\': \'{}\'). Please check the input file.'.format(line_number, column_number, name, item))
+        for idx, column in enumerate(columns):
+            if factors[idx] != 1:
+                data[labels[column]] *= factors[idx]
+        report.count(bytes=os.path.getsize(file), rows=len(data['time']), columns=len(columns))
+
+    return data
+
+'''
+version of the columns read by get_GITT_data, to be increased whenever the loader reads other columns
+or converts them differently, so files are parsed again instead of being taken from the binary cache
+'''
+GITT_data_version = 2
+
+'''
+function computes the key under which the parsed data of a raw file is cached
+the key combines size and modification time with a hash of the beginning, the end,
+and evenly spaced samples of the file, so multi-GB files do not need to be read completely
+'''
+def get_GITT_cache_key(file, samples=16, sample_size=65536):
+    import hashlib
+    import os
+
+    stat = os.stat(file)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update('{},{},{}'.format(stat.st_size, stat.st_mtime_ns, GITT_data_version).encode())
+
+    with open(file, mode='rb') as f:
+        digest.update(f.read(16*sample_size))
+        for i in range(1, samples+1):
+            f.seek(stat.st_size*i//(samples+1))
+            digest.update(f.read(sample_size))
+        f.seek(max(0, stat.st_size-16*sample_size))
+        digest.update(f.read(16*sample_size))
+
+    return digest.hexdigest()
+
+'''
+function deletes the least recently used entries of a cache directory until its size
+is below max_cache_bytes, the entry named keep is never deleted
+'''
+def evict_GITT_cache(cache_dir, max_cache_bytes, keep=''):
+    import os
+    import shutil
+
+    entries = []
+    total = 0
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        meta = os.path.join(path, 'meta.json')
+        if not os.path.isfile(meta):
+            continue
+        size = sum(os.path.getsize(os.path.join(path, item)) for item in os.listdir(path))
+        entries.append((os.path.getmtime(meta), size, name))
+        total += size
+
+    for last_used, size, name in sorted(entries):
+        if total <= max_cache_bytes:
+            break
+        if name == keep:
+            continue
+        shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+        total -= size
+
+'''
+function reads in the GITT data from a given file through a binary cache
+the parsed columns are stored as .npy files and memory-mapped when the same file is opened again,
+entries are invalidated automatically when size, modification time, or content of the raw file change
+
+by default, the cache is a sidecar directory next to the .info file of the raw data, which only keeps
+the entry for the current state of the file; with cache_dir, a cache directory shared between many files
+is used instead and the least recently used entries are evicted once it grows beyond max_cache_bytes
+the cache is best effort, if it cannot be written the data is simply returned from the file
+the lookup is recorded as stage 'cache' in report, with the reading of the file as nested stage 'load'
+the columns are stored in the given precision (see get_GITT_data), which is part of the key
+'''
+def get_GITT_data_cached(file, cache_dir=None, max_cache_bytes=2**34, chunk_size=2**20, report=GITT_no_report, precision='double'):
+    import json
+    import os
+    import numpy as np
+
+    with report.stage('cache'):
+        key = get_GITT_cache_key(file)
+        if precision != 'double':
+            key += '-'+precision
+        if cache_dir is None:
+            cache_dir = os.path.splitext(file)[0]+'.gittcache'
+            max_cache_bytes = 0
+        entry = os.path.join(cache_dir, key)
+        meta = os.path.join(entry, 'meta.json')
+
+        if os.path.isfile(meta):
+            try:
+                with open(meta, mode='r') as f:
+                    labels = json.load(f)['labels']
+                data = {}
+                for label in labels:
+                    data[label] = np.load(os.path.join(entry, label+'.npy'), mmap_mode='r')
+                os.utime(meta)
+                report.count(hit=True, rows=len(data['time']))
+                return data
+            except (OSError, ValueError, KeyError):
+                pass
+
+        report.count(hit=False)
+        data = get_GITT_data(file, chunk_size=chunk_size, report=report, precision=precision)
+
+        try:
+            os.makedirs(entry, exist_ok=True)
+            for label in data:
+                np.save(os.path.join(entry, label+'.npy'), data[label])
+            # meta.json is written last and marks the entry as complete
+            with open(meta, mode='w') as f:
+                json.dump({'file': os.path.basename(file), 'labels': list(data)}, f)
+            evict_GITT_cache(cache_dir, max_cache_bytes, keep=key)
+        except OSError:
+            pass
+
+        return data
+
+'''
+default values of the numerical settings, as [value, error]
 '''
-def get_GITT_data(file):
+GITT_defaults = {
+    'm_AM/A':   [5,0],
+    'M_AM':     [100,0],
+    'rho':      [4,0],
+    'refcap':   [150,0],
+    'c0':       [1.0,0],
+    'A':        [1.25,0],
+    'scale':    [1,0],
+    'limiter':  [0.01,0]
+    }
+
+'''
+This function reads the GITT settings from an .info-file as written by write_GITT_settings
+returns a dictionary with the pairs [value, error] of all settings found in the file,
+settings without error ('scale', 'limiter') get the error 0
+'''
+def read_GITT_settings(settings_file):
     
-    data = {}    
-    labels = []    
-    splitter = ' '
+    number_settings = ['refcap','m_AM/A','M_AM','rho','c0','A','scale','limiter']
+    values = {}
+    with open(settings_file, mode='r') as f:
+        for line in f.readlines():
+            items = line.strip().split(',')
+            if items[0] in number_settings:
+                values[items[0]] = [float(items[1]),0]
+                if len(items) > 2:
+                    values[items[0]][1] = float(items[2])
     
-    with open(file,mode='r') as f:
-        lines = f.readlines()
-        if ',' in lines[0]:
-            splitter = ','
-        elif '\t' in lines[0]:
-            splitter = '\t'
-        else:
-            splitter = ' '
-            
-        required = ['time','volt','cap','spec_cap']
-            
-        for line_index, line in enumerate(lines):
-            if line_index == 0:
-                for item in line.split(splitter):
-                    item = item.split('\n')[0]
-                    label = item
-                    if item in ['Test Time (s)','time/s','Time (s)']:
-                        label = 'time'
-                    elif item in ['Voltage (V)','Ewe/V']:
-                        label = 'volt'
-                    elif item in ['Capacity (mAh)','Capacity/mA.h','Capacity/mAh']:
-                        label = 'cap'
-                    elif item in ['Specific Capacity (mAh/g)','SpecificCapacity/mA.h/g']:
-                        label = 'spec_cap'
-                        
-                    data[label] = []
-                    labels.append(label)
+    return values
+
+'''
+version of the layout of GITT project files, to be increased whenever write_GITT_project stores the
+contents differently, projects of later versions are not opened
+'''
+GITT_project_version = 1
+
+'''
+class opens a GITT project file as written by write_GITT_project
+only the manifest and the directory of the archive are read when the project is opened, the arrays are
+read when they are requested:
+    settings            numerical settings as {key: [value, error]}, see get_parameters
+    flags, messages     flags 'cap' and 'spec_cap' and messages (kind, title, text) of the analysis
+    labels, rows        labels and number of rows of the raw data columns
+    read_titrations()   table of titrations, memory-mapped from the file, so looking at the results of
+                        a large measurement only reads the pages of the table that are used
+    read_raw()          rows of a raw data column, only the chunks containing them are decompressed
+    get_GITT_data()     all raw data columns, as from get_GITT_data
+    cache_results()     puts the results into a GITT_result_cache, so analyze_GITT_cached returns them
+                        for the same settings and options without analyzing the raw data again,
+                        unless they were written by another version of the analysis
+raises GITT_error if the file is not a GITT project or was written by a later version
+'''
+class GITT_project:
+
+    def __init__(self, file):
+        import json
+        import zipfile
+
+        self.file = file
+        try:
+            self.archive = zipfile.ZipFile(file, mode='r')
+        except (OSError, zipfile.BadZipFile):
+            raise GITT_error('Faulty project', 'The file {} cannot be opened as GITT project.'.format(file))
+        try:
+            self.manifest = json.loads(self.archive.read('manifest.json'))
+        except (KeyError, ValueError):
+            self.archive.close()
+            raise GITT_error('Faulty project', 'The file {} is not a GITT project.'.format(file))
+        if self.manifest.get('version', 0) > GITT_project_version:
+            self.archive.close()
+            raise GITT_error('Faulty project', 'The project {} was written by a later version of the program.'.format(file))
+
+        self.settings = self.manifest['settings']
+        self.flags = self.manifest['flags']
+        self.messages = [tuple(message) for message in self.manifest['messages']]
+        self.labels = list(self.manifest['raw'])
+        self.rows = self.manifest['rows']
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def close(self):
+        self.archive.close()
+
+    # settings as returned by get_GITT_parameters
+    def get_parameters(self):
+
+        values = {key: value[0] for key, value in self.settings.items()}
+        errors = {key: value[1] for key, value in self.settings.items()}
+        return get_GITT_parameters(values, errors)
+
+    # the table is stored without compression, so the array inside the archive is mapped directly
+    def read_titrations(self):
+        import struct
+        import zipfile
+        import numpy as np
+
+        if not self.manifest['titrations']:
+            return None
+
+        info = self.archive.getinfo('titrations.npy')
+        if info.compress_type != zipfile.ZIP_STORED:
+            with self.archive.open(info) as f:
+                return np.lib.format.read_array(f, allow_pickle=False)
+
+        with open(self.file, mode='rb') as f:
+            # the local header of the member can have other extra fields than the directory
+            f.seek(info.header_offset)
+            name_length, extra_length = struct.unpack('<HH', f.read(30)[26:30])
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
             else:
-                for item_index, item in enumerate(line.split(splitter)):
-                    if labels[item_index] in required:
-                        try:
-                            float(item)
-                        except:
-                            messagebox.showerror('Faulty GITT data', 'GITT data contains non-numerical values. Please check the input file.')
-                            return 0
-                        else:
-                            data[labels[item_index]].append(float(item))
-                                
-                    
-    for label in ['time','volt']:
-        if not label in data.keys():
-            messagebox.showerror('GITT data incomplete', 'The GITT data needs to contain at least a column labeled \'time/s\' and a column labeled \'Ewe/V\'.')
-            return 0
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            offset = f.tell()
 
-    return data
+        if shape[0] == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(self.file, dtype=dtype, mode='r', offset=offset, shape=shape)
+
+    # rows start to stop of the raw data column label
+    def read_raw(self, label, start=0, stop=None):
+        import numpy as np
+
+        if not label in self.manifest['raw']:
+            raise GITT_error('GITT data incomplete', 'The project {} contains no column \'{}\'.'.format(self.file, label))
+        layout = self.manifest['raw'][label]
+        chunk_rows = layout['chunk_rows']
+        stop = self.rows if stop is None else min(stop, self.rows)
+        start = min(start, stop)
+
+        column = np.empty(stop-start, dtype=layout['dtype'])
+        for number in range(start//chunk_rows, -(-stop//chunk_rows)):
+            with self.archive.open('raw/{}/{}.npy'.format(label, number)) as f:
+                chunk = np.lib.format.read_array(f, allow_pickle=False)
+            first = number*chunk_rows
+            low = max(start, first)
+            high = min(stop, first+len(chunk))
+            column[low-start:high-start] = chunk[low-first:high-first]
+
+        return column
+
+    # the reading is recorded as stage 'load' in report
+    def get_GITT_data(self, report=GITT_no_report):
+
+        with report.stage('load'):
+            data = {label: self.read_raw(label) for label in self.labels}
+            report.count(rows=self.rows, columns=len(data))
+
+        return data
+
+    # GITT_data are the raw data columns of the project, as from get_GITT_data()
+    def cache_results(self, cache, GITT_data):
+        import numpy as np
+
+        # results of an earlier version of the analysis are analyzed again
+        if self.manifest.get('result_version') != GITT_result_version:
+            return
+        titrations = self.read_titrations()
+        if titrations is None:
+            return
+        key = cache.key(GITT_data, self.get_parameters(), self.manifest['timing'], self.manifest['samples'], self.manifest['seed'], self.manifest['detection'])
+        cache.put(key, (np.array(titrations), list(self.messages), dict(self.flags)))
 
 # OUTPUT
 
@@ -90,512 +728,2410 @@ def write_GITT_settings(settings_file, settings):
             f.write('{},{}\n'.format(item,value))
             
 '''
-This function writes an example file with mock GITT data.
+column names and separators of the raw data files written by the cyclers, used for synthetic data
+'''
+GITT_example_headers = {
+    'biologic': ('\t', {'time': 'time/s', 'volt': 'Ewe/V', 'cap': 'Capacity/mA.h', 'spec_cap': 'SpecificCapacity/mA.h/g', 'curr': 'I/mA'}),
+    'arbin':    (',', {'time': 'Test Time (s)', 'volt': 'Voltage (V)', 'cap': 'Capacity (mAh)', 'spec_cap': 'Specific Capacity (mAh/g)', 'curr': 'Current (A)'})
+    }
+
+'''
+This function generates mock GITT data without any loops over points or titrations
+the measurement starts with 10 points at rest, followed by the titrations, the first half charging
+and the second half discharging the cell, every titration consists of per_pulse points over 8100 s,
+with current applied for the first 900 s
+the capacity is reset at the end of the charge, capacity 'spec_cap' is given for an active mass m_AM in g,
+with capacity None only time and voltage are generated; with current, the current 'curr' in mA is added
+only the titrations from start to stop are generated, so large data sets can be produced in blocks,
+the voltage noise of every block is drawn from a random generator seeded with seed and start
+returns a dictionary of arrays as get_GITT_data
+'''
+def generate_GITT_data(pulses=25, per_pulse=136, noise=0, seed=0, capacity='cap', start=0, stop=None, m_AM=0.00625, current=False):
+    import numpy as np
+    
+    if stop is None:
+        stop = pulses
+    charges = (pulses+1)//2
+    number = np.arange(start, stop)
+    charge = np.where(number < charges, 1.0, -1.0)
+    
+    t_pulse = np.linspace(0, 8100, per_pulse)
+    on = t_pulse < 900
+    volt_pulse = [np.exp(-(t_pulse-300)/900)/20 + 0.03, np.sqrt(t_pulse)/900 + 0.05]
+    volt_pulse = np.where(on, volt_pulse[1], volt_pulse[0])
+    cap_pulse = t_pulse/4500
+    cap_pulse[~on] = cap_pulse[on][-1]
+    
+    # every titration starts at the voltage and capacity at which the previous one ended
+    volt_steps = volt_pulse[-1]*np.where(np.arange(stop) < charges, 1.0, -1.0)
+    volt_in = np.cumsum(np.concatenate(([2.0], volt_steps[:-1])))[start:]
+    cap_steps = np.full(max(charges, pulses-charges)-1, cap_pulse[-1])
+    cap_in = np.concatenate(([0.0], np.cumsum(cap_steps)))[np.where(number < charges, number, number-charges)]
+    
+    data = {}
+    data['time'] = (t_pulse[None,:] + (540 + 8100*number)[:,None]).ravel()
+    data['volt'] = (volt_pulse[None,:]*charge[:,None] + volt_in[:,None]).ravel()
+    cap = cap_in[:,None] + cap_pulse[None,:]
+    if start < charges <= stop:
+        cap[charges-1-start,-1] = 0
+    cap = cap.ravel()
+    
+    if start == 0:
+        data['time'] = np.concatenate((np.linspace(0, 540, 10), data['time']))
+        data['volt'] = np.concatenate((np.full(10, 2.0), data['volt']))
+        cap = np.concatenate((np.zeros(10), cap))
+    
+    if noise > 0:
+        data['volt'] += np.random.default_rng([seed, start]).normal(0, noise, len(data['volt']))
+    if capacity == 'cap':
+        data['cap'] = cap
+    elif capacity == 'spec_cap':
+        data['spec_cap'] = cap/m_AM
+    if current:
+        # the capacity rises by 1/4500 mAh per second while current is applied
+        curr = (np.where(on, 3600/4500, 0.0)[None,:]*charge[:,None]).ravel()
+        if start == 0:
+            curr = np.concatenate((np.zeros(10), curr))
+        data['curr'] = curr
+    
+    return data
+
+'''
+This function writes mock GITT data from generate_GITT_data to an open file, with the column names
+and separator of a cycler from GITT_example_headers, the current in the unit of the cycler
+the data is generated and written in blocks of about block_rows rows, so the size of the file is not
+limited by the memory
+'''
+def write_GITT_synthetic(savefile, pulses=25, per_pulse=136, noise=0, seed=0, capacity='cap', header='biologic', block_rows=2**20, current=False):
+    import numpy as np
+    
+    splitter, names = GITT_example_headers[header]
+    labels = ['time','volt']
+    if capacity is not None:
+        labels.append(capacity)
+    if current:
+        labels.append('curr')
+    line = splitter.join(['%.8E']*len(labels))+'\n'
+    block = max(1, block_rows//per_pulse)
+    
+    with savefile as fw:
+        fw.write(splitter.join([names[label] for label in labels])+'\n')
+        for start in range(0, pulses, block):
+            data = generate_GITT_data(pulses, per_pulse, noise, seed, capacity, start, min(start+block, pulses), current=current)
+            if current:
+                data['curr'] /= GITT_current_factors[names['curr']]
+            rows = len(data['time'])
+            values = np.empty((rows, len(labels)))
+            for idx, label in enumerate(labels):
+                values[:,idx] = data[label]
+            fw.write((line*rows) % tuple(values.ravel().tolist()))
+
+'''
+this function fills an OriginLab worksheet with the columns of the 2-D array block in a single transfer,
+with long names, units, and comments of the columns as labels
+versions of originpro without Worksheet.from_np get the columns one by one with from_list
+'''
+def write_GITT_sheet(wks, block, labels, units, comments):
+    
+    wks.cols = block.shape[1]
+    if hasattr(wks, 'from_np'):
+        wks.from_np(block)
+        wks.set_labels(labels, 'L')
+        wks.set_labels(units, 'U')
+        wks.set_labels(comments, 'C')
+    else:
+        for idx in range(block.shape[1]):
+            wks.from_list(idx, block[:,idx], lname=labels[idx], units=units[idx], comments=comments[idx])
+
+'''
+this function saves the raw and processed GITT data into a OriginLab workbook,
+carrying over the name of the original file as label
+every worksheet is transferred as one block (see write_GITT_sheet), the half cycles start wherever the
+cycle exceeds all previous ones; with raw False, the raw data is not copied into the workbook,
+which takes most of the time for long measurements
+'''
+def write_GITT_2_origin(data_raw,titrations,settings,raw=True):
+    import numpy as np
+    import originpro as op
+    book = op.new_book(lname=settings['name'])
+    
+    # worksheet for raw data
+    if raw:
+        wks_raw = book.add_sheet(name='raw_data')
+        columns = [data_raw['time'], data_raw['volt']]
+        labels = ['Time','Voltage']
+        units = ['s','V']
+        if settings['cap']:
+            columns.append(data_raw['cap'])
+            labels.append('Capacity')
+            units.append('mAh')
+        elif settings['spec_cap']:
+            columns.append(data_raw['spec_cap'])
+            labels.append('Specific Capacity')
+            units.append('mAh/g')
+        write_GITT_sheet(wks_raw, np.column_stack(columns), labels, units, ['']*len(columns))
+    
+    # worksheet for processed data
+    wks_diff = book.add_sheet(name='diffusion_data')
+    results = get_GITT_result_columns(titrations, settings)
+    columns = [results['time'], results['volt'], results['D']] ### NO ERROR YET
+    labels = ['Time','Voltage','Diffusion Coefficient']
+    units = ['s','V','cm²/s']
+    comments = ['','','']
+    if settings['cap'] or settings['spec_cap']:
+        columns += [results['spec_cap'], results['ion'], results['cycle'] + 1]
+        labels += ['Specific Capacity','Content Conducting Ion','Half Cycle']
+        units += ['mAh/g','','']
+        comments += ['','','odd cycles: charge, even cycles: discharge']
+    block = np.column_stack(columns)
+    write_GITT_sheet(wks_diff, block, labels, units, comments)
+
+    if settings['cap'] or settings['spec_cap']:
+        # half cycle worksheets, without the column of the half cycle
+        cycle = results['cycle']
+        block_idx = np.flatnonzero(cycle > np.concatenate(([-1], np.maximum.accumulate(cycle)[:-1])))
+        bounds = np.append(block_idx, len(cycle))
+        
+        for idx in range(len(block_idx)):
+            if idx%2 == 0:
+                name = 'Charge {}'.format(1+idx//2)
+            else:
+                name = 'Discharge {}'.format(1+idx//2)
+            
+            wks_cyc = book.add_sheet(name=name)
+            write_GITT_sheet(wks_cyc, block[bounds[idx]:bounds[idx+1],:-1], labels[:-1], units[:-1], comments[:-1])
+
+'''
+function outputs diffusion data
+Format: 
+    table of titrations from analyze_GITT (see new_GITT_titrations)
+    the time at which the current is switched on and the voltage E1 before are written with
+    the diffusion coefficient D
+    
+    if capacity data is supplied, output also contains
+    'ion' (content of the conducting ion)
+    'spec_cap' (special capacity)
+    'cycle' (current cycle, usually 0 is first charge, 1 is first discharge, 2 is second charge, etc.)
+
+    if the uncertainty was determined by Monte Carlo sampling, output also contains
+    the 2.5, 50, and 97.5 percentiles of the diffusion rate
+
+without header, only the rows are written, e.g., to append newly evaluated titrations to an existing file
+the rows are formatted from the arrays of get_GITT_result_columns and written in blocks of block_rows rows
+'''
+def write_GITT_data(savefile,titrations,settings,header=True,block_rows=65536):
+    import numpy as np
+    
+    columns = get_GITT_result_columns(titrations, settings)
+    
+    if settings['cap'] or settings['spec_cap']:
+        names = ['time','volt','ion','spec_cap','D','cycle']
+        line = '%16.10e,%16.10e,%16.10e,%16.10e,%16.10e,%4d'
+        head = '{:16},{:16},{:16},{:16},{:16},{:16}'.format('time/s','volt/V','x_ion','SpecCap/mAh/g','D/cm^2/s','Cycle') ### NO ERROR YET
+    else:
+        names = ['time','volt','D']
+        line = '%16.10e,%16.10e,%16.10e'
+        head = '{:16},{:16},{:16}'.format('time/s','volt/V','D/cm^2/s')
+    # percentiles of D from Monte Carlo sampling are appended as last columns
+    if 'D_2.5' in columns:
+        names += ['D_2.5','D_50','D_97.5']
+        line += ',%16.10e,%16.10e,%16.10e'
+        head += ',{:16},{:16},{:16}'.format('D_2.5%/cm^2/s','D_50%/cm^2/s','D_97.5%/cm^2/s')
+    line += '\n'
+    
+    # the rows are formatted in blocks with a single %-operation each
+    values = np.column_stack([columns[name] for name in names]) if len(columns['time']) > 0 else np.empty((0, len(names)))
+    with savefile as f:
+        if header:
+            f.write(head+'\n')
+        for first in range(0, len(values), block_rows):
+            block = values[first:first+block_rows]
+            f.write((line*len(block)) % tuple(block.ravel().tolist()))
+
+'''
+function collects the columns of the table of titrations from analyze_GITT that are written as results,
+as contiguous arrays with the names
+    'time' (t_on), 'volt' (E1), 'D', 'D_err', and, with capacity data, 'ion', 'ion_err', 'spec_cap', 'spec_cap_err',
+    and 'cycle' (integer), and, with Monte Carlo sampling, the percentiles 'D_2.5', 'D_50', and 'D_97.5'
+returns a dictionary of float64 arrays, except for the cycle
+'''
+def get_GITT_result_columns(titrations, settings):
+    import numpy as np
+    
+    names = ['D','D_err']
+    if settings['cap'] or settings['spec_cap']:
+        names += ['ion','ion_err','spec_cap','spec_cap_err','cycle']
+    if 'D_50' in titrations.dtype.names:
+        names += ['D_2.5','D_50','D_97.5']
+    
+    columns = {}
+    columns['time'] = np.ascontiguousarray(titrations['t_on'])
+    columns['volt'] = np.ascontiguousarray(titrations['E1'])
+    for name in names:
+        columns[name] = np.ascontiguousarray(titrations[name])
+    
+    return columns
+
+'''
+units of the columns of get_GITT_result_columns, stored with the binary formats
+'''
+GITT_result_units = {
+    'time':         's',
+    'volt':         'V',
+    'D':            'cm^2/s',
+    'D_err':        'cm^2/s',
+    'ion':          '',
+    'ion_err':      '',
+    'spec_cap':     'mAh/g',
+    'spec_cap_err': 'mAh/g',
+    'cycle':        '',
+    'D_2.5':        'cm^2/s',
+    'D_50':         'cm^2/s',
+    'D_97.5':       'cm^2/s'
+    }
+
+'''
+function writes the table of titrations to the file name in the format given by its extension,
+with all columns of get_GITT_result_columns in full precision
+    .csv            CSV-file as written by write_GITT_data
+    .npz            numpy archive with one array per column and the units as array 'units'
+    .parquet        Apache Parquet table, the units are stored in the metadata (requires pyarrow)
+    .h5, .hdf5      HDF5-file with one dataset per column in group 'diffusion', the units as attributes
+                    (requires h5py)
+raises GITT_error for other extensions or if the required package is not installed
+'''
+def write_GITT_results(file, titrations, settings):
+    import os
+    import numpy as np
+    
+    extension = os.path.splitext(file)[1].lower()
+    if extension == '.csv':
+        write_GITT_data(open(file, mode='w'), titrations, settings)
+        return
+    
+    columns = get_GITT_result_columns(titrations, settings)
+    if extension == '.npz':
+        units = np.array([GITT_result_units[name] for name in columns])
+        np.savez(file, units=units, **columns)
+    elif extension == '.parquet':
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise GITT_error('Missing package', 'Writing Parquet-files requires the python package pyarrow.')
+        table = pyarrow.table(columns)
+        table = table.replace_schema_metadata({'units': ','.join(GITT_result_units[name] for name in columns)})
+        pyarrow.parquet.write_table(table, file)
+    elif extension in ['.h5','.hdf5']:
+        try:
+            import h5py
+        except ImportError:
+            raise GITT_error('Missing package', 'Writing HDF5-files requires the python package h5py.')
+        with h5py.File(file, mode='w') as f:
+            group = f.create_group('diffusion')
+            for name, column in columns.items():
+                group.create_dataset(name, data=column)
+                group[name].attrs['units'] = GITT_result_units[name]
+    else:
+        raise GITT_error('Unknown format', 'The results can be written as .csv, .npz, .parquet, or .h5, not as {}.'.format(extension))
+
+'''
+This function writes a GITT project file (.gittproj), which keeps everything needed to reopen a measurement
+without reading and analyzing the raw data again: the raw data GITT_data, the numerical settings p_val with
+their errors, and, if given, the table of titrations with the detected pulse indices (see GITT_titration_fields),
+the flags 'cap' and 'spec_cap' of the analysis from settings, its messages, and the options detection, timing,
+samples, and seed with which analyze_GITT was called
+
+the project is a zip archive with the members
+    manifest.json           version, source file, number of rows, settings, flags, messages, options,
+                            and the layout of the raw data
+    raw/<label>/<n>.npy     the raw data columns in chunks of chunk_rows rows, compressed with deflate
+                            at compresslevel
+    titrations.npy          the table of titrations, not compressed, so it can be memory-mapped
+the project is written to a temporary file first and only replaces file once it is complete
+the projects are opened with GITT_project
+'''
+def write_GITT_project(file, GITT_data, p_val, titrations=None, settings={}, messages=[], source='', detection='auto', timing=False, samples=0, seed=0, chunk_rows=2**20, compresslevel=1, report=GITT_no_report):
+    import datetime
+    import json
+    import os
+    import time
+    import zipfile
+    import numpy as np
+
+    manifest = {
+        'format':           'GITT project',
+        'version':          GITT_project_version,
+        'result_version':   GITT_result_version,
+        'created':          datetime.datetime.now().isoformat(timespec='seconds'),
+        'source':           os.path.basename(source),
+        'rows':             len(GITT_data['time']),
+        'settings':         {key: [float(p_val[key][0]), float(p_val[key][1])] for key in GITT_defaults},
+        'flags':            {key: bool(settings.get(key, False)) for key in ['cap','spec_cap']},
+        'messages':         [list(message) for message in messages],
+        'detection':        detection,
+        'timing':           bool(timing),
+        'samples':          int(samples),
+        'seed':             int(seed),
+        'titrations':       titrations is not None,
+        'raw':              {}
+        }
+
+    temporary = file+'.tmp'
+    with report.stage('project'):
+        try:
+            with zipfile.ZipFile(temporary, mode='w', compression=zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as archive:
+                for label, column in GITT_data.items():
+                    column = np.asarray(column)
+                    chunks = max(1, -(-len(column)//chunk_rows))
+                    manifest['raw'][label] = {'dtype': column.dtype.str, 'chunk_rows': chunk_rows, 'chunks': chunks}
+                    for number in range(chunks):
+                        with archive.open('raw/{}/{}.npy'.format(label, number), mode='w', force_zip64=True) as f:
+                            np.lib.format.write_array(f, np.ascontiguousarray(column[number*chunk_rows:(number+1)*chunk_rows]), allow_pickle=False)
+                if titrations is not None:
+                    info = zipfile.ZipInfo('titrations.npy', date_time=time.localtime()[:6])
+                    info.compress_type = zipfile.ZIP_STORED
+                    with archive.open(info, mode='w', force_zip64=True) as f:
+                        np.lib.format.write_array(f, np.ascontiguousarray(titrations), allow_pickle=False)
+                archive.writestr('manifest.json', json.dumps(manifest, indent=2))
+            os.replace(temporary, file)
+        except OSError as error:
+            if os.path.isfile(temporary):
+                os.remove(temporary)
+            raise GITT_error('Project not written', 'The project {} could not be written: {}'.format(file, error))
+        report.count(rows=manifest['rows'], bytes=os.path.getsize(file))
+
+
+# METHODS
+'''
+function returns values as numpy array of floats for the analysis
+float32 columns of raw data stored in single precision (see GITT_precisions) are kept as they are, so
+they are not copied as a whole, and only the points taken from them are converted to float64;
+everything else is converted to float64
+'''
+def get_GITT_floats(values):
+    import numpy as np
+
+    values = np.asarray(values)
+    if values.dtype == np.float32:
+        return values
+
+    return np.asarray(values, dtype=np.float64)
+
+'''
+function produces a numerical derivative of a given pair of x and y-values
+slope at x determined with formula f(x+delta)-f(x-delta)/(2*delta),
+first and last point use the one-sided slope to their only neighbor
+the x-values do not need to be evenly spaced
+
+duplicate x-values (e.g., two points logged with the same time stamp) would divide by zero,
+the derivative is set to 0 for these points instead
+the differences are taken in float64, also for y in single precision
+returns a float64 numpy array of the same length as x
+'''
+def get_numerical_derivative(x,y):
+    import numpy as np
+
+    x = np.asarray(x, dtype=np.float64)
+    y = get_GITT_floats(y)
+
+    derivative = np.zeros(len(x))
+    if len(x) < 2:
+        return derivative
+
+    dx = np.empty(len(x))
+    dy = np.empty(len(x))
+    dx[0] = x[1]-x[0]
+    dy[0] = y[1]-y[0]
+    dx[-1] = x[-1]-x[-2]
+    dy[-1] = y[-1]-y[-2]
+    np.subtract(x[2:], x[:-2], out=dx[1:-1])
+    np.subtract(y[2:], y[:-2], out=dy[1:-1], dtype=np.float64)
+
+    np.divide(dy, dx, out=derivative, where=dx != 0)
+
+    return derivative
+
+'''
+function detects when the current is applied and removed from jumps in the derivative of the voltage
+makes this less dependent on format of GITT data
+
+a jump is a candidate if the derivative exceeds scale times the magnitude of the previous derivative
+as well as the cutoff, positive jumps only count while no current is applied (load off) and negative
+jumps only count while current is applied (load on), so the detected jumps alternate
+
+the candidates are found with array operations and the alternation is resolved on the candidates alone:
+of every run of candidates with the same sign, only the first one switches the load, and a leading
+run of jumps that would not switch the load is ignored
+whether a jump switches the current on or off depends on the voltage relative to the last time
+the current was switched on, since the meaning of the jumps flips between charge and discharge
+
+only points from start on are checked; state carries 'load' and the voltage 'E_on' of the last
+switch-on over between calls on a growing measurement and is updated in place
+
+the number of candidates is counted in report
+returns two integer arrays with the indices of the points at which the current is switched on and off
+'''
+def get_GITT_edges(y, y_deriv, scale, cutoff, start=0, state=None, report=GITT_no_report):
+    import numpy as np
+
+    y_deriv = np.asarray(y_deriv, dtype=np.float64)
+
+    # the first point is compared with the last one, as in the original point-by-point loop
+    previous = np.empty(len(y_deriv)-start)
+    previous[1:] = y_deriv[start:-1]
+    previous[:1] = y_deriv[start-1]
+    threshold = np.abs(scale*previous)
+    window = y_deriv[start:]
+    rising = np.flatnonzero((window > threshold) & (window > cutoff)) + start
+    falling = np.flatnonzero((window < -threshold) & (window < -cutoff)) + start
+
+    candidates = np.concatenate((rising, falling))
+    direction = np.concatenate((np.ones(len(rising), dtype=bool), np.zeros(len(falling), dtype=bool)))
+    order = np.argsort(candidates, kind='stable')
+    report.count(candidates=len(candidates))
+
+    return resolve_GITT_edges(y, candidates[order], direction[order], state)
+
+'''
+function resolves the sorted candidates for jumps into the points at which the current is switched on and off,
+direction is True for positive jumps, see get_GITT_edges
+
+after keeping only the first candidate of every run, the jumps alternate in direction, so as long as the
+titrations continue in the same direction, every second jump switches the current on and the voltage
+at every jump only has to be compared with the one or two jumps before:
+    switch-off:     voltage rose (charge) or did not rise (discharge) since the last switch-on
+    next switch-on: voltage rose (charge) or did not rise (discharge) since the last switch-on
+these comparisons are done for all jumps at once, and only the jumps at which they fail, e.g., at the
+turn from charge to discharge, are resolved one by one
+'''
+def resolve_GITT_edges(y, candidates, direction, state=None):
+    import bisect
+    import numpy as np
+
+    if state is None:
+        state = {'load': False, 'E_on': None}
+
+    first_of_run = np.ones(len(candidates), dtype=bool)
+    first_of_run[1:] = direction[1:] != direction[:-1]
+    if len(direction) > 0 and direction[0] == state['load']:
+        first_of_run[0] = False
+
+    candidates = candidates[first_of_run]
+    direction = direction[first_of_run]
+    volt = get_GITT_floats(y)[candidates].astype(np.float64, copy=False)
+    jumps = len(candidates)
+
+    # comparison with the jump before (switch-off) and two jumps before (next switch-on)
+    rising_1 = np.zeros(jumps, dtype=bool)
+    rising_1[1:] = volt[:-1] < volt[1:]
+    rising_2 = np.zeros(jumps, dtype=bool)
+    rising_2[2:] = volt[:-2] < volt[2:]
+    consistent_off = rising_1 != direction
+    consistent_on = rising_2 == direction
+
+    # jumps that break the pattern, for switch-ons at even and at odd positions
+    even = (np.arange(jumps) % 2) == 0
+    breaks = [np.flatnonzero(~np.where(even, consistent_on, consistent_off)).tolist(),
+              np.flatnonzero(~np.where(even, consistent_off, consistent_on)).tolist()]
+
+    is_on = np.zeros(jumps, dtype=bool)
+    direction_list = direction.tolist()
+    volt_list = volt.tolist()
+    E_on = state['E_on']
+    pos = 0
+    while pos < jumps:
+        # switches meaning of jump depending of whether the cell is currently being charged or discharged
+        rising_voltage = E_on is None or E_on < volt_list[pos]
+        if direction_list[pos] != rising_voltage:
+            pos += 1
+            continue
+
+        # the pattern holds from the switch-on at pos up to the next break
+        parity_breaks = breaks[pos % 2]
+        idx = bisect.bisect_right(parity_breaks, pos)
+        end = parity_breaks[idx] if idx < len(parity_breaks) else jumps
+        is_on[pos:end:2] = True
+        E_on = volt_list[pos + 2*((end-1-pos)//2)]
+        pos = end
+
+    state['E_on'] = E_on
+    if jumps > 0:
+        state['load'] = direction_list[-1]
+
+    return candidates[is_on], candidates[~is_on]
+
+'''
+function detects when the current is applied and removed from the measured current, in a single pass
+without settings to tune; a point is under current if the magnitude of its current exceeds tolerance
+times the largest magnitude in the measurement, which ignores the offset of the current at rest
+as for the jumps in get_GITT_edges, the current is switched on at the last point at rest before a
+titration and switched off at the last point under current
+the number of switches is counted in report
+
+to continue the detection for data that grows (see GITT_follower), only the switches between the points
+from start on are returned, and maximum replaces the largest magnitude of the current
+returns two integer arrays with the indices of the points at which the current is switched on and off
+'''
+def get_GITT_current_edges(current, tolerance=0.01, report=GITT_no_report, start=0, maximum=None):
+    import numpy as np
+
+    current = np.abs(get_GITT_floats(current[start:]))
+    if len(current) == 0:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    if maximum is None:
+        maximum = np.max(current)
+
+    active = current > tolerance*maximum
+    edges = np.flatnonzero(active[1:] != active[:-1])
+    report.count(candidates=len(edges))
+
+    return edges[~active[edges]]+start, edges[active[edges]]+start
+
+'''
+function fits the voltage while the current is applied against the square root of the time since the
+current was switched on, for all titrations at once
+for every titration, only the points in the second half of the time with current applied are used,
+i.e., on <= j < off with x[j]-x[on] > tau/2
+
+the sums for the regressions are collected for all titrations in one pass over the concatenated
+points and give the same results as scipy.stats.linregress for every titration
+titrations with fewer than two points or without spread in time cannot be fitted and are marked
+as not valid
+
+returns a dictionary with arrays 'slope', 'intercept', 'slope_err', 'intercept_err', 'r2', and 'valid',
+as well as the number of points 'n', their mean 'x_mean' and variance 'ssxm' in sqrt(t)
+'''
+def get_sqrt_regression(x, y, on, off):
+    import numpy as np
+
+    x = np.asarray(x, dtype=np.float64)
+    y = get_GITT_floats(y)
+    on = np.asarray(on, dtype=np.intp)
+    off = np.asarray(off, dtype=np.intp)
+    pulses = len(on)
+    tau = x[off]-x[on]
+
+    # indices of all points with current applied, labeled with the number of their titration
+    length = np.maximum(off-on, 0)
+    pulse = np.repeat(np.arange(pulses), length)
+    first = np.cumsum(length)-length
+    idx = np.arange(len(pulse)) - first[pulse] + on[pulse]
+
+    dt = x[idx]-x[on[pulse]]
+    keep = dt > tau[pulse]/2
+    pulse = pulse[keep]
+    interval_x = np.sqrt(dt[keep])
+    interval_y = y[idx[keep]].astype(np.float64, copy=False)
+    del dt, idx
+
+    n = np.bincount(pulse, minlength=pulses).astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_mean = np.bincount(pulse, weights=interval_x, minlength=pulses)/n
+        y_mean = np.bincount(pulse, weights=interval_y, minlength=pulses)/n
+        interval_x -= x_mean[pulse]
+        interval_y -= y_mean[pulse]
+        ssxm = np.bincount(pulse, weights=interval_x*interval_x, minlength=pulses)/n
+        ssxym = np.bincount(pulse, weights=interval_x*interval_y, minlength=pulses)/n
+        ssym = np.bincount(pulse, weights=interval_y*interval_y, minlength=pulses)/n
+
+        valid = (n >= 2) & (ssxm > 0)
+
+        r = ssxym/np.sqrt(ssxm*ssym)
+        r = np.clip(r, -1, 1)
+        undefined = (ssxm == 0) | (ssym == 0)
+        r[undefined] = np.where(ssxym[undefined] == 0, np.nan, 0.0)
+
+        slope = ssxym/ssxm
+        intercept = y_mean - slope*x_mean
+
+        df = n-2
+        slope_err = np.sqrt((1-r**2)*ssym/ssxm/df)
+        slope_err[n == 2] = 0
+        intercept_err = slope_err*np.sqrt(ssxm + x_mean**2)
+
+    return {
+        'slope':            slope,
+        'intercept':        intercept,
+        'slope_err':        slope_err,
+        'intercept_err':    intercept_err,
+        'r2':               r**2,
+        'valid':            valid,
+        'n':                n,
+        'x_mean':           x_mean,
+        'ssxm':             ssxm
+        }
+
+'''
+table of the titrations detected in a GITT measurement, used by all later steps of the analysis
+every titration is described by the indices of the raw data points at which the current is switched on,
+the next point at which it is switched off, and the point at which the next titration starts
+(or the last point of the measurement for the final titration), all stored as integer arrays
+
+the first detected titration is discarded, because the relaxation before it is unknown
+the pairing of every titration with the next switch-off is a single sorted search on the switch-offs,
+a titration without later switch-off is paired with the last one, as before
+previous_off is the switch-off from which the relaxation before the first titration is measured,
+last_on the point at which the titration after the final one starts (default: the last point)
+'''
+class GITT_pulse_table:
+
+    def __init__(self, x, y, current_on, current_off, previous_off=0, last_on=None):
+        import numpy as np
+
+        x = np.asarray(x)
+        y = np.asarray(y)
+        current_on = np.asarray(current_on, dtype=np.intp)
+        current_off = np.asarray(current_off, dtype=np.intp)
+
+        # position of the titration in current_on
+        self.number = np.arange(1, len(current_on), dtype=np.intp)
+        self.on = current_on[1:]
+
+        if len(current_off) == 0:
+            self.off = np.zeros(len(self.on), dtype=np.intp)
+        else:
+            idx = np.searchsorted(current_off, self.on, side='right')
+            self.off = current_off[np.minimum(idx, len(current_off)-1)]
+
+        self.next_on = np.empty(len(self.on), dtype=np.intp)
+        self.next_on[:-1] = current_on[2:]
+        self.next_on[-1:] = len(y)-1 if last_on is None else last_on
+
+        # relaxation before every titration, measured from the previous switch-off
+        previous_off = np.concatenate(([previous_off], self.off[:-1])).astype(np.intp)
+
+        self.t_on = x[self.on]
+        self.t_off = x[self.off]
+        self.tau = self.t_off - self.t_on
+        self.relax = self.t_on - x[previous_off]
+        self.E1 = y[self.on].astype(np.float64, copy=False)
+        self.E4 = y[self.next_on].astype(np.float64, copy=False)
+
+    def __len__(self):
+        return len(self.on)
+
+'''
+function determines the points at which a new half cycle (charge or discharge) starts
+Biologic capacity ('cap') is reset to 0 for every new half cycle and only ever rises, so every drop
+in capacity starts a new half cycle
+
+for specific capacity ('spec_cap'), a new half cycle starts when the specific capacity falls below
+1E-4 of its maximum since the last reset, which depends on all previous resets, so candidates are
+found with the running maximum of the whole measurement and only these are checked one by one,
+using the maxima between consecutive candidates
+
+only points from start on are checked; state carries the maximum 'max_cap' since the last reset over
+between calls on a growing measurement and is updated in place
+returns the indices at which a new half cycle starts and the capacity reached in the half cycle before
+'''
+def get_half_cycles(capacity, mode, start=0, state=None):
+    import numpy as np
+
+    capacity = get_GITT_floats(capacity)
+    if state is None:
+        state = {'max_cap': 0}
+    # the first two points never start a new half cycle
+    start = max(start, 2)
+
+    if mode == 'cap':
+        resets = np.flatnonzero(np.diff(capacity[start-1:]) < 0) + start
+        return resets, capacity[resets-1].astype(np.float64, copy=False)
+
+    resets = []
+    reached = []
+    if len(capacity) <= start:
+        return np.array(resets, dtype=np.intp), np.array(reached)
+
+    window = capacity[start:]
+    running_max = np.maximum(np.maximum.accumulate(window), state['max_cap'])
+    candidates = np.flatnonzero((window > 1E-4) & (window < 1E-4*running_max))
+
+    max_cap = state['max_cap']
+    if len(candidates) > 0:
+        starts = np.concatenate(([0], candidates[:-1]+1))
+        segment_max = np.maximum.reduceat(window[:candidates[-1]+1], starts)
+
+        for idx, candidate in enumerate(candidates.tolist()):
+            max_cap = max(max_cap, segment_max[idx])
+            if window[candidate] < 1E-4*max_cap:
+                resets.append(candidate+start)
+                reached.append(max_cap)
+                max_cap = 0
+        window = window[candidates[-1]+1:]
+
+    if len(window) > 0:
+        max_cap = max(max_cap, window.max())
+    state['max_cap'] = max_cap
+
+    return np.array(resets, dtype=np.intp), np.array(reached, dtype=np.float64)
+
+'''
+function calculates specific capacity, ion content, and the current half cycle at the raw data points idx
+the capacity data is taken from GITT_data, preferring specific capacity over capacity
+half cycles are counted from 0 (first charge), the specific capacity is counted relative to the start
+of the measurement, adding up charge and subtracting discharge
+
+only the requested points are evaluated, nothing is stored for the other points of the measurement
+half_cycles are the resets and reached capacities from get_half_cycles, if they are already known
+returns a dictionary with arrays 'spec_cap', 'spec_cap_err', 'ion', 'ion_err', and 'cycle'
+'''
+def get_GITT_capacity(GITT_data, idx, p_val, half_cycles=None):
+    import numpy as np
+
+    idx = np.asarray(idx, dtype=np.intp)
+
+    if 'spec_cap' in GITT_data:
+        mode = 'spec_cap'
+    else:
+        mode = 'cap'
+    capacity = np.asarray(GITT_data[mode])
+    if half_cycles is None:
+        half_cycles = get_half_cycles(capacity, mode)
+    resets, reached = half_cycles
+
+    # the capacity reached is added at the end of a charge and subtracted at the end of a discharge
+    ref_cap = np.concatenate(([0], np.cumsum(np.where(np.arange(len(reached)) % 2 == 0, reached, -reached))))
+
+    # the half cycle is reported as counted before the point, the capacity as counted after it
+    cycle = np.searchsorted(resets, idx, side='left')
+    count = np.searchsorted(resets, idx, side='right')
+    charge = count % 2 == 0
+
+    spec_cap = np.where(charge, ref_cap[count] + capacity[idx], ref_cap[count] - capacity[idx])
+    if mode == 'cap':
+        spec_cap = spec_cap/p_val['m_AM'][0]
+        spec_cap_err = np.full(len(idx), p_val['m_AM'][1]/p_val['m_AM'][0]**2)
+    else:
+        # cannot compute error without errors from measurement yet
+        spec_cap_err = np.zeros(len(idx))
+
+    ion = -spec_cap/p_val['refcap'][0] + p_val['c0'][0]
+
+    d_spec_cap = spec_cap_err/p_val['refcap'][0]
+    d_ref_cap = p_val['refcap'][1]*spec_cap/p_val['refcap'][0]**2
+    d_c0 = p_val['c0'][1]
+    ion_err = np.sqrt(d_spec_cap**2+d_ref_cap**2+d_c0**2)
+
+    return {
+        'spec_cap':     spec_cap,
+        'spec_cap_err': spec_cap_err,
+        'ion':          ion,
+        'ion_err':      ion_err,
+        'cycle':        cycle
+        }
+
+'''
+function calculates the diffusion coefficients and their uncertainties for all titrations at once,
+following equation 16 of the mini-review by Kim et al. (DOI: https://doi.org/10.33961/jecst.2021.00836)
+    D = 4/(pi*tau) * (m_AM*V_mol/(M_AM*A))^2 * ((E4-E1)/(E3-E2))^2
+
+tau is an array of titration times, E1 to E4 are pairs [values, errors] of arrays,
+p_val contains the pairs [value, error] of the material and measurement properties
+the uncertainty includes the contributions of A and of E1 to E4
+
+returns the arrays D and D_err
+'''
+def get_diffusion_coefficient(tau, E1, E2, E3, E4, p_val):
+    import numpy as np
+
+    dE_s = np.asarray(E4[0]) - np.asarray(E1[0])
+    dE_t = np.asarray(E3[0]) - np.asarray(E2[0])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pf = get_diffusion_prefactor(tau, p_val)
+        D = pf * (dE_s/dE_t)**2
+
+        # partial derivatives of D times the uncertainty of the respective quantity
+        d_A = 2*D/p_val['A'][0] * p_val['A'][1]
+        d_E_s = 2*pf*dE_s/dE_t**2
+        d_E_t = 2*D/dE_t
+        d_E1 = d_E_s*np.asarray(E1[1])
+        d_E2 = d_E_t*np.asarray(E2[1])
+        d_E3 = d_E_t*np.asarray(E3[1])
+        d_E4 = d_E_s*np.asarray(E4[1])
+
+        D_err = np.sqrt(d_A**2+d_E1**2+d_E2**2+d_E3**2+d_E4**2)
+
+    return D, D_err
+
+'''
+function calculates the prefactor 4/(pi*tau) * (m_AM*V_mol/(M_AM*A))^2 of equation 16 from the values
+of the settings, which may also be arrays of samples
+'''
+def get_diffusion_prefactor(tau, p_val):
+    import numpy as np
+
+    tau = np.asarray(tau, dtype=np.float64)
+    prefactor = (p_val['m_AM'][0] * p_val['V_mol'][0]/(p_val['M_AM'][0]*p_val['A'][0]))**2
+
+    with np.errstate(divide='ignore'):
+        return 4/(np.pi*tau) * prefactor
+
+'''
+This function converts the numerical settings into pairs [value, error] used by the analysis
+values is a dictionary with the entries of the settings as strings or numbers,
+errors is an optional dictionary with the uncertainties of some of the settings, all others are exact
+the mass m_AM and the molar volume V_mol are derived from the settings
+'''
+def get_GITT_parameters(values, errors={}):
+    
+    p_list = ['A','m_AM/A','M_AM','refcap','c0','rho','scale','limiter']
+    p_val = {}
+    
+    for p_key in p_list:
+        p_val[p_key] = [0,0]
+        try:
+            p_val[p_key][0] = float(values[p_key])
+            if p_key in errors:
+                p_val[p_key][1] = float(errors[p_key])
+        except:
+            raise GITT_error('Faulty Settings','The setting {} contains non-numerical data. Please check setting and correct.'.format(p_key))
+    
+    return derive_GITT_parameters(p_val)
+
+'''
+This function adds the mass m_AM and the molar volume V_mol with their uncertainties to the settings p_val
+the values may also be arrays of samples of the settings
+'''
+def derive_GITT_parameters(p_val):
+    import numpy as np
+    
+    def calculate_m_AM(m_AM_A,A):
+        
+        m_AM = m_AM_A[0] * A[0] / 1000
+        
+        d_m_AM_A = m_AM_A[1]/(1000*A[0])
+        d_A = A[1]*m_AM_A[0]/(1000*A[0]**2)        
+        m_AM_err = np.sqrt(d_A**2+d_m_AM_A**2)
+        
+        return m_AM, m_AM_err
+    
+    p_val['m_AM'] = calculate_m_AM(p_val['m_AM/A'],p_val['A'])
+    
+    def calculate_V_mol(M_AM,rho):
+        
+        V_mol = M_AM[0] / rho[0]
+        
+        d_M_AM = M_AM[1]/(rho[0])
+        d_rho = rho[1]*M_AM[0]/(rho[0]**2)        
+        V_mol_err = np.sqrt(d_M_AM**2+d_rho**2)
+        
+        return V_mol, V_mol_err
+    
+    p_val['V_mol'] = calculate_V_mol(p_val['M_AM'],p_val['rho'])
+    
+    return p_val
+
+'''
+This function checks whether there are issues with the titration lengths
+sorts the titrations into buckets shorter than, close to, and longer than the median titration time
+returns the buckets and a list of messages (kind, title, text)
+'''
+def evaluate_tau(taus,relaxes,timing=False):
+    import numpy as np
+    
+    messages = []
+    taus = np.asarray(taus, dtype=np.float64)
+    median_tau = np.median(taus)
+    median_rlx = np.median(relaxes)
+    
+    close = (taus > 0.95*median_tau) & (taus < 1.05*median_tau)
+    long = ~close & (taus > 1.05*median_tau)
+    short = ~close & ~long & (taus < 0.95*median_tau)
+    buckets = [int(np.count_nonzero(short)),int(np.count_nonzero(close)),int(np.count_nonzero(long))]
+    tot_length = [np.sum(taus[short]),np.sum(taus[close]),np.sum(taus[long])]
+    
+    if tot_length[2] > tot_length[1] or buckets[2] > 0.01*buckets[1]:
+        messages.append(('warning','Check Results','A significant number of abnormally long titration cycles was obtained, indicating that the program failed to correctly identify all titration cycles. Please reduce the settings \'scale\' and \'limiter\'.'))
+    
+    if median_tau > median_rlx/4:
+        messages.append(('warning','Titration timings','''Titration duration
+Current applied for {:.2f} s
+Relaxing for {:.2f} s
+Relaxation time is relatively short compared to charging time. Make sure that the relaxation is sufficiently long!'''.format(median_tau,median_rlx)))
+    elif timing:
+        messages.append(('info','Titration timings','''Titration duration
+Current applied for {:.2f} s
+Relaxing for {:.2f} s'''.format(median_tau,median_rlx)))
+    
+    return buckets, messages
+
+'''
+This function evaluates the titrations of a pulse table, from the regression of E2 and E3 to the
+diffusion coefficients, as arrays with one entry for every titration with a successful regression
+half_cycles are passed on to get_GITT_capacity, if they are already known
+returns a dictionary with the pairs [values, errors] 'E1' to 'E4', 'D', and, with capacity data, 'ion' and
+'spec_cap', the arrays 'tau', 't_on', 't_off', 'r2', 'relax', and 'cycle', the indices 'on', 'off', and
+'next_on' of the pulse table, the number of bad fits 'bad_fit', and the regressions 'fit' as returned by get_sqrt_regression
+the stages 'regression', 'capacity', and 'diffusion' are recorded in report
+'''
+def get_GITT_pulse_results(GITT_data,pulses,p_val,settings,half_cycles=None,report=GITT_no_report):
+    import numpy as np
+    
+    x = GITT_data['time']
+    y = GITT_data['volt']
+    
+    # E2 requires linear regression for sqrt-behavior while current is applied
+    # E2 and E3 are obtained for all titrations at once
+    with report.stage('regression'):
+        regress_param = get_sqrt_regression(x, y, pulses.on, pulses.off)
+        bad_fit = np.count_nonzero(regress_param['valid'] & (regress_param['r2'] < 0.99))
+        
+        # only titrations with a successful regression are evaluated further, this also leaves out
+        # a last switch-on without switch-off, whose negative tau has no square root
+        valid = regress_param['valid']
+        count = np.count_nonzero(valid)
+        sqrt_tau = np.sqrt(pulses.tau[valid])
+        E2_valid = [regress_param['intercept'][valid], regress_param['intercept_err'][valid]]
+        E3_valid = [regress_param['slope'][valid]*sqrt_tau + E2_valid[0],
+                    np.sqrt((regress_param['slope_err'][valid]*sqrt_tau)**2 + E2_valid[1]**2)]
+        report.count(pulses=len(pulses), valid=count, bad_fits=bad_fit)
+    results = {'bad_fit': bad_fit}
+    
+    # calculate specific capacity, current cycle, and ion content for every titration
+    # the +1 is a fix to properly process Arbin data, a jump at the very last point stays there
+    if settings['cap'] or settings['spec_cap']:
+        with report.stage('capacity'):
+            capacity = get_GITT_capacity(GITT_data, np.minimum(pulses.on[valid]+1, len(x)-1), p_val, half_cycles)
+            results['ion'] = [capacity['ion'],capacity['ion_err']]
+            results['spec_cap'] = [capacity['spec_cap'],capacity['spec_cap_err']]
+            results['cycle'] = capacity['cycle']
+            report.count(titrations=count)
+    
+    # determination of E1 to E4
+    # E1 and E4 are single points, their uncertainty is the scatter of the voltage around the regression
+    # of the titration, i.e., the standard deviation of its residuals
+    with np.errstate(invalid='ignore'):
+        scatter = regress_param['slope_err'][valid]*np.sqrt(regress_param['ssxm'][valid]*regress_param['n'][valid])
+    E1 = [pulses.E1[valid],scatter]
+    E2 = E2_valid
+    E3 = E3_valid
+    E4 = [pulses.E4[valid],scatter]
+    
+    # check if E2 is lower than E1 during charge or higher during discharge, set E2 to E1
+    expol = ((E2[0] < E3[0]) & (E2[0] < E1[0])) | ((E2[0] > E3[0]) & (E2[0] > E1[0]))
+    E2 = [np.where(expol,E1[0],E2[0]),np.where(expol,E1[1],E2[1])]
+    bad_expol = np.count_nonzero(expol)
+    
+    # calculation of the diffusion constants
+    with report.stage('diffusion'):
+        results['tau'] = pulses.tau[valid]
+        results['D'] = list(get_diffusion_coefficient(results['tau'], E1, E2, E3, E4, p_val))
+        report.count(titrations=count, bad_extrapolations=bad_expol)
+    
+    results.update({'E1': E1, 'E2': E2, 'E3': E3, 'E4': E4})
+    results['t_on'] = pulses.t_on[valid]
+    results['t_off'] = pulses.t_off[valid]
+    results['r2'] = regress_param['r2'][valid]
+    results['relax'] = pulses.relax[valid]
+    results['on'] = pulses.on[valid]
+    results['off'] = pulses.off[valid]
+    results['next_on'] = pulses.next_on[valid]
+    results['fit'] = {key: value[valid] for key, value in regress_param.items()}
+    
+    return results
+
+'''
+This function propagates the uncertainties of the settings and of the regressions into the diffusion
+coefficients by Monte Carlo sampling, as an alternative to the partial analytic propagation
+results are the arrays of the titrations as returned by get_GITT_pulse_results
+
+every sample draws the settings A, m_AM/A, M_AM, and rho from normal distributions with their errors,
+shared by all titrations of the sample, and for every titration the slope and the mean voltage of the
+regression with their standard errors, which gives E2 and E3 with their correlation, as well as E1 and E4
+with their errors, the scatter of the voltage around the regression
+the samples are evaluated as arrays of samples x titrations, in blocks of whole groups of titrations and
+of samples that fit into max_bytes, with random generators derived from seed for the settings and for
+every group of titrations, which draw the samples in order, so the results are reproducible and do not
+depend on max_bytes, only the samples of D of one group of titrations have to fit into max_bytes
+
+returns an array with the percentiles of D (default: 2.5, 50, 97.5) for every titration
+'''
+def get_GITT_monte_carlo(results, p_val, samples=10000, seed=0, percentiles=(2.5,50,97.5), max_bytes=2**28, group=64):
+    import numpy as np
+    
+    fit = results['fit']
+    tau = results['tau']
+    count = len(tau)
+    
+    # settings shared by all titrations of a sample
+    seeds = np.random.SeedSequence(seed).spawn(1 + (count+group-1)//group)
+    rng = np.random.default_rng(seeds[0])
+    p_samples = dict(p_val)
+    for p_key in ['A','m_AM/A','M_AM','rho']:
+        p_samples[p_key] = [p_val[p_key][0] + p_val[p_key][1]*rng.standard_normal((samples,1)), 0]
+    p_samples = derive_GITT_parameters(p_samples)
+    
+    # mean voltage of the regression and its standard error, uncorrelated with the slope
+    y_mean = fit['intercept'] + fit['slope']*fit['x_mean']
+    with np.errstate(invalid='ignore'):
+        y_mean_err = fit['slope_err']*np.sqrt(fit['ssxm'])
+    scatter = results['E1'][1]
+    
+    prefactor = get_diffusion_prefactor(1, p_samples)
+    
+    # the samples of D and the copy made by np.percentile take up to half of max_bytes, blocks consist of
+    # whole groups, the other half is left for about 8 arrays of the random numbers and intermediate results
+    block = max(1, int(max_bytes//(2*2*8*samples*group)))*group
+    D = np.empty((len(percentiles), count))
+    for start in range(0, count, block):
+        part = slice(start, min(start+block, count))
+        width = part.stop-part.start
+        rows = max(1, min(samples, int((max_bytes-2*8*samples*width)//(8*8*width))))
+        
+        # every group of titrations has its own random generator, which draws the samples in order
+        generators = [np.random.default_rng(seeds[1+first//group]) for first in range(part.start, part.stop, group)]
+        D_samples = np.empty((samples, width))
+        for row in range(0, samples, rows):
+            rows_part = slice(row, min(row+rows, samples))
+            z = np.empty((rows_part.stop-rows_part.start, 4, width))
+            for k, first in enumerate(range(0, width, group)):
+                last = min(first+group, width)
+                z[:,:,first:last] = generators[k].standard_normal((rows_part.stop-rows_part.start, 4, last-first))
+            
+            slope, E2, E1, E4 = z.transpose(1,0,2)
+            slope *= fit['slope_err'][part]
+            slope += fit['slope'][part]
+            E2 *= y_mean_err[part]
+            E2 += y_mean[part]
+            E2 -= slope*fit['x_mean'][part]
+            E3 = slope
+            E3 *= np.sqrt(tau[part])
+            E3 += E2
+            E1 *= scatter[part]
+            E1 += results['E1'][0][part]
+            E4 *= scatter[part]
+            E4 += results['E4'][0][part]
+            
+            # same correction as for the values, E2 is set to E1 if it lies beyond E1
+            expol = ((E2 < E3) & (E2 < E1)) | ((E2 > E3) & (E2 > E1))
+            np.copyto(E2, E1, where=expol)
+            del expol
+            
+            # only the values of D are needed, eq. 16 evaluated in place
+            with np.errstate(divide='ignore', invalid='ignore'):
+                E4 -= E1
+                E3 -= E2
+                E4 /= E3
+                np.square(E4, out=E4)
+                E4 *= prefactor[rows_part]
+                np.divide(E4, tau[part], out=D_samples[rows_part])
+            del z, slope, E1, E2, E3, E4
+        D[:,part] = np.percentile(D_samples, percentiles, axis=0)
+        del D_samples
+    
+    return D
+
+'''
+fields of the table of titrations returned by the analysis, one record per evaluated titration
+    t_on, t_off         time at which the current is switched on and off in s
+    tau, relax          time with current applied and time of the relaxation before the titration in s
+    E1 to E4            voltages of eq. 16 in V, each with its error as E1_err to E4_err
+    r2                  coefficient of determination of the regression of E2 and E3
+    D, D_err            diffusion coefficient and its error in cm²/s
+    ion, spec_cap       content of the conducting ion and specific capacity in mAh/g with errors,
+                        NaN without capacity data
+    cycle               half cycle, 0 is the first charge, 1 the first discharge, etc., -1 without capacity data
+    on, off, next_on    indices of the raw data points at which the current is switched on and off and at
+                        which the next titration starts
+with Monte Carlo sampling, the percentiles 'D_2.5', 'D_50', and 'D_97.5' of D are added as last fields
+'''
+GITT_titration_fields = ['t_on','t_off','tau','relax','E1','E1_err','E2','E2_err','E3','E3_err','E4','E4_err',
+                         'r2','D','D_err','ion','ion_err','spec_cap','spec_cap_err','cycle','on','off','next_on']
+
+'''
+This function returns the numpy dtype of the table of titrations, see GITT_titration_fields
+the half cycle and the indices are integers, all other fields float64
+'''
+def get_GITT_titration_dtype(monte_carlo=False):
+    import numpy as np
+    
+    fields = GITT_titration_fields + (['D_2.5','D_50','D_97.5'] if monte_carlo else [])
+    return np.dtype([(field, np.int64 if field in ['cycle','on','off','next_on'] else np.float64) for field in fields])
+
+'''
+This function creates a table of titrations with rows records, as a numpy structured array with the fields
+of GITT_titration_fields, all values NaN and the cycles and indices -1 until they are filled in
+'''
+def new_GITT_titrations(rows, monte_carlo=False):
+    import numpy as np
+    
+    dtype = get_GITT_titration_dtype(monte_carlo)
+    titrations = np.empty(rows, dtype=dtype)
+    for field in dtype.names:
+        titrations[field] = -1 if dtype[field].kind == 'i' else np.nan
+    
+    return titrations
+
+'''
+This function evaluates the titrations of a pulse table with get_GITT_pulse_results, used by analyze_GITT
+and by GITT_follower for the newly completed titrations
+with samples, the table also contains the 2.5, 50, and 97.5 percentiles of D, see get_GITT_monte_carlo
+returns the table of titrations (see new_GITT_titrations) and the number of bad fits
+'''
+def evaluate_GITT_pulses(GITT_data,pulses,p_val,settings,half_cycles=None,samples=0,seed=0,report=GITT_no_report):
+    
+    results = get_GITT_pulse_results(GITT_data, pulses, p_val, settings, half_cycles, report)
+    titrations = new_GITT_titrations(len(results['tau']), samples > 0)
+    
+    for field in ['t_on','t_off','tau','relax','r2','on','off','next_on']:
+        titrations[field] = results[field]
+    for field in ['E1','E2','E3','E4','D']:
+        titrations[field], titrations[field+'_err'] = results[field]
+    if settings['cap'] or settings['spec_cap']:
+        titrations['ion'], titrations['ion_err'] = results['ion']
+        titrations['spec_cap'], titrations['spec_cap_err'] = results['spec_cap']
+        titrations['cycle'] = results['cycle']
+    if samples > 0:
+        with report.stage('monte carlo'):
+            percentiles = get_GITT_monte_carlo(results, p_val, samples, seed)
+            titrations['D_2.5'], titrations['D_50'], titrations['D_97.5'] = percentiles
+            report.count(samples=samples, titrations=len(titrations))
+    
+    return titrations, results['bad_fit']
+
+'''
+This function processes the raw GITT data without any user interaction
+p_val contains the numerical settings as returned by get_GITT_parameters
+the flags 'cap' and 'spec_cap' are set in settings, depending on the capacity data available
+the titrations are detected from the current (see get_GITT_current_edges) with detection 'current', or
+from jumps in the voltage with the settings 'scale' and 'limiter' (see get_GITT_edges) with detection
+'voltage'; with 'auto', the current is used if the data contains a current that is not zero throughout
+with samples, the uncertainty of D is also determined by Monte Carlo sampling (see evaluate_GITT_pulses)
+returns the table of titrations (see new_GITT_titrations) and a list of messages (kind, title, text)
+about problems found during the analysis
+the time, memory, and counts of every stage are recorded in report (see GITT_report)
+'''
+def analyze_GITT(GITT_data,p_val,settings,timing=False,samples=0,seed=0,report=GITT_no_report,detection='auto'):
+    import numpy as np
+    
+    # initial data transformation, time as x-axis, voltage as y-axis
+    x = GITT_data['time']
+    y = GITT_data['volt']
+    messages = []
+    
+    # assigns capacity if it was provided
+    # prefers special capacity over pure capacity, if both are provided
+    settings['spec_cap'] = False
+    settings['cap'] = False
+
+    if 'spec_cap' in GITT_data:
+        settings['spec_cap'] = True
+    elif 'cap' in GITT_data:
+        settings['cap'] = True  
+    
+    if detection == 'current' and not 'curr' in GITT_data:
+        raise GITT_error('GITT data incomplete', 'The titrations cannot be detected from the current, because the GITT data contains no current.')
+    if detection == 'auto':
+        detection = 'current' if 'curr' in GITT_data and np.any(GITT_data['curr'] != 0) else 'voltage'
+    
+    if detection == 'current':
+        # the current is switched on and off where it changes between zero and non-zero
+        with report.stage('detection'):
+            current_on, current_off = get_GITT_current_edges(GITT_data['curr'], report=report)
+            report.count(rows=len(x), on=len(current_on), off=len(current_off))
+    else:
+        # get numerical derivative of voltage
+        # cutoff determines minimum jump in derivative required for it to be counted
+        with report.stage('derivative'):
+            y_deriv = get_numerical_derivative(x, y)
+            y_deriv_cutoff = p_val['limiter'][0]*np.mean(np.abs(y_deriv))
+            report.count(rows=len(x))
+
+        # this part detects when the current is applied and removed
+        with report.stage('detection'):
+            current_on, current_off = get_GITT_edges(y, y_deriv, p_val['scale'][0], y_deriv_cutoff, report=report)
+            report.count(on=len(current_on), off=len(current_off))
+    
+    # pairs every titration with the next point at which current is turned off
+    # and with the start of the next titration
+    with report.stage('pulse table'):
+        pulses = GITT_pulse_table(x, y, current_on, current_off)
+        report.count(pulses=len(pulses))
+    
+    # evaluate E1-E4, charging time tau
+    titrations, bad_fit = evaluate_GITT_pulses(GITT_data, pulses, p_val, settings, samples=samples, seed=seed, report=report)
+    
+    # check whether there is issues with the titration lengths
+    if len(titrations) == 0 and detection == 'current':
+        messages.append(('error','Check Results','No titrations were detected from the current. Please check the current in the GITT data.'))
+        return titrations, messages
+    elif len(titrations) == 0:
+        messages.append(('error','Check Results','No titrations were detected. Please reduce the settings \'scale\' and \'limiter\'.'))
+        return titrations, messages
+    
+    buckets, tau_messages = evaluate_tau(titrations['tau'],titrations['relax'],timing)
+    messages += tau_messages
+    
+    if bad_fit > 0:
+        messages.append(('info','Check Results','The regression for determining the onset energy yielded a bad fit {} times. Please check the results for errors and outliers.'.format(bad_fit)))
+
+    return titrations, messages
+
+'''
+version of the analysis stored with cached results, to be increased whenever a change of the analysis
+changes its results, so results of earlier versions are not returned from caches on disk
+'''
+GITT_result_version = 6
+
+'''
+This function computes the fingerprint of parsed GITT data, a hash of the names, types, shapes,
+and contents of all columns, which does not depend on the file or format the data was read from
+'''
+def get_GITT_data_fingerprint(GITT_data):
+    import hashlib
+    import numpy as np
+    
+    digest = hashlib.blake2b(digest_size=16)
+    for label in sorted(GITT_data):
+        column = np.ascontiguousarray(GITT_data[label])
+        digest.update('{},{},{};'.format(label, column.dtype.str, column.shape).encode())
+        digest.update(memoryview(column).cast('B'))
+    
+    return digest.hexdigest()
+
+'''
+class keeps the results of analyze_GITT for combinations of GITT data and settings, so unchanged
+re-analyses return at once (see analyze_GITT_cached)
+the key is the fingerprint of the data together with the normalized numerical settings, their errors,
+and the options of the analysis; the last max_items results are kept in memory, least recently used first out
+with cache_dir, the results are also stored on disk and shared between sessions and processes, the least
+recently used entries are evicted once the directory grows beyond max_cache_bytes
+the fingerprint of the last data is remembered as long as its columns exist, so changing the columns
+in place is not noticed and requires clear(); the cached tables of titrations are shared and read-only
+'''
+class GITT_result_cache:
+    
+    def __init__(self, max_items=8, cache_dir=None, max_cache_bytes=2**30):
+        import collections
+        
+        self.max_items = max_items
+        self.cache_dir = cache_dir
+        self.max_cache_bytes = max_cache_bytes
+        self.items = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # fingerprint of the last data, the columns are only referenced weakly
+        self.last_data = ((), '')
+    
+    def fingerprint(self, GITT_data):
+        import weakref
+        
+        columns, fingerprint = self.last_data
+        if len(columns) == len(GITT_data) and all(label in GITT_data and ref() is GITT_data[label] for label, ref in columns):
+            return fingerprint
+        fingerprint = get_GITT_data_fingerprint(GITT_data)
+        try:
+            self.last_data = (tuple((label, weakref.ref(GITT_data[label])) for label in GITT_data), fingerprint)
+        except TypeError:
+            pass
+        return fingerprint
+    
+    def key(self, GITT_data, p_val, timing=False, samples=0, seed=0, detection='auto'):
+        import hashlib
+        
+        settings = ['{}={!r},{!r}'.format(p_key, float(p_val[p_key][0]), float(p_val[p_key][1]))
+                    for p_key in ['A','m_AM/A','M_AM','refcap','c0','rho','scale','limiter']]
+        options = 'timing={},samples={},seed={},detection={},version={}'.format(bool(timing), int(samples), int(seed), detection, GITT_result_version)
+        text = ';'.join([self.fingerprint(GITT_data)]+settings+[options])
+        
+        return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+    
+    def get(self, key):
+        import json
+        import os
+        
+        if key in self.items:
+            self.items.move_to_end(key)
+            self.hits += 1
+            return self.items[key]
+        
+        if self.cache_dir is not None:
+            entry = os.path.join(self.cache_dir, key)
+            meta = os.path.join(entry, 'meta.json')
+            if os.path.isfile(meta):
+                try:
+                    with open(meta, mode='r') as f:
+                        meta_data = json.load(f)
+                    if meta_data['version'] != GITT_result_version:
+                        raise ValueError
+                    value = self.read(os.path.join(entry, 'result.npz'), meta_data)
+                    os.utime(meta)
+                    self.remember(key, value)
+                    self.hits += 1
+                    return value
+                except (OSError, ValueError, KeyError, IndexError):
+                    pass
+        
+        self.misses += 1
+        return None
+    
+    def put(self, key, value):
+        import json
+        import os
+        
+        self.remember(key, value)
+        if self.cache_dir is None:
+            return
+        
+        entry = os.path.join(self.cache_dir, key)
+        try:
+            os.makedirs(entry, exist_ok=True)
+            meta_data = self.write(os.path.join(entry, 'result.npz'), value)
+            # meta.json is written last and marks the entry as complete
+            with open(os.path.join(entry, 'meta.json'), mode='w') as f:
+                json.dump(meta_data, f)
+            evict_GITT_cache(self.cache_dir, self.max_cache_bytes, keep=key)
+        except OSError:
+            pass
+    
+    # on disk, the table of titrations is stored as structured array in an .npz-file, meta.json keeps the
+    # messages and the flags
+    def write(self, file, value):
+        import numpy as np
+        
+        titrations, messages, flags = value
+        with open(file, mode='wb') as f:
+            np.savez(f, titrations=titrations)
+        
+        return {'version': GITT_result_version, 'messages': messages, 'flags': flags}
+    
+    def read(self, file, meta_data):
+        import numpy as np
+        
+        with np.load(file, allow_pickle=False) as arrays:
+            titrations = arrays['titrations']
+        messages = [tuple(message) for message in meta_data['messages']]
+        
+        return titrations, messages, meta_data['flags']
+    
+    def remember(self, key, value):
+        
+        # the table of titrations is shared by all callers
+        value[0].flags.writeable = False
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_items:
+            self.items.popitem(last=False)
+    
+    def clear(self):
+        
+        self.items.clear()
+        self.last_data = ((), '')
+
+'''
+This function returns the results of analyze_GITT from cache, a GITT_result_cache, if the same data
+was already analyzed with the same settings, and otherwise analyzes the data and stores the results
+the flags 'cap' and 'spec_cap' are set in settings in either case
+the lookup is recorded as stage 'result cache' in report, with the analysis nested in it
+'''
+def analyze_GITT_cached(GITT_data,p_val,settings,cache,timing=False,samples=0,seed=0,report=GITT_no_report,detection='auto'):
+    
+    with report.stage('result cache'):
+        key = cache.key(GITT_data, p_val, timing, samples, seed, detection)
+        value = cache.get(key)
+        report.count(hit=value is not None)
+        
+        if value is None:
+            flags = {}
+            titrations, messages = analyze_GITT(GITT_data, p_val, flags, timing, samples, seed, report, detection)
+            value = (titrations, messages, flags)
+            cache.put(key, value)
+    
+    titrations, messages, flags = value
+    settings.update(flags)
+    
+    return titrations, list(messages)
+
+'''
+class analyzes a GITT data file while the cycler is still writing it
+every call of update reads only the rows appended since the last call, starting at the byte offset
+after the last complete line, and continues the detection of jumps and half cycles from the stored
+state, so the cost of an update depends on the new data, not on the length of the measurement
+
+a titration is complete when the current was switched off after it and the next titration starts,
+since its relaxation ends there (E4), update returns the table of the titrations completed since the last call,
+finish evaluates the last titration with the end of the file as end of its relaxation
+
+as in analyze_GITT, the titrations are detected from the current with detection 'current', or from
+jumps in the voltage with detection 'voltage'; 'auto' detects them from the voltage until a non-zero
+current is read, so a current column with only zeros is ignored as by analyze_GITT, and titrations
+evaluated before the first non-zero current keep their detection from the voltage
+the largest current is taken from the rows read so far, whenever it grows, the switches after the
+last evaluated titration are detected again; as for the cutoff, a noisy current at rest at the very
+beginning may give switches that the whole measurement would not give
+the derivative of the last point changes with the next point, so jumps are only checked up to
+the second to last point; without a given cutoff, the cutoff is taken from the mean of the derivative
+read so far instead of the whole measurement, which may shift jumps at the very beginning
+'''
+class GITT_follower:
+
+    def __init__(self, file, p_val, cutoff=None, detection='auto'):
+
+        self.file = file
+        self.p_val = p_val
+        self.cutoff = cutoff
+        self.detection = detection
+        self.settings = {'cap': False, 'spec_cap': False}
+
+        # reading position and columns of the file
+        self.offset = 0
+        self.header = None
+        self.buffers = {}
+
+        # derivative of all points that are followed by another point
+        self.deriv = GITT_column_buffer()
+        self.deriv_abs_sum = 0.0
+        self.edge_state = {'load': False, 'E_on': None}
+        self.current_on = []
+        self.current_off = []
+        # points of the current checked for switches and the largest current among them
+        self.current_checked = 0
+        self.current_max = 0.0
+
+        self.half_cycle_state = {'max_cap': 0}
+        self.capacity_checked = 0
+        self.resets = []
+        self.reached = []
+
+        # titrations up to current_on[evaluated] are evaluated or discarded
+        self.evaluated = 0
+        self.previous_off = 0
+        self.bad_fit = 0
+
+    # read-only views of the columns read so far
+    def data(self):
+
+        return {label: buffer.array[:buffer.size] for label, buffer in self.buffers.items()}
+
+    def read(self):
+        import io
+        import numpy as np
+
+        with open(self.file, mode='rb') as f:
+            f.seek(self.offset)
+            text = f.read()
+
+        # an incomplete last line is read again with the next update
+        cut = text.rfind(b'\n')
+        if cut < 0:
+            return 0
+        self.offset += cut+1
+        text = text[:cut+1].decode()
+
+        if self.header is None:
+            self.header, _, text = text.partition('\n')
+            splitter, labels, self.columns, self.delimiter, self.factors = get_GITT_columns(self.header)
+            self.labels = [labels[column] for column in self.columns]
+            for label in self.labels:
+                self.buffers[label] = GITT_column_buffer()
+            if 'spec_cap' in self.labels:
+                self.settings['spec_cap'] = True
+            elif 'cap' in self.labels:
+                self.settings['cap'] = True
+            if self.detection == 'current' and not 'curr' in self.labels:
+                raise GITT_error('GITT data incomplete', 'The titrations cannot be detected from the current, because the GITT data contains no current.')
+            if self.detection == 'auto' and not 'curr' in self.labels:
+                self.detection = 'voltage'
+
+        if text.strip() == '':
+            return 0
+
+        try:
+            block = np.loadtxt(io.StringIO(text), delimiter=self.delimiter, usecols=self.columns, ndmin=2, dtype=np.float64)
+        except ValueError:
+            raise GITT_error('Faulty GITT data', 'GITT data contains non-numerical values after byte {}. Please check the input file.'.format(self.offset-cut-1))
+        for idx, label in enumerate(self.labels):
+            self.buffers[label].append(block[:,idx]*self.factors[idx] if self.factors[idx] != 1 else block[:,idx])
+
+        return len(block)
+
+    def detect(self, derivative):
+        import numpy as np
+
+        self.deriv.append(derivative)
+        self.deriv_abs_sum += np.sum(np.abs(derivative))
+        checked = self.deriv.size - len(derivative)
+        if self.cutoff is None:
+            cutoff = self.p_val['limiter'][0]*self.deriv_abs_sum/self.deriv.size
+        else:
+            cutoff = self.cutoff
+
+        y = self.buffers['volt'].array
+        current_on, current_off = get_GITT_edges(y, self.deriv.array[:self.deriv.size], self.p_val['scale'][0], cutoff, checked, self.edge_state)
+        self.current_on += current_on.tolist()
+        self.current_off += current_off.tolist()
+
+    def detect_current(self):
+        import bisect
+        import numpy as np
+
+        current = self.buffers['curr'].array[:self.buffers['curr'].size]
+        start = max(self.current_checked-1, 0)
+        maximum = max(self.current_max, float(np.max(np.abs(current[self.current_checked:]), initial=0)))
+        if maximum > self.current_max:
+            # switches after the last evaluated titration are detected again with the new largest current
+            start = self.previous_off+1 if self.evaluated > 0 else 0
+            del self.current_on[bisect.bisect_left(self.current_on, start):]
+            del self.current_off[bisect.bisect_left(self.current_off, start):]
+            self.current_max = maximum
+
+        current_on, current_off = get_GITT_current_edges(current, start=start, maximum=self.current_max)
+        self.current_on += current_on.tolist()
+        self.current_off += current_off.tolist()
+        self.current_checked = len(current)
+
+    def evaluate(self, complete):
+        import bisect
+        import numpy as np
+
+        GITT_data = self.data()
+        if complete:
+            current_on = self.current_on[self.evaluated:]
+            last_on = None
+        else:
+            # a titration is complete once the current was switched off after it and the next titration
+            # started, which ends its relaxation; the switch-off can also come after the next switch-on,
+            # so the raw data is not cut at the next switch-on, which is only passed as bound
+            end = len(self.current_on)-1
+            if len(self.current_off) > 0:
+                end = min(end, bisect.bisect_left(self.current_on, self.current_off[-1]))
+            else:
+                end = min(end, 0)
+            current_on = self.current_on[self.evaluated:max(end, 0)]
+            last_on = self.current_on[end] if end >= 0 else None
+
+        half_cycles = (np.array(self.resets, dtype=np.intp), np.array(self.reached))
+        pulses = GITT_pulse_table(GITT_data['time'], GITT_data['volt'], current_on, self.current_off, self.previous_off, last_on)
+        titrations, bad_fit = evaluate_GITT_pulses(GITT_data, pulses, self.p_val, self.settings, half_cycles)
+
+        if len(pulses) > 0:
+            self.evaluated += len(pulses)
+            self.previous_off = pulses.off[-1]
+            self.bad_fit += bad_fit
+
+        return titrations
+
+    '''
+    reads the new rows of the file and returns the table of the titrations completed since the last call
+    '''
+    def update(self):
+        import numpy as np
+
+        self.read()
+        if self.header is None:
+            return new_GITT_titrations(0)
+
+        GITT_data = self.data()
+        x = GITT_data['time']
+        y = GITT_data['volt']
+
+        # with 'auto', the titrations are detected from the voltage until a non-zero current is read,
+        # then the switches after the last evaluated titration are detected from the current
+        if self.detection == 'auto':
+            if np.any(GITT_data['curr'][self.current_checked:] != 0):
+                self.detection = 'current'
+            else:
+                self.current_checked = len(x)
+        
+        # the derivative of the first new point changes, since the point before was the last one
+        first = self.deriv.size
+        if self.detection == 'current':
+            if self.current_checked < len(x):
+                self.detect_current()
+        elif len(x)-first >= 2:
+            start = max(first-1, 0)
+            derivative = get_numerical_derivative(x[start:], y[start:])
+            self.detect(derivative[first-start:-1])
+
+        mode = 'spec_cap' if self.settings['spec_cap'] else 'cap'
+        if mode in GITT_data and self.capacity_checked < len(x):
+            resets, reached = get_half_cycles(GITT_data[mode], mode, self.capacity_checked, self.half_cycle_state)
+            self.resets += resets.tolist()
+            self.reached += reached.tolist()
+            self.capacity_checked = len(x)
+
+        return self.evaluate(False)
+
+    '''
+    reads the remaining rows of the finished measurement and returns the table of the titrations
+    not returned so far, including the last one
+    '''
+    def finish(self):
+        import numpy as np
+
+        titrations = self.update()
+        if self.header is None:
+            return titrations
+
+        GITT_data = self.data()
+        x = GITT_data['time']
+        y = GITT_data['volt']
+        if self.detection != 'current' and 0 < self.deriv.size < len(x):
+            self.detect(get_numerical_derivative(x[-2:], y[-2:])[-1:])
+
+        return np.concatenate((titrations, self.evaluate(True)))
+
+'''
+state of the parameter sweep in the current process, filled by init_GITT_sweep
+worker processes receive the data once when they are started, not with every setting
+'''
+GITT_sweep_state = {}
+
+'''
+function prepares the parameter sweep of the settings 'scale' and 'limiter'
+the derivative, its mean magnitude, and the half cycles are determined once for all settings
+only points that are a candidate for a jump with the smallest scale and limiter of the grid can be
+a candidate for any other setting, so only these points are kept to resolve every setting from them
+'''
+def init_GITT_sweep(GITT_data, p_val, min_scale, min_limiter):
+    import numpy as np
+
+    x = GITT_data['time']
+    y = GITT_data['volt']
+    settings = {'cap': 'cap' in GITT_data and not 'spec_cap' in GITT_data, 'spec_cap': 'spec_cap' in GITT_data}
+
+    y_deriv = get_numerical_derivative(x, y)
+    mean_deriv = np.mean(np.abs(y_deriv))
+
+    # the first point is compared with the last one, as in get_GITT_edges
+    previous = np.empty(len(y_deriv))
+    previous[1:] = y_deriv[:-1]
+    previous[:1] = y_deriv[-1:]
+    magnitude = np.abs(y_deriv)
+    previous = np.abs(previous)
+    points = np.flatnonzero((magnitude > abs(min_scale)*previous) & (magnitude > min_limiter*mean_deriv))
+
+    half_cycles = None
+    if settings['cap'] or settings['spec_cap']:
+        mode = 'spec_cap' if settings['spec_cap'] else 'cap'
+        half_cycles = get_half_cycles(GITT_data[mode], mode)
+
+    GITT_sweep_state.clear()
+    GITT_sweep_state.update({
+        'data':         GITT_data,
+        'p_val':        p_val,
+        'settings':     settings,
+        'mean_deriv':   mean_deriv,
+        'points':       points,
+        'magnitude':    magnitude[points],
+        'previous':     previous[points],
+        'rising':       y_deriv[points] > 0,
+        'half_cycles':  half_cycles,
+        'row':          None,
+        'results':      {}
+        })
+
+'''
+function returns the candidates for jumps of a value of scale in the prepared sweep as indices into the
+kept points, the candidates of the last value are kept, since the settings are processed row by row
+'''
+def get_GITT_sweep_row(scale):
+    import numpy as np
+
+    state = GITT_sweep_state
+    if state['row'] is None or state['row'][0] != scale:
+        row = np.flatnonzero(state['magnitude'] > abs(scale)*state['previous'])
+        state['row'] = (scale, row, state['magnitude'][row])
+
+    return state['row']
+
+'''
+function counts how often the current is switched with the settings of a row of the prepared sweep
+runs of jumps in the same direction only count once, before the jumps are resolved into titrations
+'''
+def count_GITT_switches(scale, limiters):
+    import numpy as np
+
+    state = GITT_sweep_state
+    scale, row, magnitude = get_GITT_sweep_row(scale)
+
+    switches = []
+    for limiter in limiters:
+        direction = state['rising'][row[magnitude > limiter*state['mean_deriv']]]
+        switches.append(int(np.count_nonzero(direction[1:] != direction[:-1])) + min(len(direction), 1))
+
+    return switches
+
+'''
+function scores a single pair of settings 'scale' and 'limiter' of the prepared sweep
+
+the score combines the number of titrations, the share of titrations with the median duration
+(evaluate_tau), the share of good fits, and the smoothness of the diffusion coefficients, measured as
+the median change of log10(D) between consecutive titrations of the same half cycle:
+    score = titrations * share_median * share_good_fits / (1 + 10 * roughness)
+identical detected titrations are evaluated only once
+returns a dictionary with the settings, the criteria, and the score
+'''
+def score_GITT_setting(scale, limiter):
+    import numpy as np
+
+    state = GITT_sweep_state
+    GITT_data = state['data']
+
+    scale, row, magnitude = get_GITT_sweep_row(scale)
+    candidates = row[magnitude > limiter*state['mean_deriv']]
+    current_on, current_off = resolve_GITT_edges(GITT_data['volt'], state['points'][candidates], state['rising'][candidates])
+
+    key = (current_on.tobytes(), current_off.tobytes())
+    if not key in state['results']:
+        # unsuitable settings give titrations without proper switch-off
+        pulses = GITT_pulse_table(GITT_data['time'], GITT_data['volt'], current_on, current_off)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            results = get_GITT_pulse_results(GITT_data, pulses, state['p_val'], state['settings'], state['half_cycles'])
+
+        titrations = len(results['tau'])
+        bad_fit = int(results['bad_fit'])
+        result = {'titrations': titrations, 'buckets': [0,0,0], 'bad_fit': bad_fit, 'roughness': np.inf, 'score': 0.0}
+        if titrations > 1:
+            result['buckets'], messages = evaluate_tau(results['tau'], results['relax'])
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                steps = np.diff(np.log10(results['D'][0]))
+            if 'cycle' in results:
+                steps = steps[np.diff(results['cycle']) == 0]
+            steps = steps[np.isfinite(steps)]
+            if len(steps) > 0:
+                result['roughness'] = float(np.median(np.abs(steps)))
+                result['score'] = float(result['buckets'][1] * (1-bad_fit/titrations) / (1+10*result['roughness']))
+        state['results'][key] = result
+
+    result = {'scale': scale, 'limiter': limiter}
+    result.update(state['results'][key])
+
+    return result
+
+'''
+function scores a list of pairs (scale, limiter) in a worker process of sweep_GITT
+'''
+def score_GITT_settings(pairs):
+
+    return [score_GITT_setting(scale, limiter) for scale, limiter in pairs]
+
+'''
+This function sweeps the settings 'scale' and 'limiter' over a grid and scores every pair with
+score_GITT_setting, with jobs processes in parallel (default: number of CPUs)
+p_val contains the other numerical settings as returned by get_GITT_parameters
+
+good settings form a plateau of pairs that switch the current equally often, pairs that switch more than
+twice as often as the most common count of the grid mostly detect noise and are rejected without
+evaluation (score 0, bad fits -1), which saves resolving thousands of spurious titrations
+returns the best pair of settings and the list of scores of all pairs
+'''
+def sweep_GITT(GITT_data, p_val, scales, limiters, jobs=None):
+    import collections
+    import concurrent.futures
+    import os
+
+    scales = [float(scale) for scale in scales]
+    limiters = [float(limiter) for limiter in limiters]
+    init_args = (GITT_data, p_val, min(abs(scale) for scale in scales), min(limiters))
+
+    init_GITT_sweep(*init_args)
+    switches = {}
+    for scale in scales:
+        for limiter, count in zip(limiters, count_GITT_switches(scale, limiters)):
+            switches[(scale, limiter)] = count
+
+    common = [count for count in switches.values() if count > 2]
+    limit = 2*collections.Counter(common).most_common(1)[0][0] if len(common) > 0 else 0
+    pairs = [pair for pair in switches if switches[pair] <= limit]
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = max(1, min(jobs, len(pairs)))
+
+    if jobs == 1:
+        scores = score_GITT_settings(pairs)
+    else:
+        # neighboring pairs often detect the same titrations, so every process gets a contiguous part of the grid
+        parts = [pairs[idx*len(pairs)//jobs:(idx+1)*len(pairs)//jobs] for idx in range(jobs)]
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=init_GITT_sweep, initargs=init_args) as pool:
+            scores = [result for part in pool.map(score_GITT_settings, parts) for result in part]
+
+    scores = {(result['scale'], result['limiter']): result for result in scores}
+    table = []
+    for pair in switches:
+        if pair in scores:
+            table.append(scores[pair])
+        else:
+            table.append({'scale': pair[0], 'limiter': pair[1], 'titrations': switches[pair]//2, 'buckets': [0,0,0], 'bad_fit': -1, 'roughness': float('inf'), 'score': 0.0})
+
+    # of several pairs with the best score, the one in the middle is least sensitive to the settings
+    best_score = max(result['score'] for result in table)
+    ties = [result for result in table if result['score'] == best_score]
+    best = ties[len(ties)//2]
+
+    return best, table
+
+'''
+function selects the points of a trace x, y (x sorted) that are drawn between lo and hi on a plot
+that is buckets pixels wide, so that the plot looks the same as with all points
+in every pixel column, the first, last, lowest, and highest point are kept (min/max decimation),
+which keeps every jump and spike of the trace, as well as the points keep (e.g., the switching points
+of the current) and one point beyond lo and hi on each side, so the line continues to the edges
+ranges with few points are returned completely
+returns the sorted indices of the selected points
+'''
+def get_GITT_decimation(x, y, lo, hi, buckets, keep=()):
+    import numpy as np
+
+    first = max(np.searchsorted(x, lo, side='left')-1, 0)
+    last = min(np.searchsorted(x, hi, side='right')+1, len(x))
+    buckets = max(int(buckets), 1)
+    if last-first <= 4*buckets or hi <= lo:
+        return np.arange(first, last)
+
+    xs = x[first:last]
+    ys = y[first:last]
+    # the pixel columns are evenly spaced in x, the points of every column are consecutive
+    edges = np.linspace(lo, hi, buckets+1)[1:-1]
+    starts = np.unique(np.concatenate(([0], np.searchsorted(xs, edges, side='left'))))
+    starts = starts[starts < len(xs)]
+    counts = np.diff(np.append(starts, len(xs)))
+    column = np.repeat(np.arange(len(starts)), counts)
+
+    # position of the first lowest and first highest point of every column
+    selected = [starts, starts+counts-1]
+    for extreme in [np.minimum, np.maximum]:
+        values = extreme.reduceat(ys, starts)
+        hits = np.flatnonzero(ys == values[column])
+        selected.append(hits[np.unique(column[hits], return_index=True)[1]])
+
+    keep = np.asarray(keep, dtype=np.intp)
+    keep = keep[(keep >= first) & (keep < last)]-first
+    selected.append(keep)
+
+    return np.unique(np.concatenate(selected)) + first
+
+# COMMAND LINE
+
+'''
+This function collects the raw data files from a list of files, glob patterns, and directories
+directories contribute all data files they contain (not recursively), skipping results and reports of earlier batch runs
+'''
+def find_GITT_files(patterns):
+    import glob
+    import os
+    
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = sorted(glob.glob(os.path.join(pattern, '*')))
+            candidates = [file for file in candidates if os.path.splitext(file)[1].lower() in ['.csv','.txt','.dat','.mpt']]
+        else:
+            candidates = sorted(glob.glob(pattern))
+        for file in candidates:
+            if os.path.isfile(file) and not os.path.splitext(file)[0].endswith(('_diffusion','_report')) and not file in files:
+                files.append(file)
+    
+    return files
+
+'''
+This function collects the settings for a raw data file without user interaction
+settings are taken from the defaults, then from the .info-file of the raw data, then from overrides,
+each with its error
+returns the numerical settings as returned by get_GITT_parameters
+'''
+def get_GITT_file_parameters(file, overrides={}):
+    import os
+    
+    values = {}
+    errors = {}
+    for item, value in GITT_defaults.items():
+        values[item], errors[item] = value
+    settings_file = os.path.splitext(file)[0]+'.info'
+    if os.path.isfile(settings_file):
+        for item, value in read_GITT_settings(settings_file).items():
+            values[item], errors[item] = value
+    for item, value in overrides.items():
+        values[item], errors[item] = value
+    
+    return get_GITT_parameters(values, errors)
+
+'''
+This function analyzes a single raw data file without user interaction, used by batch_GITT
+settings are collected by get_GITT_file_parameters
+the results are written as <name>_diffusion.csv to out_dir or next to the raw data, or in another format
+fmt of write_GITT_results ('npz', 'parquet', 'h5')
+with report 'time' or 'memory', the stages of the analysis are recorded with GITT_report, with or without
+tracing the memory, and written as <name>_report.json
+with result_cache, the results are kept in this directory (see GITT_result_cache) and taken from there
+when the same data is analyzed again with the same settings, up to result_cache_bytes in total
+detection selects how the titrations are detected (see analyze_GITT), precision how the raw data
+is stored (see get_GITT_data)
+with project, the raw data, settings, and results are also written as <name>.gittproj (see write_GITT_project)
+returns a dictionary with the outcome, timings, and messages of the analysis
+'''
+def batch_GITT_file(file, overrides={}, out_dir=None, chunk_size=2**20, cache=False, samples=0, report=None, fmt='csv', result_cache=None, result_cache_bytes=2**30, detection='auto', precision='double', project=False):
+    import os
+    import time
+    
+    result = {'file': file, 'ok': False, 'rows': 0, 'titrations': 0, 'output': '',
+              'load': 0.0, 'analysis': 0.0, 'write': 0.0, 'messages': [], 'error': ''}
+    start = time.perf_counter()
+    stages = GITT_no_report
+    if report is not None:
+        stages = GITT_report(memory=report == 'memory')
+    if out_dir is None:
+        out_dir = os.path.dirname(file)
+    name = os.path.splitext(os.path.basename(file))[0]
+    
+    try:
+        p_val = get_GITT_file_parameters(file, overrides)
+        
+        if cache:
+            GITT_data = get_GITT_data_cached(file, chunk_size=chunk_size, report=stages, precision=precision)
+        else:
+            GITT_data = get_GITT_data(file, chunk_size=chunk_size, report=stages, precision=precision)
+        result['rows'] = len(GITT_data['time'])
+        result['load'] = time.perf_counter()-start
+        
+        settings = {}
+        if result_cache is not None:
+            results = GITT_result_cache(max_items=1, cache_dir=result_cache, max_cache_bytes=result_cache_bytes)
+            titrations, messages = analyze_GITT_cached(GITT_data, p_val, settings, results, samples=samples, report=stages, detection=detection)
+        else:
+            titrations, messages = analyze_GITT(GITT_data, p_val, settings, samples=samples, report=stages, detection=detection)
+        result['messages'] = messages
+        result['titrations'] = len(titrations)
+        result['analysis'] = time.perf_counter()-start-result['load']
+        
+        if len(titrations) > 0:
+            result['output'] = os.path.join(out_dir, name+'_diffusion.'+fmt)
+            with stages.stage('export'):
+                write_GITT_results(result['output'], titrations, settings)
+            result['ok'] = True
+        else:
+            result['error'] = 'no titrations detected'
+        if project:
+            write_GITT_project(os.path.join(out_dir, name+'.gittproj'), GITT_data, p_val, titrations, settings, messages, source=file, detection=detection, samples=samples, report=stages)
+        result['write'] = time.perf_counter()-start-result['load']-result['analysis']
+    except GITT_error as error:
+        result['error'] = '{}: {}'.format(error.title, error)
+    except Exception as error:
+        result['error'] = '{}: {}'.format(type(error).__name__, error)
+    
+    result['total'] = time.perf_counter()-start
+    
+    if report is not None:
+        try:
+            stages.write_json(os.path.join(out_dir, name+'_report.json'))
+        except OSError as error:
+            result['error'] += ' (report not written: {})'.format(error)
+    
+    return result
+
+'''
+This function analyzes many raw data files in parallel with a pool of jobs processes
+and prints the timing of every file and a summary of throughput and failures
+raises GITT_error before analyzing anything if the results of several files would be written to the same
+files, e.g., for files with the same name from different directories and a common out_dir
+returns the list of results from batch_GITT_file
+'''
+def batch_GITT(files, overrides={}, jobs=None, out_dir=None, chunk_size=2**20, cache=False, samples=0, report=None, fmt='csv', result_cache=None, result_cache_bytes=2**30, detection='auto', precision='double', project=False):
+    import concurrent.futures
+    import os
+    import time
+    
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    
+    # the results of every file are named after it, without its directory and extension
+    outputs = {}
+    for file in files:
+        name = os.path.join(os.path.dirname(file) if out_dir is None else out_dir, os.path.splitext(os.path.basename(file))[0])
+        outputs.setdefault(os.path.normcase(os.path.abspath(name)), []).append(file)
+    collisions = [same for same in outputs.values() if len(same) > 1]
+    if len(collisions) > 0:
+        raise GITT_error('Results would be overwritten', 'The results of these files would be written to the same files:\n'+
+                         '\n'.join(', '.join(same) for same in collisions))
+    if out_dir is not None:
+        os.makedirs(out_dir, exist_ok=True)
+    
+    start = time.perf_counter()
+    results = []
+    
+    print('{:>8} {:>10} {:>8} {:>8} {:>8} {:>8}  {}'.format('status','rows','titr.','load/s','anal./s','total/s','file'))
+    def show(result):
+        results.append(result)
+        status = 'ok' if result['ok'] else 'FAILED'
+        print('{:>8} {:10d} {:8d} {:8.2f} {:8.2f} {:8.2f}  {}'.format(status, result['rows'], result['titrations'], result['load'], result['analysis'], result['total'], result['file']), flush=True)
+    
+    if jobs == 1:
+        for file in files:
+            show(batch_GITT_file(file, overrides, out_dir, chunk_size, cache, samples, report, fmt, result_cache, result_cache_bytes, detection, precision, project))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(batch_GITT_file, file, overrides, out_dir, chunk_size, cache, samples, report, fmt, result_cache, result_cache_bytes, detection, precision, project) for file in files]
+            for future in concurrent.futures.as_completed(futures):
+                show(future.result())
+    
+    duration = time.perf_counter()-start
+    failed = [result for result in results if not result['ok']]
+    rows = sum(result['rows'] for result in results)
+    
+    print('\n{} files, {} failed, {} rows in {:.2f} s with {} jobs'.format(len(results), len(failed), rows, duration, jobs))
+    if duration > 0:
+        print('{:.2f} files/s, {:.0f} rows/s'.format(len(results)/duration, rows/duration))
+    for result in failed:
+        print('FAILED {}: {}'.format(result['file'], result['error']))
+    for result in results:
+        for kind, title, text in result['messages']:
+            print('{} {}: {}'.format(kind.upper(), result['file'], text.replace('\n', ' ')))
+    
+    return results
+
+'''
+This function follows a raw data file while the cycler is still writing it and checks for new rows
+every interval seconds, until interrupted
+the diffusion coefficients of every completed titration are printed and written to the CSV-file output
+(default <name>_diffusion.csv next to the raw data), which is started anew
+with once, the file is analyzed as it is, including the last titration, and the function returns
+detection selects how the titrations are detected (see GITT_follower)
+returns the follower with the state of the analysis
+'''
+def follow_GITT(file, overrides={}, interval=60, output=None, once=False, detection='auto'):
+    import os
+    import time
+    
+    if output is None:
+        output = os.path.splitext(file)[0]+'_diffusion.csv'
+    
+    follower = GITT_follower(file, get_GITT_file_parameters(file, overrides), detection=detection)
+    header = [True]
+    
+    def report(titrations):
+        if len(titrations) == 0:
+            return
+        write_GITT_data(open(output, mode='w' if header[0] else 'a'), titrations, follower.settings, header[0])
+        header[0] = False
+        for time_on, volt, diff in zip(titrations['t_on'].tolist(), titrations['E1'].tolist(), titrations['D'].tolist()):
+            print('{:16.6f} s {:10.6f} V  D = {:.4e} cm^2/s'.format(time_on, volt, diff), flush=True)
+    
+    if once:
+        report(follower.finish())
+        return follower
+    
+    try:
+        while True:
+            report(follower.update())
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    
+    return follower
+
+'''
+This function sweeps the settings 'scale' and 'limiter' for a raw data file with sweep_GITT
+and prints the top best pairs of settings
+returns the best pair of settings and the list of scores of all pairs
 '''
-def write_GITT_example():
-    import numpy as np
+def sweep_GITT_file(file, scales, limiters, overrides={}, jobs=None, chunk_size=2**20, top=10):
+    import time
     
-    volt_init = 2
+    start = time.perf_counter()
+    p_val = get_GITT_file_parameters(file, overrides)
+    GITT_data = get_GITT_data(file, chunk_size=chunk_size)
+    loaded = time.perf_counter()
+    best, table = sweep_GITT(GITT_data, p_val, scales, limiters, jobs)
+    duration = time.perf_counter()-loaded
     
-    t_all = list(np.linspace(0,540,10))
-    volt_all = [2]*10
-    cap_all = [0]*10
+    print('{:>10} {:>10} {:>8} {:>16} {:>8} {:>10} {:>10}'.format('scale','limiter','titr.','tau buckets','bad fit','roughness','score'))
+    for result in sorted(table, key=lambda result: -result['score'])[:top]:
+        print('{:10.4g} {:10.4g} {:8d} {:>16} {:8d} {:10.3g} {:10.4g}'.format(result['scale'], result['limiter'], result['titrations'],
+              '/'.join(str(bucket) for bucket in result['buckets']), result['bad_fit'], result['roughness'], result['score']))
+    print('\n{} settings for {} points in {:.2f} s (loading {:.2f} s)'.format(len(table), len(GITT_data['time']), duration, loaded-start))
+    print('best setting: --set scale={:.4g} --set limiter={:.4g}'.format(best['scale'], best['limiter']))
     
-    def jump(t_in,volt_in,cap_in,charge):
-        t_out = np.linspace(0,8100,136)
-        volt_out = []
-        cap_out = []
-        
-        for t in t_out:
-            if t < 900:
-                volt_out.append((np.sqrt(t)/900 + 0.05)*charge + volt_in)
-                cap_out.append(cap_in + t/4500)
-            else:
-                volt_out.append((np.exp(-(t-300)/900)/20 + 0.03)*charge + volt_in)
-                cap_out.append(cap_out[-1])
-                
-        for i in range(len(t_out)):
-            t_out[i] = t_out[i] + t_in
-        return t_out, volt_out, cap_out
-    
-    t_jump, volt_jump, cap_jump = jump(t_all[-1], volt_init, cap_all[-1], 1)
-    for i, t in enumerate(t_jump):
-        t_all.append(t)
-        volt_all.append(volt_jump[i])
-        cap_all.append(cap_jump[i])
-    
-    for i in range(12):
-        t_jump, volt_jump, cap_jump = jump(t_all[-1], volt_all[-1], cap_all[-1], 1)
-        for i, t in enumerate(t_jump):
-            t_all.append(t)
-            volt_all.append(volt_jump[i])
-            cap_all.append(cap_jump[i])
-        
-    cap_all[-1] = 0
-            
-    for i in range(12):
-        t_jump, volt_jump, cap_jump = jump(t_all[-1], volt_all[-1], cap_all[-1], -1)
-        for i, t in enumerate(t_jump):
-            t_all.append(t)
-            volt_all.append(volt_jump[i])
-            cap_all.append(cap_jump[i])
+    return best, table
+
+'''
+This function parses a setting given on the command line as KEY=VALUE or KEY=VALUE,ERROR
+'''
+def parse_GITT_setting(text):
+    import argparse
     
-    Files = [('TXT File', '*.txt'),
-        ('All Files', '*.*')]
-    savefile = fd.asksaveasfile(filetypes = Files, defaultextension = Files)
+    try:
+        item, value = text.split('=')
+        value = [float(number) for number in value.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError('settings are given as KEY=VALUE or KEY=VALUE,ERROR, not {}'.format(text))
+    if not item in GITT_defaults:
+        raise argparse.ArgumentTypeError('unknown setting {}, known settings: {}'.format(item, ', '.join(GITT_defaults)))
+    if len(value) == 1:
+        value.append(0)
     
-    with savefile as fw:
-        fw.write('time/s\tEwe/V\tCapacity/mA.h\n')
-        for i, t in enumerate(t_all):
-            fw.write('{:.8E}\t{:.8E}\t{:.8E}\n'.format(t,volt_all[i],cap_all[i]))
+    return item, value
 
 '''
-this function saves the raw and processed GITT data into a OriginLab workbook,
-carrying over the name of the original file as label
+This function handles the command line interface for using the program without GUI
 '''
-def write_GITT_2_origin(data_raw,data_out,settings):
-    import originpro as op
-    book = op.new_book(lname=settings['name'])
+def main_cli(argv):
+    import argparse
     
-    # worksheet for raw data
-    wks_raw = book.add_sheet(name='raw_data')
-    wks_raw.cols = 3
+    parser = argparse.ArgumentParser(prog='GITT_analysis.py', description='Headless analysis of GITT raw data. Without arguments, the GUI is started.')
+    commands = parser.add_subparsers(dest='command', required=True)
     
-    wks_raw.from_list(0,data_raw['time'],lname='Time',units='s')
-    wks_raw.from_list(1,data_raw['volt'],lname='Voltage',units='V')
-    if settings['cap']:
-        wks_raw.from_list(2,data_raw['cap'],lname='Capacity',units='mAh')
-    elif settings['spec_cap']:
-        wks_raw.from_list(2,data_raw['spec_cap'],lname='Specific Capacity',units='mAh/g')
+    batch = commands.add_parser('batch', help='analyze many raw data files in parallel')
+    batch.add_argument('files', nargs='+', help='raw data files, glob patterns, or directories')
+    batch.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes (default: number of CPUs)')
+    batch.add_argument('-o', '--out-dir', default=None, help='directory for the CSV results (default: next to the raw data)')
+    batch.add_argument('-s', '--set', type=parse_GITT_setting, action='append', default=[], metavar='KEY=VALUE[,ERROR]',
+                       help='override a setting of the .info files, e.g., --set rho=4.2 --set limiter=0.03')
+    batch.add_argument('--chunk-size', type=int, default=2**20, help='characters read at once when streaming the raw data')
+    batch.add_argument('--cache', action='store_true', help='load the raw data through the binary cache next to the .info file')
+    batch.add_argument('--monte-carlo', type=int, default=0, metavar='SAMPLES',
+                       help='add percentiles of D from Monte Carlo sampling of all uncertainties with this many samples')
+    batch.add_argument('--report', choices=['time','memory'], nargs='?', const='memory', default=None,
+                       help='write time, peak memory, and counts of every stage to <name>_report.json, '
+                            'with \'time\' without tracing the memory, which slows down the reading')
+    batch.add_argument('-f', '--format', choices=['csv','npz','parquet','h5'], default='csv',
+                       help='format of the results, the binary formats keep all uncertainties in full precision (default: csv)')
+    batch.add_argument('--result-cache', default=None, metavar='DIR',
+                       help='keep the results in this directory and reuse them for unchanged data and settings')
+    batch.add_argument('--detection', choices=['auto','current','voltage'], default='auto',
+                       help='detect the titrations from the current, from jumps in the voltage, or from the current if there is one (default: auto)')
+    batch.add_argument('--result-cache-size', type=float, default=1, metavar='GB', help='size limit of the result cache (default: 1 GB)')
+    batch.add_argument('--precision', choices=sorted(GITT_precisions), default='double',
+                       help='store voltage, capacity, and current as float64 (double) or float32 (single), the time is always float64 (default: double)')
+    batch.add_argument('--project', action='store_true',
+                       help='also write raw data, settings, and results to <name>.gittproj, which is reopened without parsing and analyzing')
     
-    # worksheet for processed data
-    wks_diff = book.add_sheet(name='diffusion_data')
-    if settings['cap'] or settings['spec_cap']:
-        cols = 6
-        half_cycle_label = []
-        for value in data_out['cycle']:
-            half_cycle_label.append(value + 1)
-    else:
-        cols = 3
-    wks_diff.cols = cols
-    
-    clm_info = [
-        {'data':data_out['time'],'label':'Time','units':'s','comments':''},
-        {'data':data_out['volt'],'label':'Voltage','units':'V','comments':''},
-        {'data':[x[0] for x in data_out['diff']],'label':'Diffusion Coefficient','units':'cm²/s','comments':''}, ### NO ERROR YET
-        {'data':[x[0] for x in data_out['spec_cap']],'label':'Specific Capacity','units':'mAh/g','comments':''},
-        {'data':[x[0] for x in data_out['ion']],'label':'Content Conducting Ion','units':'','comments':''},
-        {'data':half_cycle_label,'label':'Half Cycle','units':'','comments':'odd cycles: charge, even cycles: discharge'}
-        ]
-    
-    for idx in range(cols):    
-        wks_diff.from_list(idx,
-                           clm_info[idx]['data'],
-                           lname=clm_info[idx]['label'],
-                           units=clm_info[idx]['units'],
-                           comments=clm_info[idx]['comments'])
-        
+    follow = commands.add_parser('follow', help='analyze a raw data file while it is being written')
+    follow.add_argument('file', help='raw data file')
+    follow.add_argument('-i', '--interval', type=float, default=60, help='seconds between checks for new rows (default: 60)')
+    follow.add_argument('-o', '--output', default=None, help='CSV-file for the results (default: <name>_diffusion.csv next to the raw data)')
+    follow.add_argument('-s', '--set', type=parse_GITT_setting, action='append', default=[], metavar='KEY=VALUE[,ERROR]',
+                        help='override a setting of the .info file')
+    follow.add_argument('--once', action='store_true', help='analyze the file as it is, including the last titration, and exit')
+    follow.add_argument('--detection', choices=['auto','current','voltage'], default='auto',
+                        help='detect the titrations from the current, from jumps in the voltage, or from the current if there is one (default: auto)')
+    
+    sweep = commands.add_parser('sweep', help='find the settings scale and limiter that give the smoothest diffusion coefficients')
+    sweep.add_argument('file', help='raw data file')
+    sweep.add_argument('--scales', type=float, nargs='+', default=None, help='values of scale to test (default: 20 values from 0.25 to 8)')
+    sweep.add_argument('--limiters', type=float, nargs='+', default=None, help='values of limiter to test (default: 20 values from 0.001 to 0.3)')
+    sweep.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes (default: number of CPUs)')
+    sweep.add_argument('-s', '--set', type=parse_GITT_setting, action='append', default=[], metavar='KEY=VALUE[,ERROR]',
+                       help='override a setting of the .info file')
+    sweep.add_argument('--top', type=int, default=10, help='number of best settings shown')
+    
+    example = commands.add_parser('example', help='write mock GITT data of any size')
+    example.add_argument('file', help='raw data file to write')
+    size = example.add_mutually_exclusive_group()
+    size.add_argument('--pulses', type=int, default=25, help='number of titrations (default: 25)')
+    size.add_argument('--rows', type=int, default=None, help='approximate number of rows instead of titrations')
+    example.add_argument('--per-pulse', type=int, default=136, help='points per titration (default: 136)')
+    example.add_argument('--noise', type=float, default=0, help='standard deviation of the voltage noise in V')
+    example.add_argument('--seed', type=int, default=0, help='seed of the voltage noise')
+    example.add_argument('--capacity', choices=['cap','spec_cap','none'], default='cap', help='capacity column written (default: cap)')
+    example.add_argument('--header', choices=sorted(GITT_example_headers), default='biologic', help='column names and separator (default: biologic)')
+    example.add_argument('--current', action='store_true', help='also write the current')
+    
+    args = parser.parse_args(argv)
+    
+    if args.command == 'batch':
+        files = find_GITT_files(args.files)
+        if len(files) == 0:
+            print('no raw data files found')
+            return 1
+        try:
+            results = batch_GITT(files, dict(args.set), args.jobs, args.out_dir, args.chunk_size, args.cache, args.monte_carlo, args.report, args.format, args.result_cache, int(args.result_cache_size*1024**3), args.detection, args.precision, args.project)
+        except GITT_error as error:
+            print('{}: {}'.format(error.title, error))
+            return 1
+        if any(not result['ok'] for result in results):
+            return 1
+    elif args.command == 'sweep':
+        import numpy as np
+        scales = np.geomspace(0.25, 8, 20) if args.scales is None else args.scales
+        limiters = np.geomspace(0.001, 0.3, 20) if args.limiters is None else args.limiters
+        try:
+            best, table = sweep_GITT_file(args.file, scales, limiters, dict(args.set), args.jobs, top=args.top)
+        except GITT_error as error:
+            print('{}: {}'.format(error.title, error))
+            return 1
+        if best['score'] == 0:
+            return 1
+    elif args.command == 'example':
+        pulses = args.pulses if args.rows is None else max(1, args.rows//args.per_pulse)
+        capacity = None if args.capacity == 'none' else args.capacity
+        write_GITT_synthetic(open(args.file, mode='w'), pulses, args.per_pulse, args.noise, args.seed, capacity, args.header, current=args.current)
+    elif args.command == 'follow':
+        try:
+            follower = follow_GITT(args.file, dict(args.set), args.interval, args.output, args.once, args.detection)
+        except GITT_error as error:
+            print('{}: {}'.format(error.title, error))
+            return 1
+        if follower.evaluated == 0:
+            print('no titrations detected')
+            return 1
+    
+    return 0
 
-    if settings['cap'] or settings['spec_cap']:
-        # half cycle worksheets
-        current_cycle = -1
-        block_idx = []
-        for idx, cycle in enumerate(data_out['cycle']):
-            if cycle > current_cycle:
-                block_idx.append(idx)
-                current_cycle = cycle
-
-        wks_cycs = []
-        for idx, value in enumerate(block_idx):
-            if idx%2 == 0:
-                name = 'Charge {}'.format(1+idx//2)
-            else:
-                name = 'Discharge {}'.format(1+idx//2)
-                
-            wks_cycs.append(book.add_sheet(name=name))
-            wks_cycs[-1].cols = cols-1
-            
-            if idx == len(block_idx)-1:
-                lo_bound = block_idx[idx]
-                hi_bound = len(data_out['cycle']) 
-            else:
-                lo_bound = block_idx[idx]
-                hi_bound = block_idx[idx+1]
-              
-            for iidx in range(cols-1):
-                wks_cycs[-1].from_list(iidx,
-                                   clm_info[iidx]['data'][lo_bound:hi_bound],
-                                   lname=clm_info[iidx]['label'],
-                                   units=clm_info[iidx]['units'],
-                                   comments=clm_info[iidx]['comments'])           
+# GUI
 
 '''
-function outputs diffusion data
-Format: 
-    dictionary 'data_out', keys from list ['time','volt','spec_cap','cycle','diff']
-    'time' is measurement time and 'volt' is measured voltage associated with diffusion rate 'diff'
+This function imports the GUI toolkit as globals of the module, so the GUI can also be started
+after importing the module, e.g., with
+    import GITT_analysis
+    GITT_analysis.import_GITT_gui()
+    GITT_analysis.main_window()
+the analysis itself does not depend on it
+'''
+def import_GITT_gui():
+    global tk, ttk, fd, messagebox, os
+    import tkinter as tk
+    from tkinter import ttk
+    from tkinter import filedialog as fd
+    from tkinter import messagebox
+    import os
+
+'''
+This function collects the numerical settings from the entries of the GUI, as well as the number of
+Monte Carlo samples and whether the timing is checked, so the analysis can run without the GUI
+raises GITT_error for non-numerical settings
+'''
+def read_GITT_gui_settings(settings):
     
-    if capacity data is supplied, output also contains
-    'spec_cap' (special capacity)
-    'cycle' (current cycle, usually 0 is first charge, 1 is first discharge, 2 is second charge, etc.)
+    values = {}
+    errors = {}
+    for p_key in ['A','m_AM/A','M_AM','refcap','c0','rho','scale','limiter']:
+        values[p_key] = settings[p_key].entry_main.get()
+        if hasattr(settings[p_key], 'entry_error'):
+            errors[p_key] = settings[p_key].entry_error.get()
     
-    datapoints are stored in lists:
-    data_out[key] = []
-'''
-def write_GITT_data(savefile,data_out,settings):
+    p_val = get_GITT_parameters(values, errors)
+    samples = 10000 if settings['monte_carlo'].get() else 0
     
-    with savefile as f:
-        if settings['cap'] or settings['spec_cap']:            
-            f.write('{:16},{:16},{:16},{:16},{:16},{:16}\n'.format('time/s','volt/V','x_ion','SpecCap/mAh/g','D/cm^2/s','Cycle'))
-            for i,value in enumerate(data_out['diff']):
-                f.write('{:16.10e},{:16.10e},{:16.10e},{:16.10e},{:16.10e},{:4}\n'.format(data_out['time'][i],data_out['volt'][i],data_out['ion'][i][0],data_out['spec_cap'][i][0],data_out['diff'][i][0],data_out['cycle'][i])) ### NO ERROR YET
-        else:
-            f.write('{:16},{:16},{:16}\n'.format('time/s','volt/V','D/cm^2/s'))
-            for i,value in enumerate(data_out['diff']):
-                f.write('{:16.10e},{:16.10e},{:16.10e}\n'.format(data_out['time'][i],data_out['volt'][i],data_out['diff'][i]))
+    return p_val, samples, settings['timing'].get()
 
-
-# METHODS
 '''
-function produces a numerical derivative of a given pair of x and y-values
-slope at x determined with formula f(x+delta)-f(x-delta)/(2*delta)
+This function shows the messages returned by the analysis as message boxes
 '''
-def get_numerical_derivative(x,y):
+def show_GITT_messages(messages):
     
-    derivative = []
-
-    for i, value in enumerate(x):
-        if i == 0:
-            m = (y[i+1]-y[i])/(x[i+1]-x[i])
-        elif i == len(x)-1:
-            m = (y[i]-y[i-1])/(x[i]-x[i-1])
+    for kind, title, text in messages:
+        if kind == 'error':
+            messagebox.showerror(title, text)
+        elif kind == 'warning':
+            messagebox.showwarning(title, text)
         else:
-            m = (y[i+1]-y[i-1])/(x[i+1]-x[i-1])
-        derivative.append(m)
-        
-    return derivative
+            messagebox.showinfo(title, text)
 
 '''
-This function processes the raw GITT data
+This function writes an example file with mock GITT data.
 '''
-def process_GITT(GITT_data,settings):
-    import numpy as np
-    from scipy.stats import linregress
-    
-    # initial data transformation, time as x-axis, voltage as y-axis
-    x = GITT_data['time']
-    y = GITT_data['volt']
-    
-    p_list = ['A','m_AM/A','M_AM','refcap','c0','rho','scale','limiter']
-    p_val = {}
+def write_GITT_example():
     
-    for p_key in p_list:
-        p_val[p_key] = [0,0]
-        try:
-            p_val[p_key][0] = float(settings[p_key].entry_main.get())
-        except:
-            messagebox.error('Faulty Settings','The setting {} contains non-numerical data. Please check setting and correct.'.format(p_key))
-            return 0,0
+    Files = [('TXT File', '*.txt'),
+        ('All Files', '*.*')]
+    savefile = fd.asksaveasfile(filetypes = Files, defaultextension = Files)
     
-    # assigns capacity if it was provided
-    # prefers special capacity over pure capacity, if both are provided
-    settings['spec_cap'] = False
-    settings['cap'] = False
+    write_GITT_synthetic(savefile)
 
-    if 'spec_cap' in GITT_data:
-        raw_spec_cap = GITT_data['spec_cap']
-        settings['spec_cap'] = True
-    elif 'cap' in GITT_data:
-        x_cap = GITT_data['cap']
-        settings['cap'] = True  
+'''
+class runs loading, analysis, and saving one after the other in a background thread, so the GUI stays
+responsive; tasks are queued with submit and can be cancelled with cancel, which aborts the running task
+at its next stage (see GITT_task_report) and drops all waiting tasks
+
+the stages and the progress of the running task are shown with the label and the progress bar of the
+GUI, the result of every task is passed back to the GUI thread by polling the queue of events
+'''
+class GITT_worker:
     
-    def calculate_m_AM(m_AM_A,A):
-        
-        m_AM = m_AM_A[0] * A[0] / 1000
-        
-        d_m_AM_A = m_AM_A[1]/(1000*A[0])
-        d_A = A[1]*m_AM_A[0]/(1000*A[0]**2)        
-        m_AM_err = np.sqrt(d_A**2+d_m_AM_A**2)
-        
-        return m_AM, m_AM_err
+    # fraction of the progress bar reached at the start of every stage of the analysis
+    stage_progress = {'derivative': 0.05, 'detection': 0.15, 'pulse table': 0.3, 'regression': 0.4,
+                      'capacity': 0.6, 'diffusion': 0.7, 'monte carlo': 0.75, 'export': 0.5}
     
-    p_val['m_AM'] = calculate_m_AM(p_val['m_AM/A'],p_val['A'])
+    def __init__(self, root, label, bar):
+        import queue
+        import threading
+        
+        self.root = root
+        self.label = label
+        self.bar = bar
+        self.tasks = queue.Queue()
+        self.events = queue.Queue()
+        self.generation = 0
+        self.waiting = 0
+        self.task = ''
+        self.stage = ''
+        
+        threading.Thread(target=self.run, daemon=True).start()
+        self.root.after(100, self.poll)
     
-    def calculate_V_mol(M_AM,rho):
+    # work(report) is called in the background thread, done(kind, value) in the GUI thread with
+    # kind 'done' and the result of work, 'error' and the GITT_error, or 'cancelled'
+    def submit(self, name, work, done, report=GITT_no_report):
         
-        V_mol = M_AM[0] / rho[0]
-        
-        d_M_AM = M_AM[1]/(rho[0])
-        d_rho = rho[1]*M_AM[0]/(rho[0]**2)        
-        V_mol_err = np.sqrt(d_M_AM**2+d_rho**2)
-        
-        return V_mol, V_mol_err
+        self.waiting += 1
+        self.tasks.put((self.generation, name, work, done, report))
+        self.show()
     
-    p_val['V_mol'] = calculate_m_AM(p_val['M_AM'],p_val['rho'])
-    
-    
-    
-    # calculate specific capacity, current cycle, and ion content at every given time
-    charge = True
-    current_cycle = 0 # charge-discharge cycle number
-    ref_cap = 0
-    max_cap = 0
-    x_ion = []
-    x_spec_cap = []
-    y_cycle = []    
-    
-    # this logic works with regular output from a BioLogic cycler
-    # i.e., capacity is reset to 0 for every new charge or discharge cycle
-    # capacity only ever rises and never decreases
-    if settings['cap']:
-        for i, cap in enumerate(x_cap):
-            y_cycle.append(current_cycle)
-            if i > 1 and x_cap[i]-x_cap[i-1] < 0:
-                current_cycle += 1
-                if charge:
-                    charge = False
-                    ref_cap = ref_cap+x_cap[i-1]
-                else:
-                    charge = True
-                    ref_cap = ref_cap-x_cap[i-1]
-            spec_cap = [0,0]
-            if charge == True:
-                spec_cap[0] = (ref_cap+cap)/p_val['m_AM'][0]
-            else:
-                spec_cap[0] = (ref_cap-cap)/p_val['m_AM'][0]
-            spec_cap[1] = p_val['m_AM'][1]/p_val['m_AM'][0]**2
-            x_spec_cap.append(spec_cap)
-            
-            def calculate_x_ion(spec_cap,ref_cap,c0):
-                x_ion_value = -spec_cap[0]/ref_cap[0] + c0[0]
-                               
-                d_spec_cap = spec_cap[1]/ref_cap[0]
-                d_ref_cap = ref_cap[1]*spec_cap[0]/ref_cap[0]**2
-                d_c0 = c0[1]
-                x_ion_err = np.sqrt(d_spec_cap**2+d_ref_cap**2+d_c0**2)
-                
-                return [x_ion_value, x_ion_err]
-            
-            x_ion.append(calculate_x_ion(spec_cap,p_val['refcap'],p_val['c0']))
-            
-            
-    elif settings['spec_cap']:
-        charge = True
-
-        for i in range(len(raw_spec_cap)):
-            y_cycle.append(current_cycle)
-            if i > 1:
-                if raw_spec_cap[i] > max_cap:
-                    max_cap = raw_spec_cap[i]
-                    
-                if raw_spec_cap[i] > 1E-4 and raw_spec_cap[i] < 1E-4*max_cap:
-                    current_cycle += 1
-                    if charge:
-                        charge = False
-                        ref_cap = ref_cap+max_cap  
-                    else:
-                        charge = True
-                        ref_cap = ref_cap-max_cap
-                    max_cap = 0
-                
-                spec_cap = [0,0]
-                if charge == True:
-                    spec_cap[0] = (ref_cap+raw_spec_cap[i])
-                else:
-                    spec_cap[0] = (ref_cap-raw_spec_cap[i])
-                    
-                x_spec_cap.append(spec_cap) # cannot compute error without errors from measurement yet
-                x_ion.append(calculate_x_ion(spec_cap,p_val['refcap'],p_val['c0']))
-
-    # get numerical derivative of voltage
-    # cutoff determines minimum jump in derivative required for it to be counted
-    y_deriv = get_numerical_derivative(x, y)
-    y_deriv_cutoff = p_val['limiter'][0]*np.mean(list(map(abs, y_deriv)))
-
-    # this part detects when the current is applied and removed
-    # makes this less dependent on format of GITT data
-    current_on = []
-    current_off = []
-    on_times = []
-    off_times = []
-    load = False
-    bad_fit = 0
-    bad_expol = 0    
-    
-    for i, value in enumerate(y_deriv):
-        # detects positive derivative jump
-        if y_deriv[i] > abs(p_val['scale'][0]*y_deriv[i-1]) and y_deriv[i] > y_deriv_cutoff and load == False:
-            # switches meaning of jump depending of whether the cell is currently being charged or discharged
-            if len(current_on) == 0 or y[current_on[-1]] < y[i]:
-                current_on.append(i)
-                on_times.append(x[i])
-            else:
-               current_off.append(i)
-               off_times.append(x[i])
-            load = True
-        # detects negative derivative jump, same logic as for positive derivative jump but flipped
-        elif y_deriv[i] < -abs(p_val['scale'][0]*y_deriv[i-1]) and y_deriv[i] < -y_deriv_cutoff and load == True:
-            if len(current_on) == 0 or y[current_on[-1]] < y[i]:
-                current_off.append(i)
-                off_times.append(x[i])
-            else:
-               current_on.append(i)
-               on_times.append(x[i])
-            load = False
+    def cancel(self):
+        
+        self.generation += 1
     
-    # evaluate E1-E4, charging time tau
-    D_out = {
-        'ion':      [],
-        'spec_cap': [],
-        'cycle':    [],
-        'time':     [],
-        'volt':     [],
-        'diff':     []
-        }
-    GITT_refined = []
+    def run(self):
+        
+        while True:
+            generation, name, work, done, inner = self.tasks.get()
+            cancelled = lambda : generation != self.generation
+            self.events.put(('start', name))
+            try:
+                if cancelled():
+                    raise GITT_cancelled('Cancelled', 'The task was cancelled.')
+                result = ('done', work(GITT_task_report(inner, self.events, cancelled)))
+            except GITT_cancelled:
+                result = ('cancelled', None)
+            except GITT_error as error:
+                result = ('error', error)
+            except Exception as error:
+                result = ('error', GITT_error('Unexpected error', '{}: {}'.format(type(error).__name__, error)))
+            self.events.put(('finish', done, result))
     
-    off = 0
-    for i, on in enumerate(current_on):   
-        # discard the first cycle
-        if i == 0:
-            continue
+    def poll(self):
+        import queue
         
-        # determines the next point after on at which current is turned off
-        relax = x[on]-x[off]
-        for off in current_off:
-            if off > on:
-                break
-        
-        # determination of E1, E3, and tau
-        E1 = [0,0] # ERROR PENDING
-        E1[0] = y[on]
-        tau = x[off]-x[on]
-        
-        # E4 requires logic to properly treat final titration
-        E4 = [0,0] # ERROR PENDING
-        if i < len(current_on)-1:
-            E4[0] = y[current_on[i+1]]
-        else:
-            E4[0] = y[-1]
-            
-        # E2 requires linear regression for sqrt-behavior while current is applied
-        interval_x = []
-        interval_y = []
-        test_x = []
-        for j in range(on,off):#+int((on-off)/2),off):
-            if x[j]-x[on] > tau/2:
-                interval_x.append(np.sqrt(x[j]-x[on]))
-                test_x.append(x[j]-x[on])
-                interval_y.append(y[j])
         try:
-            regress_param = linregress(interval_x,interval_y)
-        except:
-            continue
-        
-        # print(len(interval_x))
-        # for idx, i_x in enumerate(interval_x):
-        #     print(i_x,test_x[idx],interval_y[idx])
-        
-        m = [regress_param.slope,regress_param.stderr]
-        b = [regress_param.intercept,regress_param.intercept_stderr]
-        
-        E2 = [0,0]
-        E2[0] = b[0]
-        E2[1] = b[1]
-        
-        if regress_param.rvalue**2 < 0.99:
-            bad_fit += 1
-        
-        E3 = [0,0]
-        E3[0] = m[0] * np.sqrt(tau) + b[0]
-        E3[1] = np.sqrt((m[1]*np.sqrt(tau))**2 + b[1]**2)
-        
-        # check if E2 is lower than E1 during charge or higher during discharge, set E2 to E1
-        if E2[0] < E3[0] and E2[0] < E1[0]:
-            E2[0] = E1[0]
-            E2 = E1
-            bad_expol += 1
-        elif E2[0] > E3[0] and E2[0] > E1[0]:
-            E2 = E1
-            bad_expol += 1
-        
-        # print(E3,m,b)
-        
-        # if i ==2:
-        #     sys.exit()
-        
-        GITT_refined.append((E1,E2,E3,E4,tau,x[on],x[on],x[off],regress_param.rvalue**2,relax)) # required for plotting
-        
-        # collect data for output
-        if settings['cap'] or settings['spec_cap']:
-            # the +1 is a fix to properly process Arbin data
-            D_out['ion'].append(x_ion[current_on[i]+1])
-            D_out['spec_cap'].append(x_spec_cap[current_on[i]+1])
-            D_out['cycle'].append(y_cycle[current_on[i]+1])   
-        D_out['time'].append(x[current_on[i]])
-        D_out['volt'].append(y[current_on[i]])
-        
-        # calculation of the diffusion constants
-        dE_s = E4[0]-E1[0]
-        dE_t = E3[0]-E2[0]
-        
-        D = [0,0]
-        D[0] = 4/(np.pi*tau) * (p_val['m_AM'][0] * p_val['V_mol'][0]/(p_val['M_AM'][0]*p_val['A'][0]))**2 * ((dE_s)/(dE_t))**2
-        
-        pf = 8/(np.pi*tau)
-        d_A = pf*(p_val['m_AM'][0]*p_val['V_mol'][0]/p_val['M_AM'][0])**2 * p_val['A'][0]**-3*((dE_s)/(dE_t))**2
-        d_A *= p_val['A'][1]
-        
-        tmp = pf*(p_val['m_AM'][0]*p_val['V_mol'][0]/(p_val['M_AM'][0]*p_val['A'][0]))**2*((dE_s)/(dE_t))**2/dE_t
-        d_E2 = tmp*E2[1]
-        d_E3 = tmp*E3[1]
-
-        
-        D[1] = np.sqrt(d_A**2+d_E2**2+d_E3**2)
-        
-        # PARTIAL ERROR
-        D_out['diff'].append(D) 
+            while True:
+                event = self.events.get_nowait()
+                if event[0] == 'start':
+                    self.task = event[1]
+                    self.stage = ''
+                    self.bar['value'] = 0
+                elif event[0] == 'stage':
+                    if event[1] in self.stage_progress:
+                        self.bar['value'] = 100*self.stage_progress[event[1]]
+                    self.stage = event[1]
+                elif event[0] == 'progress':
+                    self.bar['value'] = 100*event[1]
+                elif event[0] == 'finish':
+                    self.waiting -= 1
+                    self.task = ''
+                    self.bar['value'] = 0
+                    # a failing callback, e.g., a settings file that cannot be written, must not stop the polling
+                    try:
+                        event[1](*event[2])
+                    except Exception as error:
+                        messagebox.showerror('Unexpected error', '{}: {}'.format(type(error).__name__, error))
+                self.show()
+        except queue.Empty:
+            pass
+        
+        self.root.after(100, self.poll)
     
-    # check whether there is issues with the titration lengths
-    def evaluate_tau(taus,relaxes):
-        
-        buckets = [0,0,0]
-        tot_length = [0,0,0]
-        median_tau = np.median(taus)
-        median_rlx = np.median(relaxes)
-        
-        for tau in taus:
-            if tau > 0.95*median_tau and tau < 1.05*median_tau:
-                buckets[1] += 1
-                tot_length[1] += tau
-            elif tau > 1.05*median_tau:   
-                buckets[2] += 1
-                tot_length[2] += tau
-            elif tau < 0.95*median_tau:
-                buckets[0] += 1
-                tot_length[0] += tau
-        
-        if tot_length[2] > tot_length[1] or buckets[2] > 0.01*buckets[1]:
-            messagebox.showwarning('Check Results','A significant number of abnormally long titration cycles was obtained, indicating that the program failed to correctly identify all titration cycles. Please reduce the settings \'scale\' and \'limiter\'.')
-        
-        if median_tau > median_rlx/4:
-            messagebox.showwarning('Titration timings','''Titration duration
-Current applied for {:.2f} s
-Relaxing for {:.2f} s
-Relaxation time is relatively short compared to charging time. Make sure that the relaxation is sufficiently long!'''.format(median_tau,median_rlx))
-        elif settings['timing'].get():
-            messagebox.showinfo('Titration timings','''Titration duration
-Current applied for {:.2f} s
-Relaxing for {:.2f} s'''.format(median_tau,median_rlx))
-
-    evaluate_tau(list(zip(*GITT_refined))[4],list(zip(*GITT_refined))[9])
-    
-    if bad_fit > 0:
-        messagebox.showinfo('Check Results','The regression for determining the onset energy yielded a bad fit {} times. Please check the results for errors and outliers.'.format(bad_fit))
-
-    return D_out, GITT_refined
-
-# GUI
+    def show(self):
+        
+        if self.waiting == 0:
+            self.label['text'] = 'Ready'
+        elif self.task == '':
+            self.label['text'] = '{} task(s) waiting'.format(self.waiting)
+        else:
+            self.label['text'] = '{}{} ({} more waiting)'.format(self.task, ': '+self.stage if self.stage != '' else '', self.waiting-1)
 
 '''
 Function for plotting results from analyzed GITT data
@@ -603,13 +3139,12 @@ messy code, refactoring not yet planned
 '''
 class plot_window:
     # initializes the window and default plotting data
-    def __init__(self,GITT_data,GITT_refined,D_out,settings):
+    def __init__(self,GITT_data,titrations,settings):
         
         self.root = create_window('1000x700+120+120', 'V-t and D-t plot')
     
         self.data = GITT_data
-        self.refined = GITT_refined
-        self.D = D_out
+        self.titrations = titrations
         self.settings = settings
         self.dpi_default = 100
         self.dpi_set = str(self.dpi_default)
@@ -622,6 +3157,7 @@ class plot_window:
     # creates the plot with matplotlib
     def plot_form_factors(self): 
         
+        import numpy as np
         import matplotlib.pyplot as plt
         from matplotlib.backends.backend_tkagg import (FigureCanvasTkAgg,  
         NavigationToolbar2Tk)
@@ -641,40 +3177,36 @@ class plot_window:
         colors = ['green','blue','red']
         alphas = [1.0,1.0,1.0,1.0]
         labels = ['E1','E2','E3']
-        props = dict(boxstyle='round', facecolor='white', alpha=0.5)
+        # E1 and E2 are plotted when the current is switched on, E3 when it is switched off
+        times = ['t_on','t_on','t_off']
+        T = self.titrations
         for i in range(3):
-            tmp = [[],[],[]]
-            for result in self.refined:
-                # print(result)
-                if i < 3:
-                    tmp[0].append(result[i+5])
-                    tmp[1].append(result[i][0])
-                    tmp[2].append(result[i][1])
-                else:
-                    tmp[0].append(result[i+4])
-                    tmp[1].append(result[-1])
-                    tmp[2].append(0)
-                # if i == 0:
-                #     ax.text(result[i+5],result[i],'R²:{:.3f}'.format(result[8]),bbox=props)
-                    
-            ax.scatter(tmp[0],tmp[1],marker='x',color=colors[i],zorder=50,label=labels[i],alpha=alphas[i])
-            ax.errorbar(tmp[0],tmp[1],xerr=0,yerr=tmp[2],fmt='none',color=colors[i])
+            ax.scatter(T[times[i]],T[labels[i]],marker='x',color=colors[i],zorder=50,label=labels[i],alpha=alphas[i])
+            ax.errorbar(T[times[i]],T[labels[i]],xerr=0,yerr=T[labels[i]+'_err'],fmt='none',color=colors[i])
             
-        ax.plot(self.data['time'],self.data['volt'],linestyle='-',label='E',marker='x')
+        # the raw data is decimated to the visible range and the width of the plot, and decimated
+        # again whenever the range is changed by zooming or panning or the window is resized
+        trace, = ax.plot(*self.trace_data(ax),linestyle='-',label='E',marker='x')
+        ax.callbacks.connect('xlim_changed', lambda ax : trace.set_data(*self.trace_data(ax)))
         plt.xticks(fontsize=fs)
         plt.yticks(fontsize=fs)
         
         ax2 = ax.twinx()
-        ax2.scatter(self.D['time'],[x[0] for x in self.D['diff']],color='black',marker='+',label='D')
-        ax2.errorbar(self.D['time'],[x[0] for x in self.D['diff']],xerr=0,yerr=[x[1] for x in self.D['diff']],fmt='none',color='black')
+        ax2.scatter(T['t_on'],T['D'],color='black',marker='+',label='D')
+        if 'D_50' in T.dtype.names:
+            # asymmetric interval between the 2.5 and 97.5 percentiles of the Monte Carlo samples
+            yerr = [np.maximum(T['D']-T['D_2.5'],0),np.maximum(T['D_97.5']-T['D'],0)]
+        else:
+            yerr = T['D_err']
+        ax2.errorbar(T['t_on'],T['D'],xerr=0,yerr=yerr,fmt='none',color='black')
         
         h1, l1 = ax.get_legend_handles_labels()
         h2, l2 = ax2.get_legend_handles_labels()
         ax2.legend(h1+h2, l1+l2,loc=1,fontsize=fs)
         
         ax2.set_yscale('log')
-        ylim2_max = max([x[0] for x in self.D['diff']])*5
-        ylim2_min = min([x[0] for x in self.D['diff']])/5
+        ylim2_max = np.nanmax(T['D'])*5
+        ylim2_min = np.nanmin(T['D'])/5
         ax2.set_ylim(ylim2_min,ylim2_max)
         plt.yticks(fontsize=fs)
         
@@ -686,6 +3218,7 @@ class plot_window:
     
         # creates and places Tkinter canvas for the matplotlib figure
         canvas = FigureCanvasTkAgg(fig, master = self.root)   
+        canvas.mpl_connect('resize_event', lambda event : trace.set_data(*self.trace_data(ax)))
         canvas.draw() 
         canvas.get_tk_widget().pack(side=tk.TOP,fill='both',expand=False)
         
@@ -693,6 +3226,24 @@ class plot_window:
         toolbar = NavigationToolbar2Tk(canvas, self.root) 
         toolbar.update()
         canvas.get_tk_widget().pack(side=tk.TOP,fill='both',expand=True) 
+    
+    # returns the points of the voltage trace that are drawn for the current range of the plot,
+    # the whole measurement before anything is plotted, always keeping the points at which the
+    # current is switched (see get_GITT_decimation)
+    def trace_data(self, ax):
+        import numpy as np
+        
+        x = np.asarray(self.data['time'])
+        y = np.asarray(self.data['volt'])
+        if not hasattr(self, 'trace_keep'):
+            switches = np.concatenate((self.titrations['t_on'], self.titrations['t_off']))
+            self.trace_keep = np.searchsorted(x, switches)
+            lo, hi = x[0], x[-1]
+        else:
+            lo, hi = ax.get_xlim()
+        
+        idx = get_GITT_decimation(x, y, lo, hi, ax.get_window_extent().width, self.trace_keep)
+        return x[idx], y[idx]
       
 '''
 Function to streamline the creation of the labeled entries
@@ -756,15 +3307,20 @@ class main_window:
         self.raw_file = None
         self.raw_filename = ''
         self.GITT_data = 0
-        self.D_data = 0
+        self.D_data = None
+        # settings p_val, timing, samples, and messages of the analysis that gave D_data
+        self.D_analysis = None
+        self.results = GITT_result_cache()
+        self.report = GITT_no_report
                 
         self.settings = {}
         
-        self.root = create_window('450x550+120+120','GITT Analysis')
+        self.root = create_window('450x600+120+120','GITT Analysis')
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(1, weight=1)
         self.frame_buttons()
         self.frame_entry_fields()
+        self.frame_status()
         
         self.root.mainloop()
   
@@ -788,35 +3344,35 @@ class main_window:
             self.frame_entry_fields, 
             pos = 1, 
             label = ['m/A','mg/cm²'], 
-            init_value = 5,
+            init_value = GITT_defaults['m_AM/A'][0],
             b_error = True)
         
         self.settings['M_AM'] = labeled_entry(
             self.frame_entry_fields, 
             pos = 2, 
             label = ['M','g/mol'], 
-            init_value = 100,
+            init_value = GITT_defaults['M_AM'][0],
             b_error = True)
         
         self.settings['rho'] = labeled_entry(
             self.frame_entry_fields, 
             pos = 3, 
             label = ['ρ','g/cm³'], 
-            init_value = 4,
+            init_value = GITT_defaults['rho'][0],
             b_error = True)
         
         self.settings['refcap'] = labeled_entry(
             self.frame_entry_fields, 
             pos = 4, 
             label = ['ref cap.','mAh/g'], 
-            init_value = 150,
+            init_value = GITT_defaults['refcap'][0],
             b_error = True)
         
         self.settings['c0'] = labeled_entry(
             self.frame_entry_fields, 
             pos = 5, 
             label = ['c_0 (ion)',''], 
-            init_value = 1.0,
+            init_value = GITT_defaults['c0'][0],
             b_error = True)
         
         self.entries_title = tk.Label(self.frame_entry_fields,
@@ -827,7 +3383,7 @@ class main_window:
             self.frame_entry_fields, 
             pos = 7, 
             label = ['A_cont','cm²'], 
-            init_value = 1.25,
+            init_value = GITT_defaults['A'][0],
             b_error = True)
         
         self.entries_title = tk.Label(self.frame_entry_fields,
@@ -838,13 +3394,13 @@ class main_window:
             self.frame_entry_fields, 
             pos = 9, 
             label = ['scale',''], 
-            init_value = 1)
+            init_value = GITT_defaults['scale'][0])
         
         self.settings['limiter'] = labeled_entry(
             self.frame_entry_fields, 
             pos = 10, 
             label = ['limiter',''], 
-            init_value = 0.01)
+            init_value = GITT_defaults['limiter'][0])
         
         self.frame_checkbts = tk.Frame(self.frame_entry_fields)
         self.frame_checkbts.grid(row=11,column=0,sticky='N')
@@ -863,6 +3419,49 @@ class main_window:
                 offvalue = False)
         _checkbt_plot.grid(row=0,column=1,sticky='W')
         
+        self.settings['monte_carlo'] = tk.BooleanVar()
+        _checkbt_plot = tk.Checkbutton(self.frame_checkbts, text = "Monte Carlo errors", 
+                variable = self.settings['monte_carlo'], 
+                onvalue = True, 
+                offvalue = False)
+        _checkbt_plot.grid(row=1,column=0,sticky='W')
+        
+        self.settings['report'] = tk.BooleanVar()
+        _checkbt_plot = tk.Checkbutton(self.frame_checkbts, text = "Performance report", 
+                variable = self.settings['report'], 
+                onvalue = True, 
+                offvalue = False)
+        _checkbt_plot.grid(row=1,column=1,sticky='W')
+        
+        self.settings['origin_raw'] = tk.BooleanVar(value=True)
+        _checkbt_plot = tk.Checkbutton(self.frame_checkbts, text = "Raw data to Origin", 
+                variable = self.settings['origin_raw'], 
+                onvalue = True, 
+                offvalue = False)
+        _checkbt_plot.grid(row=2,column=0,sticky='W')
+        
+    '''
+    This frame shows the progress of the tasks running in the background and allows to cancel them.
+    '''
+    def frame_status(self):
+        
+        self.frame_status = tk.Frame(self.root)
+        self.frame_status.grid(row=3,column=0,sticky='EW')
+        self.frame_status.columnconfigure(0, weight=1)
+        
+        label_status = ttk.Label(self.frame_status, text='Ready')
+        label_status.grid(row=0,column=0,columnspan=2,sticky='W')
+        
+        progress_bar = ttk.Progressbar(self.frame_status, orient='horizontal', mode='determinate', maximum=100)
+        progress_bar.grid(row=1,column=0,sticky='EW')
+        
+        _button_cancel = ttk.Button(self.frame_status,
+                                    text = 'Cancel',
+                                    command = lambda : self.worker.cancel())
+        _button_cancel.grid(row=1,column=1,sticky='E')
+        
+        self.worker = GITT_worker(self.root, label_status, progress_bar)
+    
     '''
     This frame handles all relevant buttons.
     '''
@@ -914,7 +3513,7 @@ class main_window:
                 label_GITT_file.insert(tk.END,'No raw GITT data loaded.')
             else:
                 label_GITT_file.insert(tk.END,self.raw_filename)
-            if self.D_data != 0:
+            if self.D_data is not None:
                 label_GITT_file.insert(tk.END,'\nData processed!')
             
             label_GITT_file.grid(row=2,column=0,columnspan=3,pady=10)
@@ -948,86 +3547,291 @@ class main_window:
         '''
         def fetch_GITT_settings():
             
-            number_settings = ['refcap','m_AM/A','M_AM','rho','c0','A','scale','limiter']
-            settings_file = self.raw_file.split('.')[0]+'.info'
+            settings_file = os.path.splitext(self.raw_file)[0]+'.info'
             if os.path.isfile(settings_file):
-                with open(settings_file, mode='r') as f:
-                    for line in f.readlines():
-                        for item in number_settings:
-                            if line.split(',')[0] == item:
-                                self.settings[item].entry_main.delete(0,tk.END)
-                                self.settings[item].entry_main.insert(0, float(line.split(',')[1]))
-                                if not item in ['scale','limiter']:
-                                    self.settings[item].entry_error.delete(0,tk.END)
-                                    self.settings[item].entry_error.insert(0, float(line.split(',')[2]))
+                enter_GITT_settings(read_GITT_settings(settings_file))
+        
+        '''
+        This function fills the entries with the settings given as pairs [value, error].
+        '''
+        def enter_GITT_settings(values):
+            for item, value in values.items():
+                self.settings[item].entry_main.delete(0,tk.END)
+                self.settings[item].entry_main.insert(0, value[0])
+                if not item in ['scale','limiter']:
+                    self.settings[item].entry_error.delete(0,tk.END)
+                    self.settings[item].entry_error.insert(0, value[1])
     
         '''
-        This function imports raw GITT data.
+        This function starts a new performance report for the stages from loading to exporting the data,
+        if requested.
+        '''
+        def new_report():
+            if self.settings['report'].get():
+                self.report = GITT_report()
+            else:
+                self.report = GITT_no_report
+        
+        '''
+        This function writes the performance report as <name>_report.json next to the raw data.
+        '''
+        def write_report():
+            if self.report is not GITT_no_report:
+                self.report.write_json(os.path.splitext(self.raw_file)[0]+'_report.json')
+        
+        '''
+        This function imports raw GITT data in the background. If several files are selected,
+        they are queued for analysis instead. GITT projects are reopened with their settings and results.
         '''
         def get_GITT_raw():
             filetypes = (
                 ('data files', '*.csv;*.txt;*.dat'),
+                ('GITT projects', '*.gittproj'),
                 ('All files', '*.*'))
             
-            self.raw_file = fd.askopenfilename(
-                title='Open GITT raw data file',
+            files = fd.askopenfilenames(
+                title='Open GITT raw data file(s)',
                 initialdir='./',
                 filetypes=filetypes)
+            if len(files) > 1:
+                queue_GITT_files(files)
+                return
+            raw_file = files[0] if len(files) > 0 else ''
             
-            if os.path.isfile(self.raw_file) == True:
-                self.GITT_data = get_GITT_data(self.raw_file)
-                if self.GITT_data != 0:
+            if os.path.isfile(raw_file) and raw_file.lower().endswith('.gittproj'):
+                open_GITT_project(raw_file)
+            elif os.path.isfile(raw_file) == True:
+                new_report()
+                
+                def loaded(kind, value):
+                    if kind == 'error':
+                        messagebox.showerror(value.title, str(value))
+                    if kind != 'done':
+                        return
+                    self.raw_file = raw_file
+                    self.GITT_data = value
+                    self.D_data = None
                     self.raw_filename = 'GITT raw data loaded: '+self.raw_file
                     self.frame_top_buttons.destroy()
                     top_buttons(self)
                     fetch_GITT_settings()
-                    self.settings['name'] = os.path.basename(self.raw_file.split('.')[0])                
-            elif not self.raw_file == '':
+                    self.settings['name'] = os.path.splitext(os.path.basename(self.raw_file))[0]
+                
+                self.worker.submit('Loading '+os.path.basename(raw_file), lambda report : get_GITT_data_cached(raw_file, report=report), loaded, self.report)
+            elif not raw_file == '':
                 messagebox.showerror('No input file!', 'Input file could not be found!')
         
         '''
-        This function processes raw GITT data. Depending on whether launched in an OriginLab
-        environment or not, it either writes the results to an OriginLab workbook or
-        plots the D-t and V-t diagram for checking the sensibility of the results
+        This function reopens a GITT project in the background with its raw data, settings, and results.
+        The results are put into self.results, so they are plotted or saved without analyzing the raw
+        data again, as long as the settings are not changed.
         '''
-        def try_process_GITT():
-            import sys
+        def open_GITT_project(project_file):
+            new_report()
+            
+            def work(report):
+                import numpy as np
+                
+                with GITT_project(project_file) as project:
+                    GITT_data = project.get_GITT_data(report)
+                    with report.stage('result cache'):
+                        project.cache_results(self.results, GITT_data)
+                    # the table is copied, so the project is not mapped and can be saved again under the same name
+                    titrations = project.read_titrations()
+                    if titrations is not None:
+                        titrations = np.array(titrations)
+                    manifest = project.manifest
+                    analysis = (project.get_parameters(), manifest['timing'], manifest['samples'], project.messages)
+                    return GITT_data, titrations, project.settings, project.flags, analysis
+            
+            def opened(kind, value):
+                if kind == 'error':
+                    messagebox.showerror(value.title, str(value))
+                if kind != 'done':
+                    return
+                GITT_data, titrations, values, flags, analysis = value
+                self.raw_file = project_file
+                self.GITT_data = GITT_data
+                self.D_data = titrations
+                self.D_analysis = analysis
+                self.raw_filename = 'GITT project loaded: '+self.raw_file
+                self.frame_top_buttons.destroy()
+                top_buttons(self)
+                enter_GITT_settings(values)
+                self.settings.update(flags)
+                self.settings['name'] = os.path.splitext(os.path.basename(self.raw_file))[0]
+            
+            self.worker.submit('Opening '+os.path.basename(project_file), work, opened, self.report)
+        
+        '''
+        This function queues several raw data files for analysis in the background, each with the settings
+        from its .info-file or, without .info-file, with the current settings. The results are written as
+        <name>_diffusion.csv next to the raw data and summarized in the console.
+        '''
+        def queue_GITT_files(files):
+            try:
+                p_val, samples, timing = read_GITT_gui_settings(self.settings)
+            except GITT_error as error:
+                messagebox.showerror(error.title, str(error))
+                return
+            
+            # the outcome of every file is collected and shown once all files are finished
+            summary = []
+            failed = []
+            
+            def finished(line, failure=False):
+                summary.append(line)
+                if failure:
+                    failed.append(line)
+                if len(summary) < len(files):
+                    return
+                text = '{} of {} files analyzed.\n\n'.format(len(files)-len(failed), len(files))+'\n'.join(summary)
+                if len(failed) > 0:
+                    messagebox.showerror('Files analyzed', text)
+                else:
+                    messagebox.showinfo('Files analyzed', text)
+            
+            for file in files:
+                def work(report, file=file):
+                    p_file = p_val
+                    if os.path.isfile(os.path.splitext(file)[0]+'.info'):
+                        p_file = get_GITT_file_parameters(file)
+                    GITT_data = get_GITT_data_cached(file, report=report)
+                    flags = {}
+                    titrations, messages = analyze_GITT(GITT_data, p_file, flags, timing, samples, report=report)
+                    output = os.path.splitext(file)[0]+'_diffusion.csv'
+                    if len(titrations) > 0:
+                        write_GITT_data(open(output, mode='w'), titrations, flags)
+                    return output, len(titrations), messages
+                
+                def analyzed(kind, value, file=file):
+                    name = os.path.basename(file)
+                    if kind == 'done':
+                        output, titrations, messages = value
+                        lines = ['{} {}: {}'.format(level.upper(), name, text.replace('\n', ' ')) for level, title, text in messages]
+                        if titrations > 0:
+                            finished('\n'.join(['{}: {} titrations, written to {}'.format(name, titrations, os.path.basename(output))]+lines))
+                        else:
+                            finished('\n'.join(['FAILED {}: no titrations detected'.format(name)]+lines), True)
+                    elif kind == 'error':
+                        finished('FAILED {}: {}: {}'.format(name, value.title, value), True)
+                    else:
+                        finished('CANCELLED {}'.format(name), True)
+                
+                self.worker.submit('Analyzing '+os.path.basename(file), work, analyzed)
+        
+        '''
+        This function runs the analysis of the loaded GITT data with the current settings in the background.
+        Once it is finished, the results are taken over in the GUI thread and then() is called.
+        Results of unchanged data and settings are taken from self.results.
+        '''
+        def run_GITT_analysis(then):
             if self.GITT_data == 0:
                 messagebox.showerror('No GITT data', 'No GITT data loaded!')
-            else:                
-                self.D_data, GITT_extra = process_GITT(self.GITT_data,self.settings)
+                return
+            try:
+                p_val, samples, timing = read_GITT_gui_settings(self.settings)
+            except GITT_error as error:
+                messagebox.showerror(error.title, str(error))
+                return
+            if self.settings['report'].get() and self.report is GITT_no_report:
+                new_report()
+            
+            GITT_data = self.GITT_data
+            raw_file = self.raw_file
+            flags = {}
+            
+            def work(report):
+                with report.stage('process'):
+                    result = analyze_GITT_cached(GITT_data, p_val, flags, self.results, timing, samples, report=report)
+                    report.count(titrations=len(result[0]))
+                return result
+            
+            def analyzed(kind, value):
+                if kind == 'error':
+                    messagebox.showerror(value.title, str(value))
+                if kind != 'done':
+                    return
+                titrations, messages = value
+                self.settings.update(flags)
+                show_GITT_messages(messages)
+                self.D_data = titrations
+                self.D_analysis = (p_val, timing, samples, messages)
                 self.frame_top_buttons.destroy()
                 top_buttons(self)
-                file = self.raw_file.split('.')[0]+'.info'
-                write_GITT_settings(file, self.settings)
+                write_GITT_settings(os.path.splitext(raw_file)[0]+'.info', self.settings)
+                write_report()
+                then()
+            
+            self.worker.submit('Analyzing '+self.settings['name'], work, analyzed, self.report)
+        
+        '''
+        This function processes raw GITT data. Depending on whether launched in an OriginLab
+        environment or not, it either writes the results to an OriginLab workbook or
+        plots the D-t and V-t diagram for checking the sensibility of the results
+        '''
+        def try_process_GITT():
+            
+            def show_results():
+                import sys
                 try:
                     import originpro as op
                     op.org_ver()
-                    write_GITT_2_origin(self.GITT_data,self.D_data,self.settings)
+                    with self.report.stage('origin export'):
+                        write_GITT_2_origin(self.GITT_data,self.D_data,self.settings,self.settings['origin_raw'].get())
+                    write_report()
                     if self.settings['plot'].get():
-                        plot_window(self.GITT_data,GITT_extra,self.D_data,self.settings)
+                        plot_window(self.GITT_data,self.D_data,self.settings)
                     else:
                         self.root.destroy()
                         sys.exit()
                 except:
                     if self.settings['plot'].get():
-                        plot_window(self.GITT_data,GITT_extra,self.D_data,self.settings)
+                        plot_window(self.GITT_data,self.D_data,self.settings)
+            
+            run_GITT_analysis(show_results)
+        
         '''
-        This function handles GUI side of saving the processed GITT data.
+        This function handles GUI side of saving the processed GITT data, the file is written in the background.
+        As GITT project, the raw data and the settings are saved together with the results.
         '''
         def save_GITT():
             if self.GITT_data == 0:
                 messagebox.showerror('No GITT data', 'No GITT data loaded!')
                 return
-            elif self.D_data == 0:
-                self.D_data, GITT_extra = process_GITT(self.GITT_data,self.settings)
-                self.frame_top_buttons.destroy()
-                top_buttons(self)
+            elif self.D_data is None:
+                run_GITT_analysis(save_GITT)
+                return
             
             Files = [('CSV File', '*.csv'),
+                ('NumPy Archive', '*.npz'),
+                ('Parquet File', '*.parquet'),
+                ('HDF5 File', '*.h5'),
+                ('GITT Project', '*.gittproj'),
                 ('All Files', '*.*')]
-            savefile = fd.asksaveasfile(filetypes = Files, defaultextension = Files)
-            write_GITT_data(savefile,self.D_data,self.settings)
+            savefile = fd.asksaveasfilename(filetypes = Files, defaultextension = Files)
+            if savefile == '':
+                return
+            
+            GITT_data = self.GITT_data
+            D_data = self.D_data
+            raw_file = self.raw_file
+            p_val, timing, samples, messages = self.D_analysis
+            flags = {'cap': self.settings['cap'], 'spec_cap': self.settings['spec_cap']}
+            
+            def work(report):
+                if savefile.lower().endswith('.gittproj'):
+                    write_GITT_project(savefile, GITT_data, p_val, D_data, flags, messages, source=raw_file, timing=timing, samples=samples, report=report)
+                    return
+                with report.stage('export'):
+                    write_GITT_results(savefile, D_data, flags)
+            
+            def saved(kind, value):
+                if kind == 'error':
+                    messagebox.showerror(value.title, str(value))
+                write_report()
+            
+            self.worker.submit('Saving '+os.path.basename(savefile), work, saved, self.report)
         
         '''
         This function handles the window containing an overview about the formatting of the raw GITT data input file and the meaning of the different required settings for processing.
@@ -1071,12 +3875,22 @@ scale (regular range: 1-3)
 limiter (regular range: 0.02-0.05)
     decrease after scale until all titrations are detected
     adjust until the smoothest curve for diffusion coefficients is obtained
+both can also be determined automatically with
+    python GITT_analysis.py sweep <raw data file>
+not needed if the raw data contains the current (I/mA or Current (A)),
+the titrations are then detected from the current
     
-Processed data is saved in CSV format.
+Processed data is saved in CSV format, or in the formats NPZ, Parquet, or HDF5.
+Saved as GITT project (.gittproj), raw data, settings, and results are kept in a single file,
+which is opened again with 'Open File' without reading and analyzing the raw data again.
 If program is run in OriginLab either via
     run -pyf GITT_analysis.py
 or via the OPX file, the results are automatically filled into a new workbook upon analysis.
 If program is run as standalone, results are automatically plotted upon analysis.
+
+Loading, analysis, and saving run in the background, their progress is shown below the settings
+and can be stopped with Cancel. If several raw data files are selected at once, they are analyzed
+one after the other and the results are written as <name>_diffusion.csv next to the raw data.
 '''
 
             text_box = tk.Text(help_frame, wrap = 'word')
@@ -1177,10 +3991,9 @@ def window_size_limiter(avail_wxh,req_wxh,req_offset_xy):
     return actual_wxh,actual_offsets
 
 if __name__ == '__main__':
-    import tkinter as tk
-    from tkinter import ttk
-    from tkinter import filedialog as fd
-    from tkinter import messagebox
-    import os
+    import sys
+    if len(getattr(sys, 'argv', [])) > 1:
+        sys.exit(main_cli(sys.argv[1:]))
     
+    import_GITT_gui()
     main = main_window()
\ No newline at end of file
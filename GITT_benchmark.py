@@ -0,0 +1,1230 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmarks for the processing steps of GITT_analysis.py
+
+Usage:
+    python GITT_benchmark.py load --rows 1000000
+    python GITT_benchmark.py stream --gigabytes 5 --chunk-size 16777216
+    python GITT_benchmark.py cache --rows 1000000
+    python GITT_benchmark.py derivative --rows 10000000
+    python GITT_benchmark.py edges --pulses 20000
+    python GITT_benchmark.py regression --pulses 10 100 1000 10000
+    python GITT_benchmark.py sweep --pulses 20000 --grid 20 --jobs 4
+    python GITT_benchmark.py montecarlo --pulses 2000 --samples 10000
+    python GITT_benchmark.py decimate --rows 10000000
+    python GITT_benchmark.py export --pulses 100000
+    python GITT_benchmark.py origin --pulses 20000
+    python GITT_benchmark.py startup
+    python GITT_benchmark.py suite --sizes 10000 100000 1000000 --output before.json
+    python GITT_benchmark.py suite --compare before.json
+
+Every benchmark compares the current implementation against the previous reference
+implementation kept in this file, so speed-ups and numerical equivalence can be checked
+after changes to the analysis.
+'''
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import GITT_analysis as ga
+
+# REFERENCE IMPLEMENTATIONS
+
+'''
+line-by-line reader as used up to version 0.9.0
+'''
+def legacy_get_GITT_data(file):
+
+    data = {}
+    labels = []
+    splitter = ' '
+
+    with open(file,mode='r') as f:
+        lines = f.readlines()
+        if ',' in lines[0]:
+            splitter = ','
+        elif '\t' in lines[0]:
+            splitter = '\t'
+        else:
+            splitter = ' '
+
+        required = ['time','volt','cap','spec_cap']
+
+        for line_index, line in enumerate(lines):
+            if line_index == 0:
+                for item in line.split(splitter):
+                    item = item.split('\n')[0]
+                    label = item
+                    if item in ['Test Time (s)','time/s','Time (s)']:
+                        label = 'time'
+                    elif item in ['Voltage (V)','Ewe/V']:
+                        label = 'volt'
+                    elif item in ['Capacity (mAh)','Capacity/mA.h','Capacity/mAh']:
+                        label = 'cap'
+                    elif item in ['Specific Capacity (mAh/g)','SpecificCapacity/mA.h/g']:
+                        label = 'spec_cap'
+
+                    data[label] = []
+                    labels.append(label)
+            else:
+                for item_index, item in enumerate(line.split(splitter)):
+                    if labels[item_index] in required:
+                        data[labels[item_index]].append(float(item))
+
+    return data
+
+'''
+per-element derivative loop as used up to version 0.9.0
+'''
+def legacy_get_numerical_derivative(x,y):
+
+    derivative = []
+
+    for i, value in enumerate(x):
+        if i == 0:
+            m = (y[i+1]-y[i])/(x[i+1]-x[i])
+        elif i == len(x)-1:
+            m = (y[i]-y[i-1])/(x[i]-x[i-1])
+        else:
+            m = (y[i+1]-y[i-1])/(x[i+1]-x[i-1])
+        derivative.append(m)
+
+    return derivative
+
+'''
+point-by-point detection of current on/off as used up to version 0.9.0
+'''
+def legacy_get_GITT_edges(y, y_deriv, scale, cutoff):
+
+    current_on = []
+    current_off = []
+    load = False
+
+    for i, value in enumerate(y_deriv):
+        if y_deriv[i] > abs(scale*y_deriv[i-1]) and y_deriv[i] > cutoff and load == False:
+            if len(current_on) == 0 or y[current_on[-1]] < y[i]:
+                current_on.append(i)
+            else:
+               current_off.append(i)
+            load = True
+        elif y_deriv[i] < -abs(scale*y_deriv[i-1]) and y_deriv[i] < -cutoff and load == True:
+            if len(current_on) == 0 or y[current_on[-1]] < y[i]:
+                current_off.append(i)
+            else:
+               current_on.append(i)
+            load = False
+
+    return current_on, current_off
+
+'''
+per-titration regression with scipy as used up to version 0.9.0
+'''
+def legacy_sqrt_regression(x, y, on, off):
+    from scipy.stats import linregress
+
+    results = []
+    for idx in range(len(on)):
+        tau = x[off[idx]]-x[on[idx]]
+        interval_x = []
+        interval_y = []
+        for j in range(on[idx],off[idx]):
+            if x[j]-x[on[idx]] > tau/2:
+                interval_x.append(np.sqrt(x[j]-x[on[idx]]))
+                interval_y.append(y[j])
+        try:
+            regress_param = linregress(interval_x,interval_y)
+        except:
+            results.append(None)
+            continue
+        results.append((regress_param.slope, regress_param.intercept, regress_param.stderr,
+                        regress_param.intercept_stderr, regress_param.rvalue**2))
+
+    return results
+
+'''
+results of the titrations as returned by the analysis up to version 0.9.0, built from the table of titrations:
+a dictionary of lists with [value, error] pairs and a list of tuples with the refined data of every titration
+(E1, E2, E3, E4, tau, t_on, t_on, t_off, r2, relax)
+'''
+def legacy_GITT_output(titrations, settings):
+
+    T = titrations
+    pairs = lambda name : [list(item) for item in zip(T[name], T[name+'_err'])]
+    D_out = {'ion': [], 'spec_cap': [], 'cycle': [], 'time': [], 'volt': [], 'diff': []}
+    if settings['cap'] or settings['spec_cap']:
+        D_out['ion'] = pairs('ion')
+        D_out['spec_cap'] = pairs('spec_cap')
+        D_out['cycle'] = T['cycle'].tolist()
+    D_out['time'] = T['t_on'].tolist()
+    D_out['volt'] = T['E1'].tolist()
+    D_out['diff'] = pairs('D')
+    if 'D_50' in T.dtype.names:
+        D_out['diff_mc'] = np.column_stack((T['D_2.5'], T['D_50'], T['D_97.5'])).tolist()
+
+    GITT_refined = []
+    for E1, E2, E3, E4, tau, t_on, t_off, r2, relax in zip(pairs('E1'), pairs('E2'), pairs('E3'), pairs('E4'), T['tau'], T['t_on'], T['t_off'], T['r2'], T['relax']):
+        GITT_refined.append((E1, E2, E3, E4, tau, t_on, t_on, t_off, r2, relax))
+
+    return D_out, GITT_refined
+
+'''
+row-by-row CSV writer as used up to version 0.9.0, with the Monte Carlo percentiles
+'''
+def legacy_write_GITT_data(savefile,data_out,settings):
+
+    mc_header = ''
+    mc_rows = ['']*len(data_out['diff'])
+    if 'diff_mc' in data_out:
+        mc_header = ',{:16},{:16},{:16}'.format('D_2.5%/cm^2/s','D_50%/cm^2/s','D_97.5%/cm^2/s')
+        mc_rows = [',{:16.10e},{:16.10e},{:16.10e}'.format(*value) for value in data_out['diff_mc']]
+
+    with savefile as f:
+        if settings['cap'] or settings['spec_cap']:
+            f.write('{:16},{:16},{:16},{:16},{:16},{:16}{}\n'.format('time/s','volt/V','x_ion','SpecCap/mAh/g','D/cm^2/s','Cycle',mc_header))
+            for i,value in enumerate(data_out['diff']):
+                f.write('{:16.10e},{:16.10e},{:16.10e},{:16.10e},{:16.10e},{:4}{}\n'.format(data_out['time'][i],data_out['volt'][i],data_out['ion'][i][0],data_out['spec_cap'][i][0],data_out['diff'][i][0],data_out['cycle'][i],mc_rows[i]))
+        else:
+            f.write('{:16},{:16},{:16}{}\n'.format('time/s','volt/V','D/cm^2/s',mc_header))
+            for i,value in enumerate(data_out['diff']):
+                f.write('{:16.10e},{:16.10e},{:16.10e}{}\n'.format(data_out['time'][i],data_out['volt'][i],data_out['diff'][i][0],mc_rows[i]))
+
+'''
+per-column transfer into OriginLab as used up to version 0.9.0
+'''
+def legacy_write_GITT_2_origin(data_raw,data_out,settings):
+    import originpro as op
+    book = op.new_book(lname=settings['name'])
+    
+    # worksheet for raw data
+    wks_raw = book.add_sheet(name='raw_data')
+    wks_raw.cols = 3
+    
+    wks_raw.from_list(0,data_raw['time'],lname='Time',units='s')
+    wks_raw.from_list(1,data_raw['volt'],lname='Voltage',units='V')
+    if settings['cap']:
+        wks_raw.from_list(2,data_raw['cap'],lname='Capacity',units='mAh')
+    elif settings['spec_cap']:
+        wks_raw.from_list(2,data_raw['spec_cap'],lname='Specific Capacity',units='mAh/g')
+    
+    # worksheet for processed data
+    wks_diff = book.add_sheet(name='diffusion_data')
+    if settings['cap'] or settings['spec_cap']:
+        cols = 6
+        half_cycle_label = []
+        for value in data_out['cycle']:
+            half_cycle_label.append(value + 1)
+    else:
+        cols = 3
+    wks_diff.cols = cols
+    
+    clm_info = [
+        {'data':data_out['time'],'label':'Time','units':'s','comments':''},
+        {'data':data_out['volt'],'label':'Voltage','units':'V','comments':''},
+        {'data':[x[0] for x in data_out['diff']],'label':'Diffusion Coefficient','units':'cm²/s','comments':''}, ### NO ERROR YET
+        {'data':[x[0] for x in data_out['spec_cap']],'label':'Specific Capacity','units':'mAh/g','comments':''},
+        {'data':[x[0] for x in data_out['ion']],'label':'Content Conducting Ion','units':'','comments':''},
+        {'data':half_cycle_label,'label':'Half Cycle','units':'','comments':'odd cycles: charge, even cycles: discharge'}
+        ]
+    
+    for idx in range(cols):    
+        wks_diff.from_list(idx,
+                           clm_info[idx]['data'],
+                           lname=clm_info[idx]['label'],
+                           units=clm_info[idx]['units'],
+                           comments=clm_info[idx]['comments'])
+        
+
+    if settings['cap'] or settings['spec_cap']:
+        # half cycle worksheets
+        current_cycle = -1
+        block_idx = []
+        for idx, cycle in enumerate(data_out['cycle']):
+            if cycle > current_cycle:
+                block_idx.append(idx)
+                current_cycle = cycle
+
+        wks_cycs = []
+        for idx, value in enumerate(block_idx):
+            if idx%2 == 0:
+                name = 'Charge {}'.format(1+idx//2)
+            else:
+                name = 'Discharge {}'.format(1+idx//2)
+                
+            wks_cycs.append(book.add_sheet(name=name))
+            wks_cycs[-1].cols = cols-1
+            
+            if idx == len(block_idx)-1:
+                lo_bound = block_idx[idx]
+                hi_bound = len(data_out['cycle']) 
+            else:
+                lo_bound = block_idx[idx]
+                hi_bound = block_idx[idx+1]
+              
+            for iidx in range(cols-1):
+                wks_cycs[-1].from_list(iidx,
+                                   clm_info[iidx]['data'][lo_bound:hi_bound],
+                                   lname=clm_info[iidx]['label'],
+                                   units=clm_info[iidx]['units'],
+                                   comments=clm_info[iidx]['comments'])
+
+# ORIGINPRO STUB
+
+'''
+minimal stand-in for the worksheets of the originpro module, with the calls used by ga.write_GITT_2_origin,
+so the export can be checked and timed without OriginLab
+every transfer copies the data into the worksheet, from_list element by element as for a python list
+'''
+class stub_list_sheet:
+
+    def __init__(self, name):
+        self.name = name
+        self.cols = 0
+        self.columns = {}
+        self.labels = {}
+
+    def from_list(self, col, data, lname='', units='', comments=''):
+        self.columns[col] = np.array(list(data), dtype=np.float64)
+        self.labels[col] = (lname, units, comments)
+
+    def set_labels(self, labels, type_='L', offset=0):
+        for col, label in enumerate(labels):
+            current = list(self.labels.get(col+offset, ('','','')))
+            current['LUC'.index(type_)] = label
+            self.labels[col+offset] = tuple(current)
+
+'''
+worksheet of recent originpro versions, which also take 2-D arrays
+'''
+class stub_sheet(stub_list_sheet):
+
+    def from_np(self, arr, c1=0):
+        for col in range(arr.shape[1]):
+            self.columns[c1+col] = np.array(arr[:,col], dtype=np.float64)
+
+class stub_book:
+
+    def __init__(self, lname, sheet):
+        self.lname = lname
+        self.sheet = sheet
+        self.sheets = []
+
+    def add_sheet(self, name=''):
+        self.sheets.append(self.sheet(name))
+        return self.sheets[-1]
+
+'''
+stand-in for the originpro module, installed with
+    sys.modules['originpro'] = stub_originpro()
+with numpy False, the worksheets lack from_np as in older versions
+'''
+class stub_originpro:
+
+    def __init__(self, numpy=True):
+        self.sheet = stub_sheet if numpy else stub_list_sheet
+        self.books = []
+
+    def new_book(self, lname=''):
+        self.books.append(stub_book(lname, self.sheet))
+        return self.books[-1]
+
+    def org_ver(self):
+        return 10.15
+
+# SYNTHETIC DATA
+
+'''
+writes a tab-separated file in BioLogic layout with the given number of rows
+two extra columns mimic the additional output of the cycler that is skipped when reading
+the rows are generated and written in blocks, so arbitrarily large files can be produced
+'''
+def write_synthetic_file(file, rows, block_rows=1000000):
+
+    with open(file, mode='w') as f:
+        f.write('time/s\tEwe/V\tCapacity/mA.h\tI/mA\tcycle number\n')
+        for first in range(0, rows, block_rows):
+            t = np.arange(first, min(rows, first+block_rows), dtype=np.float64) * 10.0
+            volt = 3.5 + 0.1*np.sin(t/5000)
+            cap = (t % 9000) / 4500
+            current = np.where((t % 9000) < 900, 1.0, 0.0)
+            cycle = np.floor(t/9000)
+
+            block = np.column_stack((t, volt, cap, current, cycle))
+            np.savetxt(f, block, fmt='%.8E', delimiter='\t')
+
+'''
+estimates the number of rows needed for a synthetic file of the given size
+'''
+def rows_for_size(gigabytes):
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file = os.path.join(tmp, 'probe.txt')
+        write_synthetic_file(file, 10000)
+        bytes_per_row = os.path.getsize(file) / 10000
+
+    return int(gigabytes * 1024**3 / bytes_per_row)
+
+'''
+generates time and voltage of a GITT measurement with the given number of titrations
+the measurement starts with 10 points at rest, then half of the titrations charge and the other half
+discharge the cell, every titration consists of per_pulse points, 1/9 of the time with current applied,
+followed by relaxation
+'''
+def synthetic_GITT(pulses, per_pulse=136, noise=2e-5, seed=0):
+
+    rng = np.random.default_rng(seed)
+    step = 8100/(per_pulse-1)
+    t_pulse = np.arange(per_pulse)*step
+    on = t_pulse < 900
+
+    shape = np.where(on, np.sqrt(t_pulse)/900 + 0.05, np.exp(-(t_pulse-300)/900)/20 + 0.03)
+    sign = np.where(np.arange(pulses) < pulses//2, 1.0, -1.0)
+    # the voltage of every titration starts where the previous one ended
+    offset = np.concatenate(([0.0], np.cumsum(sign*shape[-1])[:-1]))
+
+    time = (10*step + np.arange(pulses)[:,None]*(t_pulse[-1]+step) + t_pulse[None,:]).ravel()
+    volt = (2.0 + offset[:,None] + sign[:,None]*shape[None,:]).ravel()
+    time = np.concatenate((np.arange(10)*step, time))
+    volt = np.concatenate((np.full(10, 2.0), volt))
+    volt += rng.normal(0, noise, len(volt))
+
+    return time, volt
+
+# BENCHMARKS
+
+'''
+measures the time a function call takes, best of a number of repeats
+'''
+def best_time(function, repeats=3):
+
+    best = np.inf
+    for i in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter()-start)
+
+    return best, result
+
+'''
+compares the bulk loader against the line-by-line reference reader
+'''
+def bench_load(rows, repeats=3):
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file = os.path.join(tmp, 'synthetic.txt')
+        write_synthetic_file(file, rows)
+
+        t_new, data_new = best_time(lambda : ga.get_GITT_data(file), repeats)
+        t_old, data_old = best_time(lambda : legacy_get_GITT_data(file), repeats)
+
+    for key in ['time','volt','cap']:
+        if not np.array_equal(data_new[key], np.array(data_old[key])):
+            raise RuntimeError('loaders disagree in column {}'.format(key))
+
+    print('{:>12} rows'.format(rows))
+    print('{:>12} {:10.3f} s {:14.0f} rows/s'.format('line-by-line', t_old, rows/t_old))
+    print('{:>12} {:10.3f} s {:14.0f} rows/s'.format('bulk', t_new, rows/t_new))
+    print('{:>12} {:10.1f} x'.format('speed-up', t_old/t_new))
+
+'''
+measures run time and peak traced memory of a function call
+tracing slows down allocations considerably, so the time is taken from a separate untraced call
+'''
+def peak_memory(function):
+
+    start = time.perf_counter()
+    result = function()
+    duration = time.perf_counter()-start
+    del result
+
+    tracemalloc.start()
+    result = function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return duration, peak, result
+
+'''
+compares peak memory of the bulk loader and the streaming reader for a large synthetic file
+the line-by-line reference reader is only included for files below 200 MB
+'''
+def bench_stream(gigabytes, chunk_sizes, file=None):
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if file is None:
+            file = os.path.join(tmp, 'synthetic.txt')
+            write_synthetic_file(file, rows_for_size(gigabytes))
+        size = os.path.getsize(file)
+
+        runs = [('bulk', lambda : ga.get_GITT_data(file))]
+        for chunk_size in chunk_sizes:
+            runs.append(('chunk {}'.format(chunk_size), lambda chunk_size=chunk_size : ga.get_GITT_data(file, chunk_size=chunk_size)))
+        if size < 200*1024**2:
+            runs.append(('line-by-line', lambda : legacy_get_GITT_data(file)))
+
+        print('{:.2f} GB'.format(size/1024**3))
+        print('{:>20} {:>10} {:>14} {:>12}'.format('reader','time/s','rows/s','peak/MB'))
+        for name, function in runs:
+            duration, peak, data = peak_memory(function)
+            rows = len(data['time'])
+            print('{:>20} {:10.2f} {:14.0f} {:12.1f}'.format(name, duration, rows/duration, peak/1024**2))
+            del data
+
+'''
+compares reopening a file through the binary cache against parsing the text file again
+'''
+def bench_cache(rows, repeats=3):
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file = os.path.join(tmp, 'synthetic.txt')
+        write_synthetic_file(file, rows)
+
+        t_parse, data = best_time(lambda : ga.get_GITT_data(file, chunk_size=2**20), repeats)
+        start = time.perf_counter()
+        ga.get_GITT_data_cached(file)
+        t_fill = time.perf_counter()-start
+        t_hit, cached = best_time(lambda : ga.get_GITT_data_cached(file), repeats)
+
+        for key in data:
+            if not np.array_equal(data[key], cached[key]):
+                raise RuntimeError('cached data differs in column {}'.format(key))
+        del cached
+
+    print('{:>12} rows'.format(rows))
+    print('{:>12} {:10.4f} s'.format('parse', t_parse))
+    print('{:>12} {:10.4f} s'.format('fill cache', t_fill))
+    print('{:>12} {:10.4f} s'.format('cache hit', t_hit))
+
+'''
+compares analyzing the same data again with and without ga.GITT_result_cache: the analysis itself,
+a hit in memory for the same arrays, a hit for a reloaded copy of the data, which has to be hashed,
+and a hit on disk in a new session
+'''
+def bench_results(rows, repeats=3, scale=2, limiter=0.05):
+
+    data = ga.generate_GITT_data(max(2, rows//136), noise=2e-5)
+    p_val = ga.get_GITT_parameters({'A': 1.25, 'm_AM/A': 5, 'M_AM': 100, 'rho': 4, 'refcap': 150, 'c0': 1, 'scale': scale, 'limiter': limiter})
+    t_analysis, reference = best_time(lambda : ga.analyze_GITT(data, p_val, {}), repeats)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ga.GITT_result_cache(cache_dir=tmp)
+        ga.analyze_GITT_cached(data, p_val, {}, cache)
+        t_memory, result = best_time(lambda : ga.analyze_GITT_cached(data, p_val, {}, cache), repeats)
+        copies = [{key: value.copy() for key, value in data.items()} for i in range(repeats)]
+        t_copy, result = best_time(lambda : ga.analyze_GITT_cached(copies.pop(), p_val, {}, cache), repeats)
+        t_disk, result = best_time(lambda : ga.analyze_GITT_cached(data, p_val, {}, ga.GITT_result_cache(cache_dir=tmp)), repeats)
+
+    if result[0].tobytes() != reference[0].tobytes():
+        raise RuntimeError('cached results differ')
+
+    print('{:>12} rows, {} titrations'.format(len(data['time']), len(reference[0])))
+    print('{:>12} {:10.4f} s'.format('analysis', t_analysis))
+    print('{:>12} {:10.4f} s'.format('memory hit', t_memory))
+    print('{:>12} {:10.4f} s'.format('reloaded', t_copy))
+    print('{:>12} {:10.4f} s'.format('disk hit', t_disk))
+
+'''
+measures the memory held by the results of the analysis as table of titrations and as the dictionary of
+lists and list of tuples used up to version 0.9.0, and by the raw data as arrays and as lists of floats,
+together with the time to read all diffusion coefficients and times of the titrations
+'''
+def bench_model(pulses, samples=0):
+    import tracemalloc
+
+    def held(function):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        value = function()
+        size = tracemalloc.get_traced_memory()[0]-before
+        tracemalloc.stop()
+        return size, value
+
+    GITT_data = ga.generate_GITT_data(pulses, noise=1e-5)
+    p_val = ga.get_GITT_parameters({'A': 1.25, 'm_AM/A': 5, 'M_AM': 100, 'rho': 4, 'refcap': 150, 'c0': 1, 'scale': 2, 'limiter': 0.05})
+    settings = {}
+    titrations, messages = ga.analyze_GITT(GITT_data, p_val, settings, samples=samples)
+
+    b_table, table = held(lambda : titrations.copy())
+    b_legacy, (D_out, GITT_refined) = held(lambda : legacy_GITT_output(titrations, settings))
+    b_arrays = sum(column.nbytes for column in GITT_data.values())
+    b_lists, lists = held(lambda : {label: column.tolist() for label, column in GITT_data.items()})
+    del lists
+
+    t_table, _ = best_time(lambda : (table['t_on'].sum(), table['D'].sum()))
+    t_legacy, _ = best_time(lambda : (sum(D_out['time']), sum(value[0] for value in D_out['diff'])))
+
+    print('{:>12} rows, {} titrations'.format(len(GITT_data['time']), len(titrations)))
+    print('{:>20} {:>12} {:>10} {:>12}'.format('','bytes','per row','read/s'))
+    print('{:>20} {:12d} {:10.1f} {:12.6f}'.format('titrations (lists)', b_legacy, b_legacy/len(titrations), t_legacy))
+    print('{:>20} {:12d} {:10.1f} {:12.6f}'.format('titrations (table)', b_table, b_table/len(titrations), t_table))
+    print('{:>20} {:12d} {:10.1f}'.format('raw data (lists)', b_lists, b_lists/len(GITT_data['time'])))
+    print('{:>20} {:12d} {:10.1f}'.format('raw data (arrays)', b_arrays, b_arrays/len(GITT_data['time'])))
+
+'''
+compares reopening a measurement from a GITT project against reading and analyzing the text file again:
+size of the files, time to write the project, to open it and read all diffusion coefficients, which only
+maps the table of titrations, to read a single raw data column, and to read all raw data
+'''
+def bench_project(rows, repeats=3, file=None, noise=2e-5, scale=2, limiter=0.05):
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if file is None:
+            file = os.path.join(tmp, 'synthetic.txt')
+            ga.write_GITT_synthetic(open(file, mode='w'), max(2, rows//136), noise=noise, current=True)
+            p_val = ga.get_GITT_parameters({'A': 1.25, 'm_AM/A': 5, 'M_AM': 100, 'rho': 4, 'refcap': 150, 'c0': 1, 'scale': scale, 'limiter': limiter})
+        else:
+            p_val = ga.get_GITT_file_parameters(file)
+        project = os.path.join(tmp, 'synthetic.gittproj')
+
+        def analyze():
+            GITT_data = ga.get_GITT_data(file, chunk_size=2**20)
+            settings = {}
+            titrations, messages = ga.analyze_GITT(GITT_data, p_val, settings)
+            return GITT_data, titrations, settings, messages
+
+        t_text, (GITT_data, titrations, settings, messages) = best_time(analyze, repeats)
+        t_write, _ = best_time(lambda : ga.write_GITT_project(project, GITT_data, p_val, titrations, settings, messages, source=file), repeats)
+
+        def read_D():
+            with ga.GITT_project(project) as opened:
+                return np.array(opened.read_titrations()['D'])
+
+        def read_raw(label=None):
+            with ga.GITT_project(project) as opened:
+                return opened.get_GITT_data() if label is None else opened.read_raw(label)
+
+        t_D, D = best_time(read_D, repeats)
+        t_column, volt = best_time(lambda : read_raw('volt'), repeats)
+        t_raw, reopened = best_time(read_raw, repeats)
+
+        if not np.array_equal(D, titrations['D'], equal_nan=True) or any(not np.array_equal(reopened[label], GITT_data[label]) for label in GITT_data):
+            raise RuntimeError('project differs from the analysis')
+
+        print('{:>12} rows, {} titrations'.format(len(GITT_data['time']), len(titrations)))
+        print('{:>20} {:10.1f} MB'.format('text file', os.path.getsize(file)/1024**2))
+        print('{:>20} {:10.1f} MB'.format('project', os.path.getsize(project)/1024**2))
+        print('{:>20} {:10.1f} MB'.format('raw data in memory', sum(column.nbytes for column in GITT_data.values())/1024**2))
+        print('{:>20} {:10.4f} s'.format('parse and analyze', t_text))
+        print('{:>20} {:10.4f} s'.format('write project', t_write))
+        print('{:>20} {:10.4f} s'.format('open, read D', t_D))
+        print('{:>20} {:10.4f} s'.format('read voltage', t_column))
+        print('{:>20} {:10.4f} s'.format('read raw data', t_raw))
+
+'''
+compares loading and analyzing a file with the raw data in double and in single precision (float32 for
+all columns but the time): memory of the columns, peak memory of the streaming reader, time of the
+analysis, and the largest deviation in D of the titrations found with both precisions, relative to D
+and to the uncertainty of D
+the voltage of the mock data rises by 30 mV with every titration, so the rows are spread over a fixed
+number of titrations, which keeps the voltage in the range of real cells
+'''
+def bench_precision(rows, repeats=3, file=None, detection='auto', pulses=50, noise=2e-5, scale=2, limiter=0.05):
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if file is None:
+            file = os.path.join(tmp, 'synthetic.txt')
+            ga.write_GITT_synthetic(open(file, mode='w'), pulses, max(136, rows//pulses), noise=noise, current=True)
+            p_val = ga.get_GITT_parameters({'A': 1.25, 'm_AM/A': 5, 'M_AM': 100, 'rho': 4, 'refcap': 150, 'c0': 1, 'scale': scale, 'limiter': limiter})
+        else:
+            p_val = ga.get_GITT_file_parameters(file)
+
+        loaded = {}
+        for precision in ga.GITT_precisions:
+            loaded[precision] = peak_memory(lambda : ga.get_GITT_data(file, chunk_size=2**20, precision=precision))
+
+    print('{:>8} {:>10} {:>12} {:>10} {:>12} {:>10} {:>12}'.format('','load/s','columns/MB','bytes/row','peak/MB','anal./s','titrations'))
+    tables = {}
+    for precision, (duration, peak, data) in loaded.items():
+        held = sum(column.nbytes for column in data.values())
+        t_analysis, (tables[precision], messages) = best_time(lambda : ga.analyze_GITT(data, p_val, {}, detection=detection), repeats)
+        print('{:>8} {:10.2f} {:12.1f} {:10.1f} {:12.1f} {:10.4f} {:12d}'.format(precision, duration, held/1024**2, held/len(data['time']), peak/1024**2, t_analysis, len(tables[precision])))
+
+    double = tables['double']
+    single = tables['single']
+    common, idx_double, idx_single = np.intersect1d(double['t_on'], single['t_on'], return_indices=True)
+    deviation = np.abs(single['D'][idx_single]-double['D'][idx_double])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative = [deviation/np.abs(double[field][idx_double]) for field in ['D','D_err']]
+    relative = [np.max(values[np.isfinite(values)], initial=0) for values in relative]
+
+    print('\n{} titrations found with both precisions'.format(len(common)))
+    print('{:>20} {:10.3e}'.format('max. dev./D', relative[0]))
+    print('{:>20} {:10.3e}'.format('max. dev./D_err', relative[1]))
+
+'''
+compares the detection of the titrations from the current against the detection from jumps in the
+voltage, which needs the derivative, for noisy mock data with current, and counts the titrations found
+'''
+def bench_detection(rows, repeats=3, noise=2e-5, scale=2, limiter=0.05):
+
+    data = ga.generate_GITT_data(max(2, rows//136), noise=noise, current=True)
+    x, y = data['time'], data['volt']
+
+    def voltage():
+        y_deriv = ga.get_numerical_derivative(x, y)
+        return ga.get_GITT_edges(y, y_deriv, scale, limiter*np.mean(np.abs(y_deriv)))
+
+    t_voltage, (on_voltage, off_voltage) = best_time(voltage, repeats)
+    t_current, (on_current, off_current) = best_time(lambda : ga.get_GITT_current_edges(data['curr']), repeats)
+
+    print('{:>12} rows, {} titrations'.format(len(x), max(2, rows//136)))
+    print('{:>12} {:10.4f} s {:10d} switch-ons'.format('voltage', t_voltage, len(on_voltage)))
+    print('{:>12} {:10.4f} s {:10d} switch-ons ({:.1f}x faster)'.format('current', t_current, len(on_current), t_voltage/t_current))
+
+'''
+compares the array derivative against the per-element loop on unevenly spaced points
+the reference loop works on python lists, as it did in the analysis
+'''
+def bench_derivative(rows, repeats=3):
+
+    rng = np.random.default_rng(0)
+    x = np.cumsum(rng.uniform(0.5, 1.5, rows))
+    y = np.sin(x/1000) + rng.normal(0, 1e-4, rows)
+    x_list = x.tolist()
+    y_list = y.tolist()
+
+    t_new, deriv_new = best_time(lambda : ga.get_numerical_derivative(x, y), repeats)
+    t_old, deriv_old = best_time(lambda : legacy_get_numerical_derivative(x_list, y_list), 1)
+
+    deviation = np.max(np.abs(deriv_new - np.array(deriv_old)))
+
+    print('{:>12} points'.format(rows))
+    print('{:>12} {:10.3f} s'.format('loop', t_old))
+    print('{:>12} {:10.3f} s'.format('array', t_new))
+    print('{:>12} {:10.1f} x'.format('speed-up', t_old/t_new))
+    print('{:>12} {:10.3e}'.format('max. dev.', deviation))
+    if deviation != 0:
+        raise RuntimeError('derivatives are not identical')
+
+'''
+follows a noisy mock measurement with a current column that is written in chunks of chunk_rows rows and
+checks after every chunk that the titrations returned by ga.GITT_follower so far are the same as from
+ga.analyze_GITT for the rows written so far, without the last titration, which is still relaxing, and at
+the end for all titrations, once with the detection from jumps in the voltage and once from the current
+the follower uses the cutoff of the jumps of the whole measurement, so the analysis of the rows written so
+far is given the limiter that results in the same cutoff
+'''
+def bench_follow(pulses, chunk_rows=1000, noise=2e-5, scale=2, limiter=0.05):
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'source.txt')
+        file = os.path.join(tmp, 'growing.txt')
+        ga.write_GITT_synthetic(open(source, mode='w'), pulses, noise=noise, current=True)
+        with open(source, mode='r') as f:
+            lines = f.readlines()
+
+        p_val = ga.get_GITT_parameters({'A': 1.25, 'm_AM/A': 5, 'M_AM': 100, 'rho': 4, 'refcap': 150, 'c0': 1, 'scale': scale, 'limiter': limiter})
+        full = ga.get_GITT_data(source)
+        cutoff = limiter*np.mean(np.abs(ga.get_numerical_derivative(full['time'], full['volt'])))
+
+        def reference(detection):
+            data = ga.get_GITT_data(file)
+            p_part = dict(p_val)
+            p_part['limiter'] = [cutoff/np.mean(np.abs(ga.get_numerical_derivative(data['time'], data['volt']))), 0]
+            return ga.analyze_GITT(data, p_part, {}, detection=detection)[0]
+
+        for detection in ['voltage', 'current']:
+            with open(file, mode='w') as f:
+                f.write(lines[0])
+            follower = ga.GITT_follower(file, p_val, cutoff, detection)
+            followed = []
+            t_follow = 0
+            chunks = 0
+            for first in range(1, len(lines), chunk_rows):
+                with open(file, mode='a') as f:
+                    f.writelines(lines[first:first+chunk_rows])
+                start = time.perf_counter()
+                followed.append(follower.update())
+                t_follow += time.perf_counter()-start
+                chunks += 1
+
+                table = np.concatenate(followed)
+                expected = reference(detection)
+                if len(table) > len(expected) or table.tobytes() != expected[:len(table)].tobytes():
+                    raise RuntimeError('follower differs from the analysis after {} rows ({})'.format(first+chunk_rows-1, detection))
+
+            start = time.perf_counter()
+            followed.append(follower.finish())
+            t_follow += time.perf_counter()-start
+            table = np.concatenate(followed)
+            if table.tobytes() != reference(detection).tobytes():
+                raise RuntimeError('follower differs from the analysis of the whole measurement ({})'.format(detection))
+
+            print('{:>12} rows in {} chunks, {} titrations from the {}'.format(len(lines)-1, chunks, len(table), detection))
+            print('{:>12} {:10.4f} s'.format('follow', t_follow))
+            print('{:>12} {:10.6f} s'.format('per chunk', t_follow/chunks))
+
+'''
+compares the array-based detection of current on/off against the point-by-point loop
+'''
+def bench_edges(pulses, repeats=3, scale=2, limiter=0.05):
+
+    time_, volt = synthetic_GITT(pulses)
+    y_deriv = ga.get_numerical_derivative(time_, volt)
+    cutoff = limiter*np.mean(np.abs(y_deriv))
+    volt_list = volt.tolist()
+    deriv_list = y_deriv.tolist()
+
+    t_new, edges_new = best_time(lambda : ga.get_GITT_edges(volt, y_deriv, scale, cutoff), repeats)
+    t_old, edges_old = best_time(lambda : legacy_get_GITT_edges(volt_list, deriv_list, scale, cutoff), 1)
+
+    print('{:>12} points, {} on, {} off'.format(len(volt), len(edges_new[0]), len(edges_new[1])))
+    print('{:>12} {:10.3f} s'.format('loop', t_old))
+    print('{:>12} {:10.3f} s'.format('array', t_new))
+    print('{:>12} {:10.1f} x'.format('speed-up', t_old/t_new))
+    for idx in range(2):
+        if edges_new[idx].tolist() != edges_old[idx]:
+            raise RuntimeError('detected edges are not identical')
+
+'''
+compares the batched sqrt(t) regression against one scipy regression per titration
+slope, intercept, and R² have to agree to 1e-9, the standard errors of the nearly perfect fits
+of the synthetic data are dominated by rounding and only have to agree to 1e-4
+'''
+def bench_regression(pulse_counts, scale=2, limiter=0.05):
+    import scipy.stats
+
+    print('{:>8} {:>12} {:>12} {:>10}'.format('pulses','scipy/s','batched/s','speed-up'))
+    for pulses in pulse_counts:
+        time_, volt = synthetic_GITT(pulses)
+        y_deriv = ga.get_numerical_derivative(time_, volt)
+        on, current_off = ga.get_GITT_edges(volt, y_deriv, scale, limiter*np.mean(np.abs(y_deriv)))
+        off = current_off[np.minimum(np.searchsorted(current_off, on, side='right'), len(current_off)-1)]
+        time_list = time_.tolist()
+        volt_list = volt.tolist()
+
+        t_new, new = best_time(lambda : ga.get_sqrt_regression(time_, volt, on, off), 3)
+        t_old, old = best_time(lambda : legacy_sqrt_regression(time_list, volt_list, on.tolist(), off.tolist()), 1)
+
+        for idx, result in enumerate(old):
+            # newer scipy versions return NaN instead of raising for a single point
+            if result is None or np.isnan(result[0]):
+                if new['valid'][idx]:
+                    raise RuntimeError('titration {} should not be fitted'.format(idx))
+                continue
+            batched = [new[key][idx] for key in ['slope','intercept','slope_err','intercept_err','r2']]
+            if not (np.allclose(batched[:2]+batched[4:], result[:2]+result[4:], rtol=1e-9)
+                    and np.allclose(batched[2:4], result[2:4], rtol=1e-4)):
+                raise RuntimeError('regressions differ for titration {}'.format(idx))
+
+        print('{:8} {:12.4f} {:12.4f} {:10.1f}'.format(pulses, t_old, t_new, t_old/t_new))
+
+'''
+compares the sweep of a grid of settings 'scale' and 'limiter' against a full analysis per pair
+the full analyses are timed for a few sampled pairs and extrapolated to the whole grid,
+the sampled pairs that are not rejected by the sweep have to detect the same number of titrations
+'''
+def bench_sweep(pulses, grid=20, jobs=None, samples=4):
+
+    time_, volt = synthetic_GITT(pulses)
+    GITT_data = {'time': time_, 'volt': volt}
+    values = {key: value[0] for key, value in ga.GITT_defaults.items()}
+    p_val = ga.get_GITT_parameters(values)
+    scales = np.geomspace(0.25, 8, grid)
+    limiters = np.geomspace(0.001, 0.3, grid)
+
+    start = time.perf_counter()
+    best, table = ga.sweep_GITT(GITT_data, p_val, scales, limiters, jobs)
+    t_sweep = time.perf_counter()-start
+
+    rng = np.random.default_rng(0)
+    t_full = 0
+    for idx in rng.choice(len(table), samples, replace=False):
+        result = table[idx]
+        values.update(scale=result['scale'], limiter=result['limiter'])
+        start = time.perf_counter()
+        titrations, messages = ga.analyze_GITT(GITT_data, ga.get_GITT_parameters(values), {})
+        t_full += time.perf_counter()-start
+        if result['bad_fit'] >= 0 and len(titrations) != result['titrations']:
+            raise RuntimeError('sweep and analysis differ for scale {} and limiter {}'.format(result['scale'], result['limiter']))
+    t_full *= len(table)/samples
+
+    rejected = sum(1 for result in table if result['bad_fit'] < 0)
+    print('{:>12} points, {}x{} settings, {} rejected'.format(len(time_), grid, grid, rejected))
+    print('{:>12} {:10.2f} s (extrapolated from {} settings)'.format('full', t_full, samples))
+    print('{:>12} {:10.2f} s'.format('sweep', t_sweep))
+    print('{:>12} {:10.1f} x'.format('speed-up', t_full/t_sweep))
+    print('{:>12} scale {:.4g}, limiter {:.4g}, {} titrations'.format('best', best['scale'], best['limiter'], best['titrations']))
+
+'''
+times the Monte Carlo propagation of the uncertainties for samples x titrations and checks that the
+result does not depend on the memory limit, that the peak memory stays below a small limit, and that
+the median agrees with the analytic D when only the voltages scatter
+titrations at which E4-E1 lies within three times its error, like the turn points between charge and
+discharge, are reported separately, the median of the squared difference is biased there
+'''
+def bench_monte_carlo(pulses, samples=10000, max_bytes=2**28):
+
+    time_, volt = synthetic_GITT(pulses+1)
+    GITT_data = {'time': time_, 'volt': volt}
+    values = {key: value[0] for key, value in ga.GITT_defaults.items()}
+    errors = {'A': 0.02, 'm_AM/A': 0.1, 'M_AM': 0.5, 'rho': 0.05}
+    settings = {'cap': False, 'spec_cap': False}
+
+    y_deriv = ga.get_numerical_derivative(time_, volt)
+    current_on, current_off = ga.get_GITT_edges(volt, y_deriv, 2, 0.05*np.mean(np.abs(y_deriv)))
+    pulse_table = ga.GITT_pulse_table(time_, volt, current_on, current_off)
+
+    p_val = ga.get_GITT_parameters(values, errors)
+    results = ga.get_GITT_pulse_results(GITT_data, pulse_table, p_val, settings)
+    t_mc, D = best_time(lambda : ga.get_GITT_monte_carlo(results, p_val, samples, max_bytes=max_bytes), 1)
+    _, peak, D_small = peak_memory(lambda : ga.get_GITT_monte_carlo(results, p_val, samples, max_bytes=max_bytes//16))
+
+    p_exact = ga.get_GITT_parameters(values)
+    results_exact = ga.get_GITT_pulse_results(GITT_data, pulse_table, p_exact, settings)
+    D_exact = ga.get_GITT_monte_carlo(results_exact, p_exact, samples, max_bytes=max_bytes)
+    deviation = np.abs(D_exact[1]/results_exact['D'][0]-1)
+    dE_s = results_exact['E4'][0]-results_exact['E1'][0]
+    turn = np.abs(dE_s) < 3*np.hypot(results_exact['E1'][1], results_exact['E4'][1])
+
+    print('{:>12} titrations x {} samples'.format(len(results['tau']), samples))
+    print('{:>12} {:10.3f} s'.format('monte carlo', t_mc))
+    print('{:>12} {:10.1f} MB (limit {:.1f} MB)'.format('peak', peak/2**20, max_bytes/16/2**20))
+    print('{:>12} {:10.3g} (median/analytic-1 without errors of the settings)'.format('deviation', np.max(deviation[~turn], initial=0)))
+    print('{:>12} {:10.3g} (same at {} titrations with E4-E1 within the noise)'.format('', np.max(deviation[turn], initial=0), np.count_nonzero(turn)))
+    print('{:>12} {:10.3g} (relative width of the 95% interval)'.format('width', np.median((D[2]-D[0])/D[1])))
+    if not np.array_equal(D, D_small):
+        raise RuntimeError('results depend on the memory limit')
+    if peak > max_bytes//16:
+        raise RuntimeError('peak memory exceeds the memory limit')
+
+'''
+compares drawing the complete voltage trace with drawing the trace decimated by ga.get_GITT_decimation,
+for the whole measurement and for a zoomed range, and counts the pixels in which both plots differ
+'''
+def bench_decimate(rows, width=1000, repeats=3):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    data = ga.generate_GITT_data(max(2, rows//136), noise=1e-4)
+    x, y = data['time'], data['volt']
+
+    def draw(idx, lo, hi):
+        fig = plt.figure(figsize=(width/100, 4), dpi=100)
+        ax = fig.add_axes([0, 0, 1, 1])
+        ax.plot(x[idx], y[idx], linestyle='-', marker='x', antialiased=False)
+        ax.set_xlim(lo, hi)
+        ax.set_ylim(y.min(), y.max())
+        ax.axis('off')
+        fig.canvas.draw()
+        image = np.asarray(fig.canvas.buffer_rgba()).copy()
+        plt.close(fig)
+        return image
+
+    print('{:>12} rows, {} pixels wide'.format(len(x), width))
+    for name, lo, hi in [('all', x[0], x[-1]), ('zoomed', x[len(x)//2], x[len(x)//2+20*136])]:
+        t_decimate, idx = best_time(lambda : ga.get_GITT_decimation(x, y, lo, hi, width), repeats)
+        t_full, image_full = best_time(lambda : draw(np.arange(len(x)), lo, hi), 1)
+        t_draw, image = best_time(lambda : draw(idx, lo, hi), repeats)
+        differ = np.count_nonzero(np.any(image != image_full, axis=2))
+        print('{:>12} {:10.3f} s all points'.format(name, t_full))
+        print('{:>12} {:10.3f} s {} points ({:.3f} s decimation), {} of {} pixels differ'.format('', t_draw+t_decimate, len(idx), t_decimate, differ, image.shape[0]*image.shape[1]))
+
+'''
+compares the row-by-row CSV writer with the bulk CSV writer and the binary formats of
+ga.write_GITT_results by write time and file size, for output data with the given number of titrations
+the formats that need packages which are not installed are skipped
+'''
+def bench_export(titrations, repeats=3):
+
+    rng = np.random.default_rng(0)
+    T = ga.new_GITT_titrations(titrations, monte_carlo=True)
+    T['t_on'] = np.cumsum(rng.random(titrations)*9000)
+    T['E1'] = 3.5+rng.random(titrations)
+    for name, scale in [('ion', 1), ('spec_cap', 200), ('D', 1e-9)]:
+        T[name] = rng.random(titrations)*scale
+        T[name+'_err'] = T[name]*0.01
+    T['cycle'] = np.arange(titrations)//100
+    for name in ['D_2.5','D_50','D_97.5']:
+        T[name] = rng.random(titrations)*1e-9
+    settings = {'cap': True, 'spec_cap': False}
+    D_out = legacy_GITT_output(T, settings)[0]
+
+    print('{:>12} titrations'.format(titrations))
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = os.path.join(tmp, 'legacy.csv')
+        t_legacy, _ = best_time(lambda : legacy_write_GITT_data(open(legacy, mode='w'), D_out, settings), repeats)
+        print('{:>12} {:10.3f} s {:12.0f} bytes'.format('csv (rows)', t_legacy, os.path.getsize(legacy)))
+
+        for fmt in ['csv','npz','parquet','h5']:
+            file = os.path.join(tmp, 'results.'+fmt)
+            try:
+                duration, _ = best_time(lambda : ga.write_GITT_results(file, T, settings), repeats)
+            except ga.GITT_error as error:
+                print('{:>12} skipped, {}'.format(fmt, error))
+                continue
+            print('{:>12} {:10.3f} s {:12.0f} bytes {:8.1f} x'.format(fmt, duration, os.path.getsize(file), t_legacy/duration))
+
+        with open(legacy, mode='r') as f_old, open(os.path.join(tmp, 'results.csv'), mode='r') as f_new:
+            if f_old.read() != f_new.read():
+                raise RuntimeError('CSV writers disagree')
+        with np.load(os.path.join(tmp, 'results.npz')) as archive:
+            if not np.array_equal(archive['D_err'], T['D_err']):
+                raise RuntimeError('NPZ-file does not keep the uncertainties')
+
+'''
+compares the per-column transfer into OriginLab with the block transfer of ga.write_GITT_2_origin,
+with and without the raw data, using the originpro stub, and checks that the workbooks are the same
+the titrations are split evenly into the given number of half cycles, each of which gets a worksheet
+'''
+def bench_origin(pulses, cycles=200, repeats=3):
+    import sys
+
+    GITT_data = ga.generate_GITT_data(pulses, noise=1e-5)
+    values = {key: value[0] for key, value in ga.GITT_defaults.items()}
+    values.update(scale=2, limiter=0.05)
+    settings = {'name': 'synthetic'}
+    titrations, messages = ga.analyze_GITT(GITT_data, ga.get_GITT_parameters(values), settings)
+    titrations['cycle'] = np.arange(len(titrations))*cycles//len(titrations)
+    D_out = legacy_GITT_output(titrations, settings)[0]
+
+    def export(function, output, numpy=True, raw=True):
+        sys.modules['originpro'] = stub_originpro(numpy)
+        if raw:
+            function(GITT_data, output, settings)
+        else:
+            function(GITT_data, output, settings, raw=False)
+        return sys.modules['originpro'].books[0]
+
+    try:
+        t_legacy, legacy = best_time(lambda : export(legacy_write_GITT_2_origin, D_out), 1)
+        t_block, block = best_time(lambda : export(ga.write_GITT_2_origin, titrations), repeats)
+        t_list, listed = best_time(lambda : export(ga.write_GITT_2_origin, titrations, numpy=False), repeats)
+        t_skip, skipped = best_time(lambda : export(ga.write_GITT_2_origin, titrations, raw=False), repeats)
+    finally:
+        sys.modules.pop('originpro', None)
+
+    for book in [block, listed]:
+        if [sheet.name for sheet in book.sheets] != [sheet.name for sheet in legacy.sheets]:
+            raise RuntimeError('workbooks differ in their sheets')
+        for new, old in zip(book.sheets, legacy.sheets):
+            if new.labels != old.labels or any(not np.array_equal(new.columns[col], old.columns[col]) for col in old.columns):
+                raise RuntimeError('workbooks differ in sheet {}'.format(old.name))
+    if [sheet.name for sheet in skipped.sheets] != [sheet.name for sheet in legacy.sheets[1:]]:
+        raise RuntimeError('workbook without raw data differs in its sheets')
+
+    print('{:>12} rows, {} titrations, {} sheets'.format(len(GITT_data['time']), len(titrations), len(legacy.sheets)))
+    print('{:>12} {:10.3f} s'.format('per column', t_legacy))
+    print('{:>12} {:10.3f} s {:8.1f} x'.format('from_list', t_list, t_legacy/t_list))
+    print('{:>12} {:10.3f} s {:8.1f} x'.format('from_np', t_block, t_legacy/t_block))
+    print('{:>12} {:10.3f} s {:8.1f} x'.format('no raw data', t_skip, t_legacy/t_skip))
+
+'''
+measures the start-up in fresh interpreters, best of repeats:
+    interpreter     python without any import, as baseline
+    core import     import of GITT_analysis
+    core start      import and analysis of a small measurement, including the import of numpy
+    gui import      import with the GUI toolkit and the plotting modules of the GUI
+and lists the heavy modules that are loaded by the import of the core
+returns a dictionary with the durations
+'''
+def bench_startup(repeats=3):
+    import importlib.util
+    import py_compile
+    import subprocess
+    import sys
+
+    # the byte code is compiled first, as after the first start of an installation,
+    # even if writing byte code is switched off (PYTHONDONTWRITEBYTECODE)
+    folder = os.path.dirname(os.path.abspath(ga.__file__))
+    py_compile.compile(ga.__file__, cfile=importlib.util.cache_from_source(ga.__file__))
+    scripts = {
+        'interpreter':  'pass',
+        'core import':  'import GITT_analysis',
+        'core start':   'import GITT_analysis as ga; ga.analyze_GITT(ga.generate_GITT_data(), ga.get_GITT_parameters({key: value[0] for key, value in ga.GITT_defaults.items()}), {})',
+        'gui import':   'import GITT_analysis as ga; ga.import_GITT_gui(); import matplotlib.pyplot; from matplotlib.backends import backend_tkagg'
+        }
+
+    stages = {}
+    for name, script in scripts.items():
+        run = lambda : subprocess.run([sys.executable, '-c', script], cwd=folder, check=True, capture_output=True)
+        stages[name], _ = best_time(run, repeats)
+
+    probe = 'import sys, GITT_analysis; print(",".join(sorted({m.split(".")[0] for m in sys.modules} & {"numpy","scipy","matplotlib","tkinter","originpro"})))'
+    heavy = subprocess.run([sys.executable, '-c', probe], cwd=folder, check=True, capture_output=True, text=True).stdout.strip()
+
+    for name, duration in stages.items():
+        print('{:>12} {:10.4f} s'.format(name, duration))
+    print('{:>12} {}'.format('loaded', heavy if heavy != '' else 'no heavy modules with the core'))
+
+    return stages
+
+'''
+collects the versions of python and numpy, the platform, and the date of a benchmark run
+'''
+def get_environment():
+    import datetime
+    import platform
+
+    return {
+        'python':       platform.python_version(),
+        'numpy':        np.__version__,
+        'platform':     platform.platform(),
+        'processor':    platform.processor(),
+        'cpus':         os.cpu_count(),
+        'date':         datetime.datetime.now().isoformat(timespec='seconds')
+        }
+
+'''
+times every stage of the analysis for synthetic measurements of the given numbers of rows,
+written with ga.write_GITT_synthetic, so all sizes share the same shape of the titrations
+the stages are timed separately with the results of the previous stage, best of repeats:
+    load        reading the raw data file
+    derivative  numerical derivative of the voltage
+    detection   switch-on and switch-off points of the current
+    regression  pulse table and square-root regressions
+    capacity    half cycles and ion content of every titration
+    diffusion   diffusion coefficients from E1 to E4
+    analysis    complete analysis with analyze_GITT, for comparison
+    export      writing the CSV-file of the results
+followed by the start-up times of bench_startup
+the results are written as JSON to output together with the environment, and compared against
+the results of an earlier run in compare, where stages slower by more than tolerance are flagged
+returns the number of flagged stages
+'''
+def bench_suite(sizes, repeats=3, output=None, compare=None, tolerance=0.1, per_pulse=136, noise=2e-5, scale=2, limiter=0.05):
+    import json
+
+    values = {key: value[0] for key, value in ga.GITT_defaults.items()}
+    values.update(scale=scale, limiter=limiter)
+    p_val = ga.get_GITT_parameters(values)
+    report = {'environment': get_environment(), 'sizes': {}}
+
+    for rows in sizes:
+        pulses = max(2, rows//per_pulse)
+        stages = {}
+        with tempfile.TemporaryDirectory() as tmp:
+            file = os.path.join(tmp, 'synthetic.txt')
+            ga.write_GITT_synthetic(open(file, mode='w'), pulses, per_pulse, noise)
+
+            stages['load'], GITT_data = best_time(lambda : ga.get_GITT_data(file), repeats)
+            x, y = GITT_data['time'], GITT_data['volt']
+            stages['derivative'], y_deriv = best_time(lambda : ga.get_numerical_derivative(x, y), repeats)
+            cutoff = values['limiter']*np.mean(np.abs(y_deriv))
+            stages['detection'], (current_on, current_off) = best_time(lambda : ga.get_GITT_edges(y, y_deriv, values['scale'], cutoff), repeats)
+
+            def regression():
+                pulse_table = ga.GITT_pulse_table(x, y, current_on, current_off)
+                return pulse_table, ga.get_sqrt_regression(x, y, pulse_table.on, pulse_table.off)
+            stages['regression'], (pulse_table, fit) = best_time(regression, repeats)
+
+            def capacity():
+                half_cycles = ga.get_half_cycles(GITT_data['cap'], 'cap')
+                return ga.get_GITT_capacity(GITT_data, np.minimum(pulse_table.on+1, len(x)-1), p_val, half_cycles)
+            stages['capacity'], _ = best_time(capacity, repeats)
+
+            tau = pulse_table.tau
+            E1 = [pulse_table.E1, np.zeros(len(tau))]
+            E2 = [fit['intercept'], fit['intercept_err']]
+            E3 = [fit['slope']*np.sqrt(tau) + fit['intercept'], fit['intercept_err']]
+            E4 = [pulse_table.E4, np.zeros(len(tau))]
+            stages['diffusion'], _ = best_time(lambda : ga.get_diffusion_coefficient(tau, E1, E2, E3, E4, p_val), repeats)
+
+            settings = {}
+            stages['analysis'], (titrations, messages) = best_time(lambda : ga.analyze_GITT(GITT_data, p_val, settings), repeats)
+            out = os.path.join(tmp, 'synthetic_diffusion.csv')
+            stages['export'], _ = best_time(lambda : ga.write_GITT_data(open(out, mode='w'), titrations, settings), repeats)
+
+        # the first titration and the one at the switch from charge to discharge are not evaluated,
+        # single titrations may be lost in the noise
+        if abs(len(titrations)-(pulses-2)) > pulses//1000:
+            raise RuntimeError('{} of {} titrations detected for {} rows'.format(len(titrations), pulses-2, len(x)))
+        report['sizes'][str(rows)] = {'rows': len(x), 'titrations': len(titrations), 'stages': stages}
+
+        print('{:>12} rows, {} titrations'.format(len(x), len(titrations)))
+        for stage, duration in stages.items():
+            print('{:>12} {:10.4f} s {:14.0f} rows/s'.format(stage, duration, len(x)/duration))
+
+    report['sizes']['startup'] = {'rows': 0, 'titrations': 0, 'stages': bench_startup(repeats)}
+
+    if output is not None:
+        with open(output, mode='w') as f:
+            json.dump(report, f, indent=2)
+
+    slower = 0
+    if compare is not None:
+        with open(compare, mode='r') as f:
+            previous = json.load(f)
+        print('{:>12} {:>12} {:>10} {:>10} {:>8}'.format('rows', 'stage', 'before/s', 'now/s', 'ratio'))
+        for size, result in report['sizes'].items():
+            if not size in previous['sizes']:
+                continue
+            for stage, duration in result['stages'].items():
+                before = previous['sizes'][size]['stages'].get(stage)
+                if before is None:
+                    continue
+                ratio = duration/before
+                flag = ''
+                # stages below a millisecond are dominated by the timer and not flagged
+                if ratio > 1+tolerance and duration-before > 1e-3:
+                    flag = '  SLOWER'
+                    slower += 1
+                print('{:>12} {:>12} {:10.4f} {:10.4f} {:8.2f}{}'.format(size, stage, before, duration, ratio, flag))
+        print('{} stages slower by more than {:.0%} than on {}'.format(slower, tolerance, previous['environment']['date']))
+
+    return slower
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks for GITT_analysis.py')
+    parser.add_argument('benchmark', choices=['load','stream','cache','results','model','precision','project','follow','detection','derivative','edges','regression','sweep','montecarlo','decimate','export','origin','startup','suite'])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--pulses', type=int, nargs='+', default=[2000])
+    parser.add_argument('--gigabytes', type=float, default=5)
+    parser.add_argument('--chunk-size', type=int, nargs='+', default=[2**20, 2**24])
+    parser.add_argument('--file', default=None, help='existing file instead of a synthetic one')
+    parser.add_argument('--grid', type=int, default=20, help='values of scale and of limiter in the sweep')
+    parser.add_argument('--jobs', type=int, default=None)
+    parser.add_argument('--detection', choices=['auto','current','voltage'], default='auto', help='detection of the titrations in the precision benchmark')
+    parser.add_argument('--samples', type=int, default=10000, help='samples of the Monte Carlo propagation')
+    parser.add_argument('--cycles', type=int, default=200, help='half cycles of the Origin export')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000], help='rows of the measurements in the suite')
+    parser.add_argument('--output', default=None, help='JSON-file for the results of the suite')
+    parser.add_argument('--compare', default=None, help='JSON-file of an earlier run of the suite')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='relative slowdown flagged in the comparison')
+    args = parser.parse_args()
+
+    if args.benchmark == 'load':
+        bench_load(args.rows, args.repeats)
+    elif args.benchmark == 'stream':
+        bench_stream(args.gigabytes, args.chunk_size, args.file)
+    elif args.benchmark == 'cache':
+        bench_cache(args.rows, args.repeats)
+    elif args.benchmark == 'results':
+        bench_results(args.rows, args.repeats)
+    elif args.benchmark == 'model':
+        bench_model(args.pulses[0])
+    elif args.benchmark == 'precision':
+        bench_precision(args.rows, args.repeats, args.file, args.detection)
+    elif args.benchmark == 'project':
+        bench_project(args.rows, args.repeats, args.file)
+    elif args.benchmark == 'follow':
+        bench_follow(args.pulses[0])
+    elif args.benchmark == 'detection':
+        bench_detection(args.rows, args.repeats)
+    elif args.benchmark == 'derivative':
+        bench_derivative(args.rows, args.repeats)
+    elif args.benchmark == 'edges':
+        bench_edges(args.pulses[0], args.repeats)
+    elif args.benchmark == 'regression':
+        bench_regression(args.pulses)
+    elif args.benchmark == 'sweep':
+        bench_sweep(args.pulses[0], args.grid, args.jobs)
+    elif args.benchmark == 'montecarlo':
+        bench_monte_carlo(args.pulses[0], args.samples)
+    elif args.benchmark == 'decimate':
+        bench_decimate(args.rows, repeats=args.repeats)
+    elif args.benchmark == 'export':
+        bench_export(args.pulses[0], args.repeats)
+    elif args.benchmark == 'origin':
+        bench_origin(args.pulses[0], args.cycles, args.repeats)
+    elif args.benchmark == 'startup':
+        bench_startup(args.repeats)
+    elif args.benchmark == 'suite':
+        if bench_suite(args.sizes, args.repeats, args.output, args.compare, args.tolerance) > 0:
+            raise SystemExit(1)